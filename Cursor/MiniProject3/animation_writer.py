@@ -0,0 +1,604 @@
+"""
+Streaming animation writers for the visualizers.
+
+Frames are normalized to the shape of the first frame (optionally scaled
+down to a maximum width) and encoded to the output file as soon as they are
+appended, so peak memory stays at roughly one frame regardless of how many
+frames the animation has. A frame that is identical to the previous one is
+not written again; the previous frame is shown for longer instead.
+
+Formats (see WRITERS / open_writer):
+    gif   256-color GIF, per-frame palettes or one global palette
+    webp  animated WebP, lossy or lossless
+    apng  animated PNG; frames after the first only store the changed region
+    mp4   H.264 via a local ffmpeg (on PATH, or from the imageio-ffmpeg package)
+"""
+
+import io
+import os
+import shutil
+import struct
+import subprocess
+import time
+import zlib
+
+import numpy as np
+import PIL
+from PIL import GifImagePlugin, Image, ImageColor
+
+# WebPWriter streams frames into libwebp's animation encoder, whose
+# signature is the Pillow 11+ one (requirements.txt pins pillow>=11)
+WEBP_MIN_PILLOW = 11
+
+try:
+    from PIL import _webp
+    WEBP_AVAILABLE = (int(PIL.__version__.split('.')[0]) >= WEBP_MIN_PILLOW
+                      and hasattr(_webp, 'WebPAnimEncoder'))
+except ImportError:
+    WEBP_AVAILABLE = False
+
+# Seconds each animation frame is shown
+FRAME_DURATION = 2.0
+
+# Default lossy quality (0-100) for WebP and MP4
+DEFAULT_QUALITY = 80
+
+# MP4 is constant frame rate: each frame is repeated for its duration
+MP4_FRAME_RATE = 2
+
+def normalize_frame(frame, target_shape):
+    """Resize a frame to `target_shape` (height, width, channels) if it differs."""
+    if frame.shape != target_shape:
+        pil_frame = Image.fromarray(frame)
+        pil_frame = pil_frame.resize(
+            (target_shape[1], target_shape[0]),
+            Image.Resampling.LANCZOS
+        )
+        frame = np.array(pil_frame)
+    return frame
+
+# ============================================================================
+# WRITER BASE
+# ============================================================================
+
+class AnimationWriter:
+    """Shared frame handling: normalization, scaling, merging and encode timing.
+
+    Subclasses implement `_write(frame, duration)` for one (merged) frame
+    and `_finish()` to finalize the file.
+
+    Usage:
+        with WebPWriter('out.webp', duration=2.0, quality=70) as writer:
+            for frame in frames:
+                writer.append(frame)
+        writer.report()
+    """
+
+    format = None
+
+    def __init__(self, path, duration=FRAME_DURATION, loop=0, max_width=None):
+        self.path = path
+        self.duration = duration
+        self.loop = loop
+        self.max_width = max_width
+        self.target_shape = None
+        self.frame_count = 0
+        self.merged_count = 0
+        self.encode_seconds = 0.0
+        self._pending = None
+        self._pending_duration = 0.0
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _target_shape(self, shape):
+        height, width = shape[:2]
+        if self.max_width and width > self.max_width:
+            height, width = max(1, round(height * self.max_width / width)), self.max_width
+        return (height, width) + tuple(shape[2:])
+
+    def append(self, frame, duration=None):
+        """Add one RGB(A) frame shown for `duration` seconds (default: the writer's duration)."""
+        start = time.perf_counter()
+        if duration is None:
+            duration = self.duration
+        if self.target_shape is None:
+            self.target_shape = self._target_shape(frame.shape)
+        frame = normalize_frame(frame, self.target_shape)
+
+        if self._pending is not None and np.array_equal(frame, self._pending):
+            self._pending_duration += duration
+            self.merged_count += 1
+        else:
+            self._flush()
+            self._pending = frame
+            self._pending_duration = duration
+        self.encode_seconds += time.perf_counter() - start
+
+    def _flush(self):
+        """Encode the held-back frame."""
+        if self._pending is None:
+            return
+        frame, duration = self._pending, self._pending_duration
+        self._pending = None
+        self._write(frame, duration)
+        self.frame_count += 1
+
+    def close(self):
+        if self._closed:
+            return
+        start = time.perf_counter()
+        self._flush()
+        self._finish()
+        self._closed = True
+        self.encode_seconds += time.perf_counter() - start
+
+    def report(self):
+        """Format, path, frames written, file size and time spent encoding."""
+        return {
+            'format': self.format,
+            'path': self.path,
+            'frames': self.frame_count,
+            'merged': self.merged_count,
+            'bytes': os.path.getsize(self.path) if os.path.exists(self.path) else None,
+            'encode_seconds': self.encode_seconds
+        }
+
+    def _write(self, frame, duration):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+def changed_region(previous, frame):
+    """(top, left, bottom, right) bounding box of the pixels that differ, or None."""
+    changed = np.any(previous != frame, axis=-1) if frame.ndim == 3 else previous != frame
+    rows = np.flatnonzero(changed.any(axis=1))
+    if len(rows) == 0:
+        return None
+    cols = np.flatnonzero(changed.any(axis=0))
+    return rows[0], cols[0], rows[-1] + 1, cols[-1] + 1
+
+# ============================================================================
+# GIF
+# ============================================================================
+
+# Global GIF palettes: bits per channel of the nearest-color lookup table
+PALETTE_LUT_BITS = 6
+
+# Pixels sampled per frame when building a global palette
+PALETTE_SAMPLE_PIXELS = 250_000
+
+# 4x4 Bayer matrix, as thresholds in [-0.5, 0.5)
+BAYER_4X4 = (np.array([[0, 8, 2, 10],
+                       [12, 4, 14, 6],
+                       [3, 11, 1, 9],
+                       [15, 7, 13, 5]]) + 0.5) / 16 - 0.5
+
+def color_array(colors):
+    """(n, 3) uint8 array from hex strings or RGB tuples."""
+    return np.array([ImageColor.getrgb(c)[:3] if isinstance(c, str) else tuple(c)[:3] for c in colors],
+                    dtype=np.uint8).reshape(-1, 3)
+
+def build_palette(frames, colors=256, reserved_colors=()):
+    """One palette for a whole animation: median cut over pixels sampled from `frames`.
+
+    `reserved_colors` (e.g. the service brand colors) are always in the
+    palette exactly; the remaining entries come from the sample.
+    """
+    reserved = np.unique(color_array(reserved_colors), axis=0)
+    samples = []
+    for frame in frames:
+        pixels = frame[..., :3].reshape(-1, 3)
+        samples.append(pixels[::max(1, len(pixels) // PALETTE_SAMPLE_PIXELS)])
+    sample = np.concatenate(samples)
+    quantized = Image.fromarray(sample[np.newaxis]).quantize(colors=colors - len(reserved),
+                                                            method=Image.Quantize.MEDIANCUT)
+    used = np.unique(np.asarray(quantized))
+    palette = np.array(quantized.getpalette()[:3 * (int(used.max()) + 1)], dtype=np.uint8).reshape(-1, 3)[used]
+    palette = np.concatenate([reserved, palette])
+    _, first = np.unique(palette, axis=0, return_index=True)
+    return palette[np.sort(first)]
+
+def palette_lut(palette, bits=PALETTE_LUT_BITS):
+    """Nearest palette index for every cell of a (2**bits)^3 RGB grid (cell centers).
+
+    Squared distances are expanded as |c|^2 - 2 c.p + |p|^2, so the search
+    is one matrix product per chunk of cells.
+    """
+    levels = 1 << bits
+    step = 256 >> bits
+    centers = np.arange(levels, dtype=np.float32) * step + step // 2
+    grid = np.stack(np.meshgrid(centers, centers, centers, indexing='ij'), axis=-1).reshape(-1, 3)
+    palette = palette.astype(np.float32)
+    palette_norms = (palette ** 2).sum(axis=1)
+    lut = np.empty(len(grid), dtype=np.uint8)
+    chunk = 1 << 16
+    for start in range(0, len(grid), chunk):
+        cells = grid[start:start + chunk]
+        lut[start:start + chunk] = (palette_norms - 2 * cells @ palette.T).argmin(axis=1)
+    return lut
+
+class PaletteMapper:
+    """Map RGB(A) frames onto a fixed palette with a lookup table, optionally Bayer-dithered.
+
+    Each pixel is one table lookup on its top PALETTE_LUT_BITS bits per
+    channel, so mapping a frame is a few vectorized NumPy operations.
+    `dither` is the ordered-dither amplitude in 0-255 color units (0 = off).
+    """
+
+    def __init__(self, palette, dither=0.0, bits=PALETTE_LUT_BITS):
+        self.palette = palette
+        self.dither = dither
+        self.bits = bits
+        self.lut = palette_lut(palette, bits)
+        # Per-channel contributions to the table index, so a lookup is three gathers and two adds
+        levels = np.arange(256, dtype=np.uint32) >> (8 - bits)
+        self._channel_offsets = [levels << (2 * bits), levels << bits, levels]
+        self._thresholds = None
+
+    def _dither_offsets(self, height, width):
+        if self._thresholds is None or self._thresholds.shape != (height, width):
+            tiles = (-(-height // 4), -(-width // 4))
+            self._thresholds = (np.tile(BAYER_4X4, tiles)[:height, :width] * self.dither).astype(np.int16)
+        return self._thresholds[..., np.newaxis]
+
+    def map(self, frame):
+        """Return the (height, width) uint8 palette indices for a frame."""
+        rgb = frame[..., :3]
+        if self.dither:
+            rgb = np.clip(rgb.astype(np.int16) + self._dither_offsets(*rgb.shape[:2]), 0, 255).astype(np.uint8)
+        red, green, blue = self._channel_offsets
+        return self.lut[red[rgb[..., 0]] + green[rgb[..., 1]] + blue[rgb[..., 2]]]
+
+class StreamingGifWriter(AnimationWriter):
+    """Write an animated GIF one frame at a time.
+
+    With `palette='adaptive'` (the default) each frame is quantized to its
+    own 256-color palette and written with a local color table, the same way
+    the all-at-once writers quantize GIF frames.
+
+    With `palette='global'` one palette is built from the first
+    `sample_frames` frames plus `palette_colors`, stored once in the GIF
+    header, and every frame is mapped onto it with PaletteMapper. Colors no
+    longer flicker between frames, mapping is much cheaper than quantizing,
+    and frames after the first only store the region whose palette indices
+    changed. A precomputed (n, 3) palette array can be passed instead.
+    Either way nothing but the current frame (or the sample frames) is kept
+    in memory.
+
+    Usage:
+        with StreamingGifWriter('out.gif', duration=2.0) as writer:
+            for frame in frames:
+                writer.append(frame)
+    """
+
+    format = 'gif'
+
+    def __init__(self, path, duration=FRAME_DURATION, loop=0, max_width=None,
+                 palette='adaptive', palette_colors=(), dither=0.0, sample_frames=1):
+        super().__init__(path, duration, loop, max_width)
+        self.palette = palette
+        self.palette_colors = palette_colors
+        self.dither = dither
+        self.sample_frames = sample_frames
+        self._fp = None
+        self._mapper = None
+        self._samples = []
+        self._previous = None
+
+    def _write(self, frame, duration):
+        if isinstance(self.palette, str) and self.palette == 'adaptive':
+            self._write_adaptive(frame, duration)
+            return
+        if self._mapper is None:
+            # Hold the first frames back until there are enough to build the palette from
+            self._samples.append((frame, duration))
+            if len(self._samples) < self.sample_frames:
+                return
+            frame, duration = self._start_global()
+        self._write_indexed(frame, duration)
+
+    def _write_adaptive(self, frame, duration):
+        im = Image.fromarray(frame).convert('RGB').convert('P', palette=Image.Palette.ADAPTIVE, colors=256)
+        duration_ms = int(round(duration * 1000))
+
+        if self._fp is None:
+            self._fp = open(self.path, 'wb')
+            header, _ = GifImagePlugin.getheader(im, info={'loop': self.loop, 'duration': duration_ms})
+            self._fp.write(b''.join(header))
+
+        self._fp.write(b''.join(GifImagePlugin.getdata(im, duration=duration_ms, include_color_table=True)))
+
+    def _start_global(self):
+        """Build the palette from the held-back frames; writes all but the last, which is returned."""
+        if isinstance(self.palette, str):
+            palette = build_palette([frame for frame, _ in self._samples], reserved_colors=self.palette_colors)
+        else:
+            palette = color_array(self.palette)
+        self._mapper = PaletteMapper(palette, self.dither)
+        samples, self._samples = self._samples, []
+        for frame, duration in samples[:-1]:
+            self._write_indexed(frame, duration)
+        return samples[-1]
+
+    def _write_indexed(self, frame, duration):
+        indices = self._mapper.map(frame)
+        duration_ms = int(round(duration * 1000))
+        if self._fp is None:
+            im = self._indexed_image(indices)
+            self._fp = open(self.path, 'wb')
+            header, _ = GifImagePlugin.getheader(im, info={'loop': self.loop, 'duration': duration_ms})
+            self._fp.write(b''.join(header))
+            region = (0, 0) + indices.shape
+        else:
+            # Consecutive frames always differ, but may map to the same indices
+            region = changed_region(self._previous, indices) or (0, 0, 1, 1)
+        top, left, bottom, right = region
+        im = self._indexed_image(indices[top:bottom, left:right])
+        self._fp.write(b''.join(GifImagePlugin.getdata(im, offset=(left, top), duration=duration_ms)))
+        self._previous = indices
+
+    def _indexed_image(self, indices):
+        im = Image.frombytes('P', (indices.shape[1], indices.shape[0]), np.ascontiguousarray(indices).tobytes())
+        palette = np.zeros((256, 3), dtype=np.uint8)
+        palette[:len(self._mapper.palette)] = self._mapper.palette
+        im.putpalette(palette.tobytes())
+        return im
+
+    def _finish(self):
+        if self._samples:
+            self._write_indexed(*self._start_global())
+        if self._fp is not None:
+            self._fp.write(b';')  # GIF trailer
+            self._fp.close()
+            self._fp = None
+
+# ============================================================================
+# WEBP
+# ============================================================================
+
+class WebPWriter(AnimationWriter):
+    """Write an animated WebP with libwebp's animation encoder (frames are diffed and packed by libwebp).
+
+    `quality` is 0-100 (lossy) unless `lossless` is set; `method` trades
+    encode time for size (0 = fastest, 6 = smallest).
+    """
+
+    format = 'webp'
+
+    def __init__(self, path, duration=FRAME_DURATION, loop=0, max_width=None,
+                 quality=DEFAULT_QUALITY, lossless=False, method=4):
+        if not WEBP_AVAILABLE:
+            raise RuntimeError(f"Animated WebP needs Pillow {WEBP_MIN_PILLOW}+ built with WebP support")
+        super().__init__(path, duration, loop, max_width)
+        self.quality = quality
+        self.lossless = lossless
+        self.method = method
+        self._encoder = None
+        self._timestamp_ms = 0
+
+    def _write(self, frame, duration):
+        im = Image.fromarray(frame)
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGBA')
+        if self._encoder is None:
+            # Background (packed ARGB), loop, minimize_size, kmin, kmax, allow_mixed, verbose
+            kmin, kmax = (9, 17) if self.lossless else (3, 5)
+            self._encoder = _webp.WebPAnimEncoder(im.size, 0xFFFFFFFF, self.loop, False, kmin, kmax, False, False)
+        self._encoder.add(im.getim(), self._timestamp_ms, self.lossless, self.quality, 100, self.method)
+        self._timestamp_ms += int(round(duration * 1000))
+
+    def _finish(self):
+        if self._encoder is None:
+            return
+        self._encoder.add(None, self._timestamp_ms, self.lossless, self.quality, 100, 0)
+        data = self._encoder.assemble('', b'', '')
+        self._encoder = None
+        if data is None:
+            raise OSError("WebP encoder returned no data")
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+# ============================================================================
+# APNG
+# ============================================================================
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def png_chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+def png_image_data(frame, compress_level):
+    """Encode a frame with Pillow's PNG encoder and return its IDAT payload."""
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, format='PNG', compress_level=compress_level)
+    data = buf.getvalue()
+    payload = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        if chunk_type == b'IDAT':
+            payload.append(data[pos + 8:pos + 8 + length])
+        pos += length + 12
+    return b''.join(payload)
+
+def apng_delay(duration):
+    """Frame delay as the (numerator, denominator) pair that fits APNG's 16-bit fields."""
+    for denominator in (1000, 100, 10, 1):
+        numerator = int(round(duration * denominator))
+        if numerator <= 0xFFFF:
+            return numerator, denominator
+    return 0xFFFF, 1
+
+class APNGWriter(AnimationWriter):
+    """Write an animated PNG one frame at a time.
+
+    Lossless, full color. After the first frame only the bounding box of the
+    pixels that changed is stored (blended over the previous frame), so a
+    frame where a few slots change costs a few kilobytes. The frame count in
+    the header is patched in when the writer closes.
+    """
+
+    format = 'apng'
+
+    def __init__(self, path, duration=FRAME_DURATION, loop=0, max_width=None, compress_level=6):
+        super().__init__(path, duration, loop, max_width)
+        self.compress_level = compress_level
+        self._fp = None
+        self._actl_offset = None
+        self._sequence = 0
+        self._previous = None
+
+    def _write(self, frame, duration):
+        height, width = frame.shape[:2]
+        if self._fp is None:
+            color_type = {4: 6, 3: 2}[frame.shape[2]] if frame.ndim == 3 else 0
+            self._fp = open(self.path, 'wb')
+            self._fp.write(PNG_SIGNATURE)
+            self._fp.write(png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0)))
+            self._actl_offset = self._fp.tell()
+            self._fp.write(png_chunk(b'acTL', struct.pack('>II', 0, self.loop)))
+            region = (0, 0, height, width)
+        else:
+            # Consecutive frames always differ (identical ones are merged); the fallback keeps a valid 1x1 frame
+            region = changed_region(self._previous, frame) or (0, 0, 1, 1)
+
+        top, left, bottom, right = region
+        delay = apng_delay(duration)
+        # fcTL: sequence, width, height, x, y, delay, dispose_op NONE, blend_op SOURCE
+        self._fp.write(png_chunk(b'fcTL', struct.pack('>IIIIIHHBB', self._sequence, right - left, bottom - top,
+                                                      left, top, delay[0], delay[1], 0, 0)))
+        self._sequence += 1
+        image_data = png_image_data(np.ascontiguousarray(frame[top:bottom, left:right]), self.compress_level)
+        if self._previous is None:
+            self._fp.write(png_chunk(b'IDAT', image_data))
+        else:
+            self._fp.write(png_chunk(b'fdAT', struct.pack('>I', self._sequence) + image_data))
+            self._sequence += 1
+        self._previous = frame
+
+    def _finish(self):
+        if self._fp is None:
+            return
+        self._fp.write(png_chunk(b'IEND', b''))
+        self._fp.seek(self._actl_offset)
+        self._fp.write(png_chunk(b'acTL', struct.pack('>II', self.frame_count, self.loop)))
+        self._fp.close()
+        self._fp = None
+        self._previous = None
+
+# ============================================================================
+# MP4
+# ============================================================================
+
+def ffmpeg_path():
+    """Path of a local ffmpeg executable, or None."""
+    path = shutil.which('ffmpeg')
+    if path is not None:
+        return path
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return None
+
+class MP4Writer(AnimationWriter):
+    """Pipe frames into ffmpeg's H.264 encoder.
+
+    MP4 has a constant frame rate, so each frame is repeated for its
+    duration at `fps` (x264 stores the repeats as nearly empty frames).
+    `quality` 0-100 maps onto x264's CRF 40-16. The file is written with
+    the index up front (+faststart) so players can start before it is
+    fully downloaded.
+    """
+
+    format = 'mp4'
+
+    def __init__(self, path, duration=FRAME_DURATION, loop=0, max_width=None,
+                 quality=DEFAULT_QUALITY, fps=MP4_FRAME_RATE):
+        self.executable = ffmpeg_path()
+        if self.executable is None:
+            raise RuntimeError("MP4 output needs ffmpeg (on PATH or via `pip install imageio-ffmpeg`)")
+        super().__init__(path, duration, loop, max_width)
+        self.quality = quality
+        self.fps = fps
+        self._process = None
+
+    def _start(self, width, height):
+        crf = round(40 - 0.24 * max(0, min(100, self.quality)))
+        command = [self.executable, '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(self.fps), '-i', '-',
+                   # yuv420p needs even dimensions
+                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+                   '-c:v', 'libx264', '-crf', str(crf), '-pix_fmt', 'yuv420p', '-movflags', '+faststart',
+                   self.path]
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def _write(self, frame, duration):
+        height, width = frame.shape[:2]
+        if self._process is None:
+            self._start(width, height)
+        rgb = np.ascontiguousarray(frame[..., :3]) if frame.ndim == 3 else np.stack([frame] * 3, axis=-1)
+        data = rgb.tobytes()
+        for _ in range(max(1, int(round(duration * self.fps)))):
+            self._process.stdin.write(data)
+
+    def _finish(self):
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        if self._process.wait() != 0:
+            raise OSError(f"ffmpeg exited with status {self._process.returncode} writing {self.path}")
+        self._process = None
+
+# ============================================================================
+# FORMAT SELECTION
+# ============================================================================
+
+WRITERS = {
+    'gif': StreamingGifWriter,
+    'webp': WebPWriter,
+    'apng': APNGWriter,
+    'mp4': MP4Writer
+}
+
+# Options each writer understands (others passed to open_writer are ignored)
+WRITER_OPTIONS = {
+    'gif': {'palette', 'palette_colors', 'dither', 'sample_frames'},
+    'webp': {'quality', 'lossless', 'method'},
+    'apng': {'compress_level'},
+    'mp4': {'quality', 'fps'}
+}
+
+def available_formats():
+    """Formats that can be written in this environment."""
+    formats = ['gif', 'apng']
+    if WEBP_AVAILABLE:
+        formats.append('webp')
+    if ffmpeg_path() is not None:
+        formats.append('mp4')
+    return formats
+
+def output_path(path, format):
+    """`path` with the file extension for `format`."""
+    return os.path.splitext(path)[0] + '.' + format
+
+def open_writer(path, format='gif', duration=FRAME_DURATION, loop=0, max_width=None, **options):
+    """Create the writer for `format`; options not used by that format are dropped."""
+    options = {key: value for key, value in options.items()
+               if key in WRITER_OPTIONS[format] and value is not None}
+    return WRITERS[format](path, duration=duration, loop=loop, max_width=max_width, **options)
+
+def format_report(reports):
+    """Text table comparing the writers' encode time and file size."""
+    lines = [f"{'format':<6} {'frames':>6} {'size':>10} {'encode':>9}  path"]
+    for report in reports:
+        size = f"{report['bytes'] / 1024:,.0f} KB" if report['bytes'] is not None else '-'
+        lines.append(f"{report['format']:<6} {report['frames']:>6} {size:>10} "
+                     f"{report['encode_seconds']:>8.2f}s  {report['path']}")
+    return '\n'.join(lines)
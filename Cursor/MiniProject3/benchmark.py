@@ -0,0 +1,338 @@
+"""
+Benchmark suite for the ride-hailing pipeline.
+
+Times the dashboard and visualizer hot paths (loading, statistics, the
+Plotly map, matplotlib and composited frames, GIF encoding and the full
+animation) on the bundled workbook and on synthetic datasets, writes the
+results to JSON and compares them with a saved baseline. Runs headless
+(matplotlib Agg, Streamlit in bare mode) on a plain Linux box:
+
+    python benchmark.py --save-baseline               # record a baseline
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+
+The run exits with status 1 if any benchmark's median is more than
+`threshold` slower than the baseline.
+"""
+
+import os
+
+# Headless: render matplotlib off-screen
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import matplotlib
+import matplotlib.pyplot as plt
+
+from animation_writer import StreamingGifWriter
+from lots import load_registry
+from ride_data import DATA_PATH, FrameIndex, StatsCube, add_derived_columns, load_ride_data
+from synthetic_data import generate
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+RESULTS_PATH = 'benchmark_results.json'
+BASELINE_PATH = 'benchmark_baseline.json'
+
+# Synthetic datasets (slots, timestamps) generated with synthetic_data.py
+DEFAULT_SIZES = [(24, 240), (96, 1440)]
+
+# Fixed seed so every run times the same synthetic data
+SYNTHETIC_SEED = 541
+
+# Allowed slowdown of a median before it counts as a regression (0.25 = 25%)
+DEFAULT_THRESHOLD = 0.25
+
+# Slowdowns smaller than this (seconds) are treated as timer noise
+MIN_REGRESSION_SECONDS = 0.002
+
+# Timestamps sampled for the per-frame benchmarks
+SAMPLE_FRAMES = 5
+
+# Animation engines run end to end (matplotlib takes about a second per frame)
+DEFAULT_ENGINES = ['composite', 'incremental']
+
+# Datasets with more timestamps skip the end-to-end animation (GIF encoding dominates)
+ANIMATION_MAX_TIMESTAMPS = 240
+
+# ============================================================================
+# TIMING
+# ============================================================================
+
+def measure(fn, repeat=3, setup=None):
+    """Call `fn` `repeat` times and return its timings (seconds).
+
+    `setup` runs untimed before every call. Garbage collection is done
+    between calls so one run's garbage is not charged to the next.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+def summarize(timings):
+    return {
+        'median': statistics.median(timings),
+        'min': min(timings),
+        'max': max(timings),
+        'runs': len(timings)
+    }
+
+def sample_timestamps(timestamps, count=SAMPLE_FRAMES):
+    """Evenly spaced timestamps across the timeline."""
+    positions = np.linspace(0, len(timestamps) - 1, min(count, len(timestamps))).round().astype(int)
+    return [timestamps[i] for i in positions]
+
+def measure_frames(fn, timestamps, repeat=1):
+    """Per-frame timings of `fn(timestamp)` over the sampled timestamps."""
+    timings = []
+    for _ in range(repeat):
+        for timestamp in timestamps:
+            gc.collect()
+            start = time.perf_counter()
+            fn(timestamp)
+            timings.append(time.perf_counter() - start)
+    return summarize(timings)
+
+# ============================================================================
+# DATASETS
+# ============================================================================
+
+def parse_size(text):
+    """Parse a 'SLOTSxTIMESTAMPS' dataset size."""
+    slots, timestamps = text.lower().split('x')
+    return int(slots), int(timestamps)
+
+def benchmark_datasets(sizes):
+    """Yield (name, DataFrame, capacity) for the bundled data and every synthetic size."""
+    df = load_ride_data(DATA_PATH)
+    yield 'bundled', df, None
+    for slots, timestamps in sizes:
+        synthetic = add_derived_columns(generate(slots=slots, timestamps=timestamps, seed=SYNTHETIC_SEED,
+                                                 lot=load_registry().get()))
+        yield f'synthetic_{slots}x{timestamps}', synthetic, slots
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_load_data(df, workdir, repeat):
+    """load_ride_data() from the workbook (cold) and from its Parquet snapshot (warm)."""
+    xlsx_path = os.path.join(workdir, 'ride_hailing.xlsx')
+    cache_dir = os.path.join(workdir, 'cache')
+    df.drop(columns='status').to_excel(xlsx_path, index=False)
+
+    def clear_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    results = {
+        'load_data.cold': measure(lambda: load_ride_data(xlsx_path, cache_dir=cache_dir),
+                                  repeat=max(1, repeat // 3), setup=clear_cache),
+        'load_data.warm': measure(lambda: load_ride_data(xlsx_path, cache_dir=cache_dir), repeat=repeat)
+    }
+    clear_cache()
+    return results
+
+def bench_indexes(df, total_spots, repeat):
+    """FrameIndex and StatsCube construction (once per process in the apps)."""
+    frame_index = FrameIndex(df)
+    return {
+        'frame_index.build': measure(lambda: FrameIndex(df), repeat=repeat),
+        'stats_cube.build': measure(lambda: StatsCube(frame_index, total_spots), repeat=repeat)
+    }
+
+def bench_dashboard(dashboard, df, lot, capacity, background, timestamps, repeat):
+    """Dashboard per-frame work: calculate_stats() and create_map_plot()."""
+    frame_index = FrameIndex(df)
+    frames = {timestamp: frame_index.frame(timestamp) for timestamp in timestamps}
+    return {
+        'dashboard.calculate_stats': measure_frames(
+            lambda t: dashboard.calculate_stats(frames[t], capacity), timestamps, repeat),
+        'dashboard.create_map_plot': measure_frames(
+            lambda t: dashboard.create_map_plot(frames[t], lot.map_path, background['width'], background['height'],
+                                                background['data_uri'], lot.vertical_offset),
+            timestamps, repeat)
+    }
+
+def bench_frames(vis, timestamps, repeat, workdir):
+    """Per-frame breakdown: lookup, statistics, each render engine, GIF encoding."""
+    results = {
+        'frame.lookup': measure_frames(lambda t: vis.frame_index.frame(t), timestamps, repeat),
+        'frame.calculate_statistics': measure_frames(
+            lambda t: vis.calculate_statistics(vis.frame_index.frame(t)), timestamps, repeat),
+        'frame.stats_cube': measure_frames(lambda t: vis.stats_cube.stats(t), timestamps, repeat),
+        'frame.render.matplotlib': measure_frames(vis.create_frame, timestamps, 1)
+    }
+    # Composite engines build their static layers and plate sprites, and the session
+    # engine its figure, on first use: time that cold pass separately from the steady state
+    for engine in ('composite', 'incremental', 'session'):
+        vis.composite_renderers.clear()
+        vis.reset_frame_session()
+        results[f'frame.render.{engine}.cold'] = measure_frames(vis.RENDER_ENGINES[engine], timestamps, 1)
+        results[f'frame.render.{engine}'] = measure_frames(vis.RENDER_ENGINES[engine], timestamps, repeat)
+
+    frames = [vis.create_composite_frame(t) for t in timestamps]
+    gif_path = os.path.join(workdir, 'frames.gif')
+
+    def encode():
+        with StreamingGifWriter(gif_path) as writer:
+            for frame in frames:
+                writer.append(frame)
+
+    encoded = measure(encode, repeat=repeat)
+    results['frame.gif_encode'] = {key: value / len(frames) if key != 'runs' else value
+                                   for key, value in encoded.items()}
+    return results
+
+def bench_animation(vis, engines, workdir):
+    """generate_animation() end to end (rendering plus GIF writing) per engine."""
+    results = {}
+    original_path = vis.ANIMATION_PATH
+    vis.ANIMATION_PATH = os.path.join(workdir, 'animation.gif')
+    try:
+        for engine in engines:
+            vis.composite_renderers.clear()
+            results[f'generate_animation.{engine}'] = measure(
+                lambda: vis.generate_animation(engine=engine), repeat=1)
+            results[f'generate_animation.{engine}']['gif_bytes'] = os.path.getsize(vis.ANIMATION_PATH)
+    finally:
+        vis.ANIMATION_PATH = original_path
+    return results
+
+def run_suite(sizes, engines, repeat=3, include_animation=True):
+    """Run every benchmark on every dataset; returns the results document."""
+    # Streamlit runs in bare mode here; silence its "no runtime" warnings
+    logging.disable(logging.WARNING)
+
+    # Importing the apps loads the bundled data and prints a summary; keep the output clean
+    with contextlib.redirect_stdout(io.StringIO()):
+        import dashboard
+        import visualize_ride_hailing as vis
+
+    lot = dashboard.get_lot(vis.LOT.lot_id)
+    background = dashboard.load_map_background(lot.lot_id)
+
+    document = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'matplotlib': matplotlib.__version__,
+            'sizes': [f'{slots}x{timestamps}' for slots, timestamps in sizes],
+            'engines': engines,
+            'repeat': repeat
+        },
+        'datasets': {}
+    }
+
+    for name, df, capacity in benchmark_datasets(sizes):
+        capacity = capacity or lot.capacity
+        print(f"\n{name}: {len(df)} rows, {df['current_time'].nunique()} timestamps")
+        workdir = tempfile.mkdtemp(prefix='ride_hailing_bench_')
+        try:
+            results = {}
+            results.update(bench_load_data(df, workdir, repeat))
+            results.update(bench_indexes(df, capacity, repeat))
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                vis.use_dataset(df, capacity)
+            timestamps = sample_timestamps(vis.unique_timestamps)
+            results.update(bench_dashboard(dashboard, df, lot, capacity, background, timestamps, repeat))
+            results.update(bench_frames(vis, timestamps, repeat, workdir))
+            if include_animation and len(vis.unique_timestamps) <= ANIMATION_MAX_TIMESTAMPS:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results.update(bench_animation(vis, engines, workdir))
+            elif include_animation:
+                print(f"  (end-to-end animation skipped: more than {ANIMATION_MAX_TIMESTAMPS} timestamps)")
+            plt.close('all')
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        for key, result in results.items():
+            print(f"  {key:<36} {result['median'] * 1000:10.2f} ms")
+        document['datasets'][name] = {
+            'rows': int(len(df)),
+            'timestamps': int(df['current_time'].nunique()),
+            'results': results
+        }
+    return document
+
+# ============================================================================
+# REGRESSION CHECK
+# ============================================================================
+
+def find_regressions(document, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return (dataset, benchmark, baseline median, current median) for every regression."""
+    regressions = []
+    for name, dataset in document['datasets'].items():
+        baseline_results = baseline.get('datasets', {}).get(name, {}).get('results', {})
+        for key, result in dataset['results'].items():
+            if key not in baseline_results:
+                continue
+            before, after = baseline_results[key]['median'], result['median']
+            if after > before * (1 + threshold) and after - before > MIN_REGRESSION_SECONDS:
+                regressions.append((name, key, before, after))
+    return regressions
+
+def write_json(document, path):
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ride-hailing dashboard and visualizer.")
+    parser.add_argument('--sizes', type=parse_size, nargs='*', default=DEFAULT_SIZES,
+                        help="Synthetic dataset sizes as SLOTSxTIMESTAMPS (e.g. 24x240 96x1440)")
+    parser.add_argument('--engines', nargs='*', default=DEFAULT_ENGINES,
+                        help="Animation engines to run end to end (matplotlib, composite, incremental, session)")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--no-animation', action='store_true', help="Skip the end-to-end animation runs")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Results JSON file")
+    parser.add_argument('--baseline', default=None, help="Baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', action='store_true', help=f"Also write the results to {BASELINE_PATH}")
+    args = parser.parse_args()
+
+    document = run_suite(args.sizes, args.engines, args.repeat, not args.no_animation)
+    write_json(document, args.output)
+    print(f"\nResults saved: {args.output}")
+    if args.save_baseline:
+        write_json(document, BASELINE_PATH)
+        print(f"Baseline saved: {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(document, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for name, key, before, after in regressions:
+                print(f"  {name} {key}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms "
+                      f"(+{(after / before - 1):.0%})")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
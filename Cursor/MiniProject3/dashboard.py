@@ -8,24 +8,40 @@ Features:
 - Service breakdown with logos
 - Interactive time slider
 - Parking map with occupied spot markers
-- Auto-refresh animation option
+- Client-side animation playback
+- Dwell-time and slot turnover analytics tab
+- Optional per-stage timing spans in the sidebar
 """
 
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from PIL import Image
+import streamlit.components.v1 as components
 import time
+import functools
+import threading
 from datetime import datetime
 import base64
-from io import BytesIO
 import os
 
+import metrics_exporter
+from dwell_analytics import HISTOGRAM_BIN_MINUTES, analyze as analyze_dwell
+from live_feed import LiveFeed
+from lots import DEFAULT_LOT_CONFIG, load_registry
+from playback import build_playback_state, playback_html
+from ride_data import FrameIndex, StatsCube, load_ride_data
+from sprites import (encode_background, encode_low_bandwidth_background, logo_sprite,
+                     plate_sprite, sprite_cache)
+from tracing import NULL_SPAN, SpanRecorder, bucket_labels
+
 def get_base64_image(path):
     """Convert image file to base64 string."""
     with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode()
 
+# Optional Prometheus/file metrics (started once per process, see metrics_exporter.py)
+metrics_exporter.start_from_environment()
+
 # Initialize session state for slider
 if 'selected_time' not in st.session_state:
     st.session_state.selected_time = 0
@@ -220,50 +236,118 @@ LOGO_PATHS = {
     'Taxi': 'assets/logos/taxi.png'
 }
 
-VERTICAL_OFFSET = 30
-TOTAL_SPOTS = 24
+# Seconds between polls of the live feed
+LIVE_POLL_SECONDS = 2.0
+
+# Lots (map, slots, capacity, data file) come from assets/lots.json
+@st.cache_resource
+def load_lot_registry():
+    """Read the lot registry once per process."""
+    return load_registry()
+
+def get_lot(lot_id=None):
+    return load_lot_registry().get(lot_id)
 
-# Load data
+# Load data (everything below is cached per lot, so one lot never loads another's data)
 @st.cache_data
-def load_data():
-    """Load and process the ride-hailing data."""
-    df = pd.read_excel('assets/ride_hailing.xlsx')
-    
-    # Split "Other" service entries if any
-    other_mask = df['service'] == 'Other'
-    other_indices = df[other_mask].index.tolist()
-    if len(other_indices) > 0:
-        half_point = len(other_indices) // 2
-        for idx in other_indices[:half_point]:
-            df.at[idx, 'service'] = 'Waymo'
-        for idx in other_indices[half_point:]:
-            df.at[idx, 'service'] = 'Taxi'
-    
-    # Create status column
-    df['status'] = df['reservation_id'].apply(
-        lambda x: 'occupied' if pd.notna(x) and str(x).strip() != '' else 'vacant'
-    )
-    
-    # Convert current_time to datetime
-    df['current_time'] = pd.to_datetime(df['current_time'])
-    
-    return df
+def load_data(lot_id=None):
+    """Load and process a lot's ride-hailing data (via its Parquet snapshot)."""
+    return load_ride_data(get_lot(lot_id).data_path)
+
+@st.cache_resource
+def load_frame_index(lot_id=None):
+    """Build a lot's time-bucketed frame index once per process."""
+    return FrameIndex(load_data(lot_id))
+
+@st.cache_resource
+def load_map_background(lot_id=None, low_bandwidth=False):
+    """Encode a lot's map background once per process and share it across sessions."""
+    map_path = get_lot(lot_id).map_path
+    if low_bandwidth:
+        return encode_low_bandwidth_background(map_path)
+    return encode_background(map_path)
+
+@st.cache_resource
+def load_stats_cube(lot_id=None):
+    """Precompute a lot's statistics for every timestamp once per process."""
+    return StatsCube(load_frame_index(lot_id), get_lot(lot_id).capacity)
+
+@st.cache_resource
+def load_live_feed(source):
+    """Open a live feed once per process; its slot state is shared by all sessions."""
+    return LiveFeed(source)
+
+@st.cache_resource
+def load_playback_html(lot_id=None, low_bandwidth=False, frame_seconds=2.0):
+    """Build a lot's client-side playback player once per process and settings."""
+    state = build_playback_state(load_frame_index(lot_id), load_stats_cube(lot_id),
+                                 load_map_background(lot_id, low_bandwidth), get_lot(lot_id).vertical_offset)
+    return playback_html(state, frame_seconds)
 
 @st.cache_data
-def get_timestamps(df):
-    """Get sorted unique timestamps."""
-    return sorted(df['current_time'].unique())
+def load_dwell_report(lot_id=None):
+    """Run a lot's dwell-time and turnover analysis once per data version."""
+    return analyze_dwell(load_data(lot_id))
+
+# Stage timing spans (per session, only while "Trace stages" is ticked)
+TRACE_REFRESH_SECONDS = 2.0
+
+def trace(stage):
+    """Time a stage into this session's span recorder and the metrics exporter (a no-op unless either is on)."""
+    recorder = st.session_state.get('span_recorder')
+    if metrics_exporter.exporter is not None:
+        return metrics_exporter.exporter.span(stage, recorder)
+    return NULL_SPAN if recorder is None else recorder.span(stage)
 
-def calculate_stats(df_frame):
-    """Calculate statistics for the current frame."""
+# Traced reruns in progress on this script thread (a fragment called by a full rerun is nested)
+_rerun_depth = threading.local()
+
+def traced_rerun(name):
+    """Group the spans of each call (a full or fragment rerun); `name` records its total time.
+    
+    Only the outermost call is counted by the metrics exporter, so a
+    fragment that runs as part of a full rerun is not counted again under
+    its own kind.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = st.session_state.get('span_recorder')
+            metrics = metrics_exporter.exporter
+            if recorder is None and metrics is None:
+                return func(*args, **kwargs)
+            depth = getattr(_rerun_depth, 'value', 0)
+            _rerun_depth.value = depth + 1
+            start = time.perf_counter()
+            try:
+                if recorder is None:
+                    return func(*args, **kwargs)
+                with recorder.rerun(name):
+                    return func(*args, **kwargs)
+            finally:
+                _rerun_depth.value = depth
+                if metrics is not None and depth == 0:
+                    metrics.observe_rerun(name.split('.')[-1], time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def embed_html(html, height):
+    """Embed a self-contained HTML document in an iframe (st.iframe on newer Streamlit)."""
+    if hasattr(st, 'iframe'):
+        st.iframe(html, height=height)
+    else:
+        components.html(html, height=height)
+
+def calculate_stats(df_frame, total_spots):
+    """Calculate statistics for a single frame (StatsCube precomputes these for the timeline)."""
     occupied = df_frame[df_frame['status'] == 'occupied']
     vacant = df_frame[df_frame['status'] == 'vacant']
     
     stats = {
-        'total_spots': TOTAL_SPOTS,
+        'total_spots': total_spots,
         'occupied_count': int(len(occupied)),
         'vacant_count': int(len(vacant)),
-        'occupancy_rate': (len(occupied) / TOTAL_SPOTS) * 100 if TOTAL_SPOTS > 0 else 0,
+        'occupancy_rate': (len(occupied) / total_spots) * 100 if total_spots > 0 else 0,
         'total_vehicles': int(len(occupied)),
         'uber_count': int(len(occupied[occupied['service'] == 'Uber'])),
         'lyft_count': int(len(occupied[occupied['service'] == 'Lyft'])),
@@ -289,17 +373,8 @@ def create_live_status_panel(stats):
     
     max_count = max(s['count'] for s in services_data) if max(s['count'] for s in services_data) > 0 else 1
     
-    # Convert service logos to base64
-    service_logos_base64 = {}
-    for service in services_data:
-        try:
-            logo_path = f"assets/logos/{service['name'].lower()}.png"
-            if os.path.exists(logo_path):
-                service_logos_base64[service['name']] = get_base64_image(logo_path)
-            else:
-                service_logos_base64[service['name']] = ""
-        except:
-            service_logos_base64[service['name']] = ""
+    # Service logos are encoded once per process
+    service_logos_base64 = load_logo_base64()
     
     # Build service rows HTML
     service_rows_html = ""
@@ -319,17 +394,50 @@ def create_live_status_panel(stats):
     
     return panel_html
 
-def create_map_plot(df_frame, img_path, img_width, img_height):
-    """Create a plotly figure with the map, license plate images, service logos, and colored borders."""
-    from PIL import ImageDraw
+def spot_sprites(plate_number, service, plate_size, logo_size):
+    """Return (plate sprite, logo sprite) for an occupied spot.
     
-    # Load map image and convert to base64
-    map_img = Image.open(img_path)
-    buffered = BytesIO()
-    map_img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
-    img_data = f"data:image/png;base64,{img_str}"
+    The plate is None when there is no plate image or it cannot be built (the
+    spot is drawn as a colored dot instead); the logo is None if it is missing.
+    """
+    if pd.isna(plate_number) or not os.path.exists(f'assets/plates/{plate_number}.png'):
+        return None, None
+    try:
+        plate = plate_sprite(plate_number, service, plate_size)
+    except Exception as e:
+        return None, None
+    try:
+        logo = logo_sprite(service, logo_size)
+    except:
+        logo = None
+    return plate, logo
+
+def create_map_plot(df_frame, img_path, img_width, img_height, img_data=None,
+                    vertical_offset=DEFAULT_LOT_CONFIG['vertical_offset']):
+    """Create a plotly figure with the map, license plate images, service logos, and colored borders.
+    
+    Pass the pre-encoded map as `img_data` (see load_map_background) to skip re-encoding it,
+    and the lot's `vertical_offset` to align the plates with its map.
+    """
+    if img_data is None:
+        img_data = encode_background(img_path)['data_uri']
     
+    occupied_data = df_frame[df_frame['status'] == 'occupied']
+    plate_size = 80  # Size of license plate images
+    logo_size = 24  # Size of service logo badges
+    
+    # Bordered plate and logo sprites (from the shared LRU cache)
+    with trace('sprites'):
+        sprites = [
+            spot_sprites(plate_number, service if pd.notna(service) else 'Taxi', plate_size, logo_size)
+            for plate_number, service in zip(occupied_data['plate_number'], occupied_data['service'])
+        ]
+    
+    with trace('figure build'):
+        return build_map_figure(occupied_data, sprites, img_data, img_width, img_height, vertical_offset, logo_size)
+
+def build_map_figure(occupied_data, sprites, img_data, img_width, img_height, vertical_offset, logo_size):
+    """Lay out the map figure from the occupied rows and their prepared sprites."""
     # Create figure
     fig = go.Figure()
     
@@ -349,166 +457,63 @@ def create_map_plot(df_frame, img_path, img_width, img_height):
         )
     )
     
-    # Service colors for borders
-    SERVICE_BORDER_COLORS = {
-        'Uber': '#000000',
-        'Lyft': '#FF00BF',
-        'Waymo': '#00B4A2',
-        'Taxi': '#F5A623'
-    }
-    
-    # Load service logos
-    service_logos = {}
-    logo_paths = {
-        'Uber': 'assets/logos/uber.png',
-        'Lyft': 'assets/logos/lyft.png',
-        'Waymo': 'assets/logos/waymo.png',
-        'Taxi': 'assets/logos/taxi.png'
-    }
-    for service, logo_path in logo_paths.items():
-        try:
-            if os.path.exists(logo_path):
-                service_logos[service] = Image.open(logo_path)
-        except:
-            pass
-    
     # Add license plate images for occupied spots
-    occupied_data = df_frame[df_frame['status'] == 'occupied']
-    plate_size = 80  # Size of license plate images
-    logo_size = 24  # Size of service logo badges
-    border_width = 3  # Width of colored border
-    
-    for idx, row in occupied_data.iterrows():
+    for (idx, row), (plate, logo) in zip(occupied_data.iterrows(), sprites):
         plate_number = row['plate_number']
         service = row['service'] if pd.notna(row['service']) else 'Taxi'
-        border_color = SERVICE_BORDER_COLORS.get(service, '#808080')
         
         # Convert y coordinates: image uses top-left origin, plotly uses bottom-left
         x_coord = row['x']
-        y_coord = img_height - (row['y'] - VERTICAL_OFFSET)
+        y_coord = img_height - (row['y'] - vertical_offset)
         
-        # Try to load license plate image
-        if pd.notna(plate_number):
-            plate_path = f'assets/plates/{plate_number}.png'
-            if os.path.exists(plate_path):
-                try:
-                    plate_img = Image.open(plate_path)
-                    # Resize plate image
-                    plate_img_resized = plate_img.resize((plate_size, int(plate_img.height * plate_size / plate_img.width)), Image.Resampling.LANCZOS)
-                    
-                    # Create bordered plate image
-                    border_size = border_width * 2
-                    bordered_plate = Image.new('RGBA', 
-                                               (plate_img_resized.width + border_size, 
-                                                plate_img_resized.height + border_size),
-                                               (0, 0, 0, 0))
-                    
-                    # Draw colored border
-                    draw = ImageDraw.Draw(bordered_plate)
-                    # Convert hex color to RGB
-                    border_rgb = tuple(int(border_color[i:i+2], 16) for i in (1, 3, 5))
-                    draw.rectangle([(0, 0), 
-                                   (bordered_plate.width - 1, bordered_plate.height - 1)],
-                                  outline=border_rgb, width=border_width)
-                    
-                    # Paste plate image in center
-                    bordered_plate.paste(plate_img_resized, (border_width, border_width), 
-                                       plate_img_resized if plate_img_resized.mode == 'RGBA' else None)
-                    
-                    # Convert to base64
-                    plate_buffered = BytesIO()
-                    bordered_plate.save(plate_buffered, format="PNG")
-                    plate_str = base64.b64encode(plate_buffered.getvalue()).decode()
-                    plate_data = f"data:image/png;base64,{plate_str}"
-                    
-                    # Calculate plate height for positioning
-                    plate_height = bordered_plate.height
-                    
-                    # Add license plate image overlay with border
-                    fig.add_layout_image(
-                        dict(
-                            source=plate_data,
-                            xref="x",
-                            yref="y",
-                            x=x_coord,
-                            y=y_coord,
-                            sizex=bordered_plate.width,
-                            sizey=plate_height,
-                            sizing="stretch",
-                            opacity=1.0,
-                            layer="above",
-                            xanchor="center",
-                            yanchor="middle"
-                        )
+        if plate is not None:
+            plate_data, plate_width, plate_height = plate
+            
+            # Add license plate image overlay with border
+            fig.add_layout_image(
+                dict(
+                    source=plate_data,
+                    xref="x",
+                    yref="y",
+                    x=x_coord,
+                    y=y_coord,
+                    sizex=plate_width,
+                    sizey=plate_height,
+                    sizing="stretch",
+                    opacity=1.0,
+                    layer="above",
+                    xanchor="center",
+                    yanchor="middle"
+                )
+            )
+            
+            # Add service logo badge below the plate (similar to visualize_ride_hailing.py)
+            if logo is not None:
+                # Position logo below plate (y_coord - plate_height/2 - logo_size/2 - 5)
+                logo_y = y_coord - (plate_height / 2) - (logo_size / 2) - 5
+                
+                fig.add_layout_image(
+                    dict(
+                        source=logo[0],
+                        xref="x",
+                        yref="y",
+                        x=x_coord,
+                        y=logo_y,
+                        sizex=logo_size,
+                        sizey=logo_size,
+                        sizing="stretch",
+                        opacity=1.0,
+                        layer="above",
+                        xanchor="center",
+                        yanchor="middle"
                     )
-                    
-                    # Add service logo badge below the plate (similar to visualize_ride_hailing.py)
-                    if service in service_logos:
-                        try:
-                            logo = service_logos[service]
-                            logo_resized = logo.copy()
-                            logo_resized.thumbnail((logo_size, logo_size), Image.Resampling.LANCZOS)
-                            
-                            # Convert logo to base64
-                            logo_buffered = BytesIO()
-                            logo_resized.save(logo_buffered, format="PNG")
-                            logo_str = base64.b64encode(logo_buffered.getvalue()).decode()
-                            logo_data = f"data:image/png;base64,{logo_str}"
-                            
-                            # Position logo below plate (y_coord - plate_height/2 - logo_size/2 - 5)
-                            logo_y = y_coord - (plate_height / 2) - (logo_size / 2) - 5
-                            
-                            fig.add_layout_image(
-                                dict(
-                                    source=logo_data,
-                                    xref="x",
-                                    yref="y",
-                                    x=x_coord,
-                                    y=logo_y,
-                                    sizex=logo_size,
-                                    sizey=logo_size,
-                                    sizing="stretch",
-                                    opacity=1.0,
-                                    layer="above",
-                                    xanchor="center",
-                                    yanchor="middle"
-                                )
-                            )
-                        except:
-                            pass
-                    
-                except Exception as e:
-                    # Fallback to colored dot if image fails
-                    fig.add_trace(go.Scatter(
-                        x=[x_coord],
-                        y=[y_coord],
-                        mode='markers',
-                        marker=dict(
-                            size=15,
-                            color=SERVICE_COLORS.get(service, '#808080'),
-                            line=dict(width=2, color='white')
-                        ),
-                        name=service,
-                        showlegend=False,
-                        hovertemplate=f'<b>{service}</b><br>Plate: {plate_number}<extra></extra>'
-                    ))
-            else:
-                # Fallback to colored dot if file doesn't exist
-                fig.add_trace(go.Scatter(
-                    x=[x_coord],
-                    y=[y_coord],
-                    mode='markers',
-                    marker=dict(
-                        size=15,
-                        color=SERVICE_COLORS.get(service, '#808080'),
-                        line=dict(width=2, color='white')
-                    ),
-                    name=service,
-                    showlegend=False,
-                    hovertemplate=f'<b>{service}</b><br>Plate: {plate_number}<extra></extra>'
-                ))
+                )
         else:
-            # Fallback to colored dot if no plate number
+            # Fallback to colored dot if there is no plate image
+            if pd.notna(plate_number):
+                hovertemplate = f'<b>{service}</b><br>Plate: {plate_number}<extra></extra>'
+            else:
+                hovertemplate = f'<b>{service}</b><extra></extra>'
             fig.add_trace(go.Scatter(
                 x=[x_coord],
                 y=[y_coord],
@@ -520,7 +525,7 @@ def create_map_plot(df_frame, img_path, img_width, img_height):
                 ),
                 name=service,
                 showlegend=False,
-                hovertemplate=f'<b>{service}</b><extra></extra>'
+                hovertemplate=hovertemplate
             ))
     
     # Add invisible traces for legend (positioned off-screen)
@@ -573,65 +578,36 @@ def create_map_plot(df_frame, img_path, img_width, img_height):
     
     return fig
 
-# Main app
-def main():
-    # Load data
-    df = load_data()
-    timestamps = get_timestamps(df)
-    
-    # Debug: Print unique timestamps
-    st.sidebar.write("### 🔍 Debug Info")
-    st.sidebar.write(f"Unique timestamps found: {len(timestamps)}")
-    if len(timestamps) > 0:
-        st.sidebar.write(f"First: {timestamps[0]}")
-        st.sidebar.write(f"Last: {timestamps[-1]}")
-    
-    # Header
-    st.markdown('<div class="main-header"><h1>✈️ SKY HARBOR AIRPORT - Ride-Hailing Pickup Zone</h1></div>', unsafe_allow_html=True)
-    
-    # Sidebar for controls
-    with st.sidebar:
-        st.header("⚙️ Controls")
-        
-        # Auto-refresh option
-        auto_refresh = st.checkbox("🔄 Auto-refresh Animation", value=False)
-        refresh_interval = st.slider("Refresh Interval (seconds)", 0.5, 5.0, 2.0, 0.5) if auto_refresh else None
-        
-        st.markdown("---")
-        st.markdown("### 📊 Data Info")
-        st.write(f"Total timestamps: {len(timestamps)}")
-        if len(timestamps) > 0:
-            st.write(f"Date range:")
-            st.write(f"{timestamps[0].strftime('%Y-%m-%d %H:%M')} to {timestamps[-1].strftime('%Y-%m-%d %H:%M')}")
-    
-    # Auto-refresh logic
-    if auto_refresh and len(timestamps) > 0:
-        time.sleep(refresh_interval)
-        st.session_state.selected_time = (st.session_state.selected_time + 1) % len(timestamps)
-        st.rerun()
-    
-    # Time slider - filter to only available timestamps
-    if len(timestamps) > 0:
-        st.slider(
-            "⏰ Select Time",
-            min_value=0,
-            max_value=len(timestamps) - 1,
-            key="selected_time"
-        )
-    else:
-        st.error("No timestamps found in data!")
-        return
-    
-    # Display selected timestamp
-    current_timestamp = timestamps[st.session_state.selected_time]
-    formatted_time = current_timestamp.strftime('%B %d, %Y at %I:%M %p')
-    st.markdown(f"<div style='text-align: center; color: #b0b0b0; margin-bottom: 1rem;'><strong>{formatted_time}</strong></div>", unsafe_allow_html=True)
-    
-    # Filter data for current timestamp
-    df_frame = df[df['current_time'] == current_timestamp].copy()
-    stats = calculate_stats(df_frame)
-    
-    # Top row: Metric cards
+# ============================================================================
+# STATIC ASSETS
+# ============================================================================
+
+SERVICE_BREAKDOWN = [
+    ('Uber', '#000000'),
+    ('Lyft', '#FF00BF'),
+    ('Waymo', '#00B4A2'),
+    ('Taxi', '#F5A623')
+]
+
+@st.cache_resource
+def load_logo_base64():
+    """Base64-encode the service logos once per process (empty string if missing)."""
+    logos = {}
+    for service, _ in SERVICE_BREAKDOWN:
+        try:
+            logos[service] = get_base64_image(f"assets/logos/{service.lower()}.png")
+        except:
+            logos[service] = ""
+    return logos
+
+# Streamlit >= 1.37 reruns a fragment on its own when a widget inside it changes
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+# ============================================================================
+# TIMELINE SECTIONS
+# ============================================================================
+
+def render_metric_cards(stats):
     col1, col2, col3 = st.columns(3)
     
     with col1:
@@ -654,94 +630,46 @@ def main():
             value=stats['total_vehicles'],
             delta=None
         )
-    
-    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
-    
-    # Service breakdown section
+
+def render_service_breakdown(stats):
     st.markdown("### 🚗 Service Breakdown")
     
-    # Calculate percentages
     total_vehicles = max(stats['total_vehicles'], 1)
-    uber_count = int(stats['uber_count'])
-    lyft_count = int(stats['lyft_count'])
-    waymo_count = int(stats['waymo_count'])
-    taxi_count = int(stats['taxi_count'])
-    
-    uber_pct = (uber_count / total_vehicles) * 100
-    lyft_pct = (lyft_count / total_vehicles) * 100
-    waymo_pct = (waymo_count / total_vehicles) * 100
-    taxi_pct = (taxi_count / total_vehicles) * 100
-    
-    # Convert logos to base64
-    try:
-        uber_logo_base64 = get_base64_image("assets/logos/uber.png")
-    except:
-        uber_logo_base64 = ""
-    try:
-        lyft_logo_base64 = get_base64_image("assets/logos/lyft.png")
-    except:
-        lyft_logo_base64 = ""
-    try:
-        waymo_logo_base64 = get_base64_image("assets/logos/waymo.png")
-    except:
-        waymo_logo_base64 = ""
-    try:
-        taxi_logo_base64 = get_base64_image("assets/logos/taxi.png")
-    except:
-        taxi_logo_base64 = ""
+    logos = load_logo_base64()
     
     # Create HTML for service breakdown
-    service_html = f"""
-    <div style="display: flex; justify-content: space-around; align-items: flex-start; margin: 20px 0;">
-        <div style="text-align: center; width: 22%;">
-            <img src="data:image/png;base64,{uber_logo_base64}" style="width: 80px; height: 80px; object-fit: contain;">
-            <h2 style="color: #000000; margin: 10px 0;">{uber_count}</h2>
-            <div style="background: #333; border-radius: 10px; height: 20px; width: 100%;">
-                <div style="background: #000000; height: 100%; width: {uber_pct}%; border-radius: 10px;"></div>
-            </div>
-            <p style="color: #888; margin-top: 5px;">{uber_pct:.1f}% of vehicles</p>
-        </div>
-        <div style="text-align: center; width: 22%;">
-            <img src="data:image/png;base64,{lyft_logo_base64}" style="width: 80px; height: 80px; object-fit: contain;">
-            <h2 style="color: #FF00BF; margin: 10px 0;">{lyft_count}</h2>
-            <div style="background: #333; border-radius: 10px; height: 20px; width: 100%;">
-                <div style="background: #FF00BF; height: 100%; width: {lyft_pct}%; border-radius: 10px;"></div>
-            </div>
-            <p style="color: #888; margin-top: 5px;">{lyft_pct:.1f}% of vehicles</p>
-        </div>
+    columns_html = ""
+    for service, color in SERVICE_BREAKDOWN:
+        count = int(stats[f'{service.lower()}_count'])
+        pct = (count / total_vehicles) * 100
+        columns_html += f"""
         <div style="text-align: center; width: 22%;">
-            <img src="data:image/png;base64,{waymo_logo_base64}" style="width: 80px; height: 80px; object-fit: contain;">
-            <h2 style="color: #00B4A2; margin: 10px 0;">{waymo_count}</h2>
+            <img src="data:image/png;base64,{logos[service]}" style="width: 80px; height: 80px; object-fit: contain;">
+            <h2 style="color: {color}; margin: 10px 0;">{count}</h2>
             <div style="background: #333; border-radius: 10px; height: 20px; width: 100%;">
-                <div style="background: #00B4A2; height: 100%; width: {waymo_pct}%; border-radius: 10px;"></div>
+                <div style="background: {color}; height: 100%; width: {pct}%; border-radius: 10px;"></div>
             </div>
-            <p style="color: #888; margin-top: 5px;">{waymo_pct:.1f}% of vehicles</p>
-        </div>
-        <div style="text-align: center; width: 22%;">
-            <img src="data:image/png;base64,{taxi_logo_base64}" style="width: 80px; height: 80px; object-fit: contain;">
-            <h2 style="color: #F5A623; margin: 10px 0;">{taxi_count}</h2>
-            <div style="background: #333; border-radius: 10px; height: 20px; width: 100%;">
-                <div style="background: #F5A623; height: 100%; width: {taxi_pct}%; border-radius: 10px;"></div>
-            </div>
-            <p style="color: #888; margin-top: 5px;">{taxi_pct:.1f}% of vehicles</p>
-        </div>
+            <p style="color: #888; margin-top: 5px;">{pct:.1f}% of vehicles</p>
+        </div>"""
+    
+    service_html = f"""
+    <div style="display: flex; justify-content: space-around; align-items: flex-start; margin: 20px 0;">{columns_html}
     </div>
     """
     
     st.markdown(service_html, unsafe_allow_html=True)
-    
-    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
-    
-    # Map section with Live Status panel
+
+def render_map_section(lot, df_frame, stats, background, playback, frame_seconds):
     st.markdown("### 🗺️ Parking Map")
-    
-    # Load map dimensions
-    try:
-        map_img = Image.open('assets/map.png')
-        img_width, img_height = map_img.size
-    except:
-        img_width, img_height = 1280, 960
-        st.error("Could not load map image")
+    img_width, img_height = background['width'], background['height']
+    
+    if playback:
+        # One player with every timestamp; the browser animates it locally
+        with trace('data load'):
+            html = load_playback_html(lot.lot_id, background['low_bandwidth'], frame_seconds)
+        with trace('chart serialization'):
+            embed_html(html, height=int(650 * img_height / img_width) + 110)
+        st.caption("Playback runs in your browser. The cards above follow the time slider.")
         return
     
     # Create two-column layout
@@ -749,14 +677,261 @@ def main():
     
     with map_col:
         # Create and display map
-        fig = create_map_plot(df_frame, 'assets/map.png', img_width, img_height)
-        st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
+        fig = create_map_plot(df_frame, lot.map_path, img_width, img_height, background['data_uri'],
+                              lot.vertical_offset)
+        with trace('chart serialization'):
+            st.plotly_chart(fig, use_container_width=True, config={'displayModeBar': False})
     
     with panel_col:
         # Generate Live Status panel HTML
         panel_html = create_live_status_panel(stats)
         st.markdown(panel_html, unsafe_allow_html=True)
 
+@traced_rerun('rerun.timeline')
+def render_timeline(lot, background, playback=False, frame_seconds=None, advance_seconds=None):
+    """Slider plus everything that depends on the selected time.
+    
+    Runs as a fragment, so moving the slider (or an auto-advance tick)
+    reruns only this function, not the header, sidebar or asset loading.
+    """
+    with trace('data load'):
+        frame_index = load_frame_index(lot.lot_id)
+        stats_cube = load_stats_cube(lot.lot_id)
+    timestamps = frame_index.timestamps
+    
+    # Lots can have different timelines
+    if st.session_state.selected_time >= len(timestamps):
+        st.session_state.selected_time = 0
+    
+    # Auto-advance: step once per interval (fragment reruns from the slider don't count)
+    if advance_seconds is not None:
+        now = time.monotonic()
+        if now - st.session_state.get('last_advance', 0.0) >= advance_seconds * 0.9:
+            st.session_state.last_advance = now
+            st.session_state.selected_time = (st.session_state.selected_time + 1) % len(timestamps)
+    
+    st.slider(
+        "⏰ Select Time",
+        min_value=0,
+        max_value=len(timestamps) - 1,
+        key="selected_time"
+    )
+    
+    # Display selected timestamp
+    current_timestamp = timestamps[st.session_state.selected_time]
+    formatted_time = current_timestamp.strftime('%B %d, %Y at %I:%M %p')
+    st.markdown(f"<div style='text-align: center; color: #b0b0b0; margin-bottom: 1rem;'><strong>{formatted_time}</strong></div>", unsafe_allow_html=True)
+    
+    # Look up the rows and precomputed statistics for the current timestamp
+    with trace('frame filter'):
+        df_frame = frame_index.frame_at(st.session_state.selected_time)
+    with trace('stats'):
+        stats = stats_cube.at(st.session_state.selected_time)
+    
+    render_metric_cards(stats)
+    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
+    render_service_breakdown(stats)
+    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
+    render_map_section(lot, df_frame, stats, background, playback, frame_seconds)
+
+@traced_rerun('rerun.live')
+def render_live(lot, source, background):
+    """Poll the live feed and render the latest state of every slot.
+    
+    Each poll applies only the records appended since the previous one.
+    """
+    try:
+        with trace('data load'):
+            feed = load_live_feed(source)
+            feed.refresh()
+    except Exception as e:
+        st.error(f"Could not read live feed {source}: {e}")
+        return
+    with trace('frame filter'):
+        latest_time, df_frame = feed.snapshot()
+    
+    if not feed.connected:
+        st.warning(f"Lost the connection to {source}; reconnecting. The state below may be stale.")
+    
+    if latest_time is None:
+        st.info(f"Waiting for updates on {source} ... (try `python replay_feed.py`)")
+        return
+    
+    formatted_time = latest_time.strftime('%B %d, %Y at %I:%M %p')
+    st.markdown(f"<div style='text-align: center; color: #b0b0b0; margin-bottom: 1rem;'><strong>📡 LIVE - {formatted_time}</strong></div>", unsafe_allow_html=True)
+    
+    with trace('stats'):
+        stats = calculate_stats(df_frame, lot.capacity)
+    render_metric_cards(stats)
+    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
+    render_service_breakdown(stats)
+    st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
+    render_map_section(lot, df_frame, stats, background, False, None)
+    st.caption(f"{feed.state.applied} updates applied, state version {feed.state.version}")
+
+# ============================================================================
+# DWELL & TURNOVER
+# ============================================================================
+
+def render_dwell_analytics(lot):
+    """Dwell-time distributions per service and turnover per slot."""
+    report = load_dwell_report(lot.lot_id)
+    visits = report['visits']
+    completed = visits[~visits['censored']]
+    slots = report['slots']
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(label="Visits", value=len(visits))
+    with col2:
+        median_dwell = completed['dwell_minutes'].median() if len(completed) > 0 else 0
+        st.metric(label="Median Dwell", value=f"{median_dwell:.1f} min")
+    with col3:
+        turnover = slots['turnover_per_hour'].mean() if 'turnover_per_hour' in slots else 0
+        st.metric(label="Turnover per Slot", value=f"{turnover:.1f} / hour")
+    st.caption(f"{int(visits['censored'].sum())} visits cut off by the start or end of the data "
+               f"are left out of the dwell distributions. Sampling interval: {report['interval']}.")
+    
+    st.markdown("### ⏱️ Dwell Time by Service")
+    if len(report['histogram']) > 0:
+        histogram = report['histogram'].copy()
+        histogram.index = [f"{start}-{start + HISTOGRAM_BIN_MINUTES} min" for start in histogram.index]
+        st.bar_chart(histogram, sort=False, height=260)
+    st.dataframe(report['services'].round(1), use_container_width=True)
+    
+    st.markdown("### 🔁 Slot Turnover")
+    st.bar_chart(slots[['turnover_per_hour']], height=220)
+    st.dataframe(slots.round(2), use_container_width=True)
+
+# ============================================================================
+# STAGE TIMINGS
+# ============================================================================
+
+def render_stage_timings():
+    """Rolling per-stage timings of this session's reruns, with a JSON download."""
+    recorder = st.session_state.get('span_recorder')
+    if recorder is None:
+        return
+    st.markdown("### ⏱️ Stage Timings")
+    summary = recorder.summary()
+    if not summary:
+        st.caption("No reruns traced yet.")
+        return
+    
+    st.caption(f"Last {recorder.window} reruns per stage, in ms ({recorder.rerun_count} traced)")
+    table = pd.DataFrame(summary).T[['last', 'p50', 'p95', 'max', 'count']]
+    st.dataframe(table.round(1), use_container_width=True)
+    
+    stage = st.selectbox("Histogram", list(summary), key='trace_histogram_stage')
+    histogram = pd.DataFrame({'reruns': recorder.histogram(stage)}, index=bucket_labels())
+    st.bar_chart(histogram, sort=False, height=160)
+    st.download_button("Download spans (JSON)", recorder.to_json(), file_name='stage_timings.json',
+                       mime='application/json')
+
+# Main app
+@traced_rerun('rerun.full')
+def main():
+    # Pick the lot first; only its data is loaded
+    registry = load_lot_registry()
+    lot_id = registry.default
+    if len(registry) > 1:
+        lot_id = st.sidebar.selectbox("🅿️ Pickup Lot", registry.ids(),
+                                      format_func=lambda i: registry.get(i).name)
+    lot = registry.get(lot_id)
+    
+    # Load data
+    with trace('data load'):
+        frame_index = load_frame_index(lot.lot_id)
+    timestamps = frame_index.timestamps
+    
+    # Debug: Print unique timestamps
+    st.sidebar.write("### 🔍 Debug Info")
+    st.sidebar.write(f"Unique timestamps found: {len(timestamps)}")
+    if len(timestamps) > 0:
+        st.sidebar.write(f"First: {timestamps[0]}")
+        st.sidebar.write(f"Last: {timestamps[-1]}")
+    sprite_stats = sprite_cache.stats()
+    st.sidebar.write(f"Sprite cache: {sprite_stats['size']}/{sprite_stats['max_entries']} entries, "
+                     f"{sprite_stats['hits']} hits, {sprite_stats['misses']} misses "
+                     f"({sprite_stats['hit_rate']:.0%} hit rate)")
+    
+    # Header
+    st.markdown(f'<div class="main-header"><h1>✈️ SKY HARBOR AIRPORT - {lot.name}</h1></div>', unsafe_allow_html=True)
+    
+    # Sidebar for controls
+    with st.sidebar:
+        st.header("⚙️ Controls")
+        
+        # Playback runs in the browser; the server sends the timeline once
+        playback = st.checkbox("▶️ Play Animation", value=False)
+        frame_seconds = st.slider("Frame Duration (seconds)", 0.5, 5.0, 2.0, 0.5) if playback else None
+        
+        # Step the slider, cards and panel on a timer (reruns only the timeline fragment)
+        auto_advance = st.checkbox("🔄 Auto-advance Time", value=False) if fragment is not None else False
+        advance_seconds = st.slider("Advance Interval (seconds)", 0.5, 5.0, 2.0, 0.5) if auto_advance else None
+        
+        # Follow an append-only feed of slot updates instead of the workbook
+        live = st.checkbox("📡 Live feed", value=False)
+        live_source = st.text_input("Feed (JSONL/CSV path or tcp://host:port)", lot.feed_path) if live else None
+        
+        # Smaller, quantized map for kiosk clients on slow links
+        low_bandwidth = st.checkbox("📉 Low-bandwidth map", value=False)
+        
+        # Time each stage of a rerun (kept per session, shown at the bottom of the sidebar)
+        tracing = st.checkbox("⏱️ Trace stages", value=False)
+        if tracing and 'span_recorder' not in st.session_state:
+            st.session_state.span_recorder = SpanRecorder()
+        elif not tracing:
+            st.session_state.pop('span_recorder', None)
+        
+        st.markdown("---")
+        st.markdown("### 📊 Data Info")
+        st.write(f"Total timestamps: {len(timestamps)}")
+        if len(timestamps) > 0:
+            st.write(f"Date range:")
+            st.write(f"{timestamps[0].strftime('%Y-%m-%d %H:%M')} to {timestamps[-1].strftime('%Y-%m-%d %H:%M')}")
+    
+    if len(timestamps) == 0:
+        st.error("No timestamps found in data!")
+        return
+    
+    # Load the shared, pre-encoded map background
+    try:
+        with trace('data load'):
+            background = dict(load_map_background(lot.lot_id, low_bandwidth), low_bandwidth=low_bandwidth)
+    except:
+        st.error("Could not load map image")
+        return
+    
+    occupancy_tab, dwell_tab = st.tabs(["🗺️ Occupancy", "⏱️ Dwell & Turnover"])
+    
+    with dwell_tab:
+        render_dwell_analytics(lot)
+    
+    with occupancy_tab:
+        if live:
+            if fragment is not None:
+                fragment(render_live, run_every=LIVE_POLL_SECONDS)(lot, live_source, background)
+            else:
+                render_live(lot, live_source, background)
+        else:
+            if fragment is not None:
+                fragment(render_timeline, run_every=advance_seconds)(lot, background, playback, frame_seconds, advance_seconds)
+            else:
+                render_timeline(lot, background, playback, frame_seconds)
+            
+            # Full-day occupancy timeline (read straight from the statistics cube)
+            st.markdown('<div class="section-spacing"></div>', unsafe_allow_html=True)
+            st.markdown("### 📈 Occupancy Timeline")
+            st.line_chart(load_stats_cube(lot.lot_id).table[['occupancy_rate']], height=220)
+    
+    # Stage timings refresh on a timer, so fragment-only reruns show up too
+    if tracing:
+        with st.sidebar:
+            if fragment is not None:
+                fragment(render_stage_timings, run_every=TRACE_REFRESH_SECONDS)()
+            else:
+                render_stage_timings()
+
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,439 @@
+"""
+Headless frame service for signage screens that cannot run Streamlit.
+
+Serves the visualizer's frames and statistics over plain HTTP:
+
+    python frame_server.py --port 8541 [--lot <lot_id>] [--engine composite]
+
+    GET /frame?ts=2024-06-01T18:05   PNG of the frame at (or just before) ts
+    GET /frame?ts=18:05              time of day on the data's first date
+    GET /frame                       the current frame (latest at or before now)
+    GET /stats?ts=...                the LIVE STATUS numbers for that frame (JSON)
+    GET /status                      cache and render counters (JSON)
+
+Every response carries an ETag built from the data version (a hash of the
+lot, engine, workbook and map) and the frame position, so a screen that
+sends If-None-Match gets a 304 without anything being rendered or read.
+Rendered PNGs are kept in a bounded in-memory LRU and a bounded on-disk
+cache under assets/.cache/frames/<data version>/, so a changed workbook
+never serves stale frames. Frames are rendered in a worker pool, and
+concurrent requests for the same frame wait for a single render.
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+import render_pool
+from lots import LOT_ENV_VAR
+from render_pool import resolve_workers
+from ride_data import CACHE_DIR_NAME, SNAPSHOT_VERSION, file_sha256
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8541
+
+# Cache bounds (bytes of PNG data)
+MEMORY_CACHE_BYTES = 64 * 1024 * 1024
+DISK_CACHE_BYTES = 512 * 1024 * 1024
+
+FRAME_CACHE_DIR = os.path.join('assets', CACHE_DIR_NAME, 'frames')
+
+# Visualizer module, imported once the lot is known (see load_visualizer)
+vis = None
+
+# ============================================================================
+# RENDERING
+# ============================================================================
+
+def load_visualizer(lot_id=None):
+    """Import visualize_ride_hailing for `lot_id` (it loads the lot's data on import)."""
+    global vis
+    if vis is None:
+        if lot_id:
+            os.environ[LOT_ENV_VAR] = lot_id
+        import visualize_ride_hailing
+        vis = visualize_ride_hailing
+    return vis
+
+def init_frame_worker(lot_id):
+    """Render process setup: same lot, Agg backend, background decoded once."""
+    load_visualizer(lot_id).init_render_worker()
+
+def render_png(engine, timestamp):
+    """Render one frame with a RENDER_ENGINES entry and return it as PNG bytes."""
+    frame = vis.RENDER_ENGINES[engine](timestamp)
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, format='PNG')
+    return buf.getvalue()
+
+def file_stamps(directory, extension='.png'):
+    """(name, size, mtime) for every `extension` file in `directory`, sorted by name."""
+    if not os.path.isdir(directory):
+        return []
+    stamps = []
+    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if entry.is_file() and entry.name.lower().endswith(extension):
+            stat = entry.stat()
+            stamps.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return stamps
+
+def data_version(lot, engine):
+    """Short hash of everything a rendered frame depends on.
+
+    Covers the workbook and map (content hashes), the plate images and
+    logos (names, sizes and mtimes) and the rendering code (content hashes
+    of the visualizer and render_pool), so a change to any of them starts
+    a new cache version instead of serving stale frames.
+    """
+    digest = hashlib.sha256()
+    digest.update(f'{SNAPSHOT_VERSION}:{lot.lot_id}:{engine}'.encode())
+    for path in (lot.data_path, lot.map_path, vis.__file__, render_pool.__file__):
+        digest.update((file_sha256(path) if os.path.exists(path) else 'missing').encode())
+    images = file_stamps(vis.PLATE_DIR)
+    for service, path in sorted(vis.LOGO_PATHS.items()):
+        stat = os.stat(path) if os.path.exists(path) else None
+        images.append((service, stat.st_size, stat.st_mtime_ns) if stat else (service, 'missing'))
+    digest.update(repr(images).encode())
+    return digest.hexdigest()[:16]
+
+# ============================================================================
+# CACHES
+# ============================================================================
+
+class MemoryCache:
+    """Least-recently-used PNG cache bounded by total bytes."""
+
+    def __init__(self, max_bytes=MEMORY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def __len__(self):
+        return len(self._entries)
+
+class DiskCache:
+    """PNG files under `root`/<version>/, oldest-used evicted past `max_bytes`.
+
+    The byte budget covers every version under `root`, so frames of an old
+    data version are the first to go once the data changes.
+    """
+
+    def __init__(self, root, version, max_bytes=DISK_CACHE_BYTES):
+        self.root = root
+        self.directory = os.path.join(root, version)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self.nbytes = sum(size for _, size, _ in self._files())
+
+    def _files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.png')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write cached frame {path}: {e}")
+            return
+        with self._lock:
+            self.nbytes += len(data)
+            if self.nbytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = sorted(self._files(), key=lambda entry: entry[2])
+        self.nbytes = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if self.nbytes <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.nbytes -= size
+            except OSError:
+                pass
+
+# ============================================================================
+# FRAME SERVICE
+# ============================================================================
+
+class FrameService:
+    """Timestamp lookup, caching and single-flight rendering for the HTTP handler."""
+
+    def __init__(self, engine='matplotlib', workers=1, lot_id=None,
+                 memory_bytes=MEMORY_CACHE_BYTES, disk_bytes=DISK_CACHE_BYTES, cache_dir=FRAME_CACHE_DIR):
+        load_visualizer(lot_id)
+        if engine not in vis.RENDER_ENGINES:
+            raise ValueError(f"Unknown engine {engine!r} (choose from {', '.join(sorted(vis.RENDER_ENGINES))})")
+        self.engine = engine
+        self.lot = vis.LOT
+        self.timestamps = pd.DatetimeIndex(vis.unique_timestamps)
+        self.version = data_version(self.lot, engine)
+        self.memory = MemoryCache(memory_bytes)
+        self.disk = DiskCache(cache_dir, self.version, disk_bytes) if disk_bytes > 0 else None
+        self.counters = {'requests': 0, 'not_modified': 0, 'memory_hits': 0, 'disk_hits': 0,
+                         'renders': 0, 'coalesced': 0, 'render_seconds': 0.0}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        # Decode the background before forking, so workers do not read the shared file handle at once
+        vis.init_render_worker()
+
+        # Matplotlib's pyplot state is per process: one render thread, or a process pool
+        workers = resolve_workers(workers)
+        if workers == 1:
+            self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='frame-render')
+        else:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=init_frame_worker,
+                                            initargs=(self.lot.lot_id,))
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def position(self, ts=None):
+        """Position of the frame shown at `ts` (the latest timestamp at or before it).
+
+        `ts` is an ISO timestamp, a time of day (applied to the data's first
+        date), or None / 'now' for the current time. Times before the data
+        start show the first frame.
+        """
+        if ts is None or ts == '' or ts == 'now':
+            when = pd.Timestamp.now()
+        else:
+            when = pd.Timestamp(ts)
+            if ':' in ts and '-' not in ts and 'T' not in ts:
+                when = pd.Timestamp.combine(self.timestamps[0].date(), when.time())
+        if self.timestamps.tz is not None and when.tz is None:
+            when = when.tz_localize(self.timestamps.tz)
+        return max(int(self.timestamps.searchsorted(when, side='right')) - 1, 0)
+
+    def etag(self, kind, position):
+        return f'"{self.version}-{kind}-{position}"'
+
+    def frame_png(self, position):
+        """PNG bytes of the frame at `position`, rendered at most once however many ask."""
+        data = self.memory.get(position)
+        if data is not None:
+            self._count('memory_hits')
+            return data
+
+        with self._lock:
+            # A leader may have finished since the check above: it caches the
+            # frame before leaving _inflight, so look again under the lock
+            data = self.memory.get(position)
+            future = self._inflight.get(position)
+            leader = data is None and future is None
+            if leader:
+                future = self._inflight[position] = Future()
+        if data is not None:
+            self._count('memory_hits')
+            return data
+        if not leader:
+            self._count('coalesced')
+            return future.result()
+
+        try:
+            data = self.disk.get(position) if self.disk is not None else None
+            if data is not None:
+                self._count('disk_hits')
+            else:
+                start = time.perf_counter()
+                data = self.pool.submit(render_png, self.engine, self.timestamps[position]).result()
+                self._count('renders')
+                self._count('render_seconds', time.perf_counter() - start)
+                if self.disk is not None:
+                    self.disk.put(position, data)
+            self.memory.put(position, data)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[position]
+
+    def stats(self, position):
+        """LIVE STATUS statistics for the frame at `position` as plain JSON types."""
+        stats = {key: value.item() if isinstance(value, np.generic) else value
+                 for key, value in vis.stats_cube.at(position).items()}
+        return {'timestamp': self.timestamps[position].isoformat(), 'lot_id': self.lot.lot_id, **stats}
+
+    def status(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'lot_id': self.lot.lot_id,
+            'engine': self.engine,
+            'data_version': self.version,
+            'frames': len(self.timestamps),
+            'memory_cache': {'frames': len(self.memory), 'bytes': self.memory.nbytes,
+                             'max_bytes': self.memory.max_bytes},
+            'disk_cache': None if self.disk is None else {
+                'directory': self.disk.directory, 'bytes': self.disk.nbytes, 'max_bytes': self.disk.max_bytes},
+            **counters
+        }
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+def make_handler(service):
+    """Request handler class bound to a FrameService."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            ts = parse_qs(url.query).get('ts', [None])[0]
+            service._count('requests')
+            if url.path == '/status':
+                self.send_body(json.dumps(service.status(), indent=2).encode(), 'application/json')
+                return
+            if url.path not in ('/frame', '/stats'):
+                self.send_error(404, "Use /frame?ts=..., /stats?ts=... or /status")
+                return
+
+            try:
+                position = service.position(ts)
+            except (ValueError, TypeError) as e:
+                self.send_error(400, f"Bad ts {ts!r}: {e}")
+                return
+
+            kind = url.path.lstrip('/')
+            etag = service.etag(kind, position)
+            if etag in self.headers.get('If-None-Match', ''):
+                service._count('not_modified')
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            try:
+                if kind == 'frame':
+                    body, content_type = service.frame_png(position), 'image/png'
+                else:
+                    body, content_type = json.dumps(service.stats(position)).encode(), 'application/json'
+            except Exception as e:
+                self.send_error(500, f"Could not render frame: {e}")
+                return
+            self.send_body(body, content_type, etag, service.timestamps[position])
+
+        def send_body(self, body, content_type, etag=None, timestamp=None):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            # Screens may keep the response but must revalidate it (cheap with the ETag)
+            self.send_header('Cache-Control', 'no-cache')
+            if etag is not None:
+                self.send_header('ETag', etag)
+            if timestamp is not None:
+                self.send_header('X-Frame-Timestamp', timestamp.isoformat())
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def serve(service, port=DEFAULT_PORT, host=DEFAULT_HOST):
+    """Create the threaded HTTP server for `service` (call serve_forever() on it)."""
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    return server
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve ride-hailing frames and statistics over HTTP.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--lot', default=None, help="Pickup lot (default: $RIDE_HAILING_LOT or the registry default)")
+    parser.add_argument('--engine', default='matplotlib',
+                        help="Frame renderer from visualize_ride_hailing.RENDER_ENGINES")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Render processes (1 = one render thread in this process, 0 = all cores)")
+    parser.add_argument('--memory-cache-mb', type=float, default=MEMORY_CACHE_BYTES / 2**20)
+    parser.add_argument('--disk-cache-mb', type=float, default=DISK_CACHE_BYTES / 2**20,
+                        help="On-disk frame cache budget (0 disables it)")
+    args = parser.parse_args()
+
+    try:
+        service = FrameService(args.engine, args.workers, args.lot,
+                               memory_bytes=int(args.memory_cache_mb * 2**20),
+                               disk_bytes=int(args.disk_cache_mb * 2**20))
+    except ValueError as e:
+        parser.error(str(e))
+    server = serve(service, args.port, args.host)
+    print(f"Serving {service.lot.name} frames on http://{args.host}:{args.port}/frame "
+          f"({service.engine} engine, data version {service.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
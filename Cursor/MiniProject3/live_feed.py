@@ -0,0 +1,321 @@
+"""
+Live slot-update feed for the dashboard.
+
+A feed is an append-only stream of slot updates with the same columns as
+ride_hailing.xlsx (current_time, slot_id, x, y, reservation_id, rider_id,
+driver_id, plate_number, service), one update per line. A record with only
+`current_time` is a heartbeat that advances the clock. A feed can be a JSONL
+file, a CSV file with a header row, or a local TCP socket sending JSONL.
+
+FeedTailer / SocketFeed return only the lines added since the last poll, and
+LiveOccupancy applies them to the current state of every slot, so keeping up
+with the feed costs O(changed slots) per poll and history is never re-read.
+replay_feed.py writes ride_hailing.xlsx into a feed for offline testing.
+"""
+
+import csv
+import io
+import json
+import os
+import socket
+import threading
+
+import pandas as pd
+
+from ride_data import add_derived_columns
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DEFAULT_FEED_PATH = 'assets/live_feed.jsonl'
+
+# Seconds a poll waits when reconnecting to a closed socket feed
+RECONNECT_TIMEOUT = 1.0
+
+FEED_COLUMNS = ['current_time', 'slot_id', 'x', 'y', 'reservation_id', 'rider_id',
+                'driver_id', 'plate_number', 'service']
+
+# Columns whose values may be text or numbers from one record to the next
+TEXT_COLUMNS = ['reservation_id', 'rider_id', 'driver_id', 'plate_number', 'service']
+
+# ============================================================================
+# RECORD FORMAT
+# ============================================================================
+
+def _clean(value):
+    """Convert a pandas/NumPy cell to a JSON-friendly value (None for missing)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+def row_to_record(row):
+    """Turn a data row (dict or Series) into a feed record dict."""
+    return {column: _clean(row.get(column)) for column in FEED_COLUMNS}
+
+def _parse_csv_value(column, value):
+    if value == '':
+        return None
+    if column in ('x', 'y'):
+        return float(value)
+    if column == 'slot_id':
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    return value
+
+# ============================================================================
+# FEED READERS
+# ============================================================================
+
+class FeedTailer:
+    """Incrementally read new records appended to a JSONL or CSV feed file.
+
+    The file offset is remembered between polls and a trailing line without
+    a newline is left for the next poll, so a record being written is never
+    read half-way. If the file shrinks (rotated or recreated), reading
+    restarts from the beginning and `reset` is set.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self.offset = 0
+        self.header = None
+        self.reset = False
+
+    def poll(self):
+        """Return the list of records appended since the last poll."""
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.offset:
+            self.offset = 0
+            self.header = None
+            self.reset = True
+
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        self.offset += end
+
+        lines = data[:end].decode('utf-8').splitlines()
+        return self._parse(lines)
+
+    def _parse(self, lines):
+        if not self.is_csv:
+            return [json.loads(line) for line in lines if line.strip()]
+
+        if self.header is None and lines:
+            self.header = next(csv.reader([lines[0]]))
+            lines = lines[1:]
+        records = []
+        for values in csv.reader(io.StringIO('\n'.join(lines))):
+            if values:
+                records.append({column: _parse_csv_value(column, value)
+                                for column, value in zip(self.header, values)})
+        return records
+
+class SocketFeed:
+    """Read JSONL records from a local TCP socket without blocking.
+
+    If the producer closes the connection (e.g. replay_feed.py restarts),
+    `connected` turns False and every later poll tries to reconnect. A new
+    connection starts the producer's stream over, so `reset` is set.
+
+    Usage:
+        feed = SocketFeed('127.0.0.1', 9999)
+        records = feed.poll()
+    """
+
+    def __init__(self, host, port, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.sock = None
+        self.buffer = b''
+        self.reset = False
+        self.connected = False
+        self._connect(timeout)
+
+    def _connect(self, timeout):
+        self.sock = socket.create_connection((self.host, self.port), timeout=timeout)
+        self.sock.setblocking(False)
+        self.connected = True
+
+    def poll(self):
+        """Return the complete records received since the last poll."""
+        if not self.connected:
+            try:
+                self._connect(RECONNECT_TIMEOUT)
+            except OSError:
+                return []
+            self.buffer = b''
+            self.reset = True
+
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                chunk = b''
+            if not chunk:
+                # The producer went away: keep what arrived and reconnect on the next poll
+                self.close()
+                break
+            self.buffer += chunk
+
+        end = self.buffer.rfind(b'\n') + 1
+        lines, self.buffer = self.buffer[:end], self.buffer[end:]
+        return [json.loads(line) for line in lines.decode('utf-8').splitlines() if line.strip()]
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+        self.connected = False
+
+def open_feed(source):
+    """Open a feed from a file path or a 'tcp://host:port' address."""
+    if source.startswith('tcp://'):
+        host, port = source[len('tcp://'):].rsplit(':', 1)
+        return SocketFeed(host, int(port))
+    return FeedTailer(source)
+
+# ============================================================================
+# LIVE STATE
+# ============================================================================
+
+def _slot_content(row):
+    return tuple(row[column] for column in FEED_COLUMNS if column != 'current_time')
+
+class LiveOccupancy:
+    """Current state of every slot, updated in place from feed records.
+
+    `apply()` touches only the slots named in the records; `frame()` returns
+    the latest rows in the same shape as a FrameIndex frame (one row per
+    slot, with `status`, indexed by slot id). The frame is built once;
+    after that only the rows of slots changed since the last call are
+    rewritten, and a slot seen for the first time is appended. A frame
+    that has been returned is never modified: changes are written into a
+    copy (a block copy, no per-row work) that replaces it, and `version`
+    counts the replacements. Readers can therefore keep a frame without
+    holding a lock.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self.latest_time = None
+        self.applied = 0
+        self.version = 0
+        self._frame = None
+        # Slots changed since the frame was last updated (over one or more polls)
+        self._dirty = set()
+
+    def clear(self):
+        self.slots.clear()
+        self.latest_time = None
+        self._frame = None
+        self._dirty.clear()
+
+    def apply(self, records):
+        """Apply feed records; returns the set of slot ids that changed."""
+        changed = set()
+        for record in records:
+            timestamp = record.get('current_time')
+            if timestamp is not None:
+                timestamp = pd.Timestamp(timestamp)
+                if self.latest_time is None or timestamp > self.latest_time:
+                    self.latest_time = timestamp
+            
+            # Records without a slot_id are clock heartbeats
+            slot_id = record.get('slot_id')
+            if slot_id is None:
+                continue
+            row = {column: record.get(column) for column in FEED_COLUMNS}
+            # A record that only moves the clock does not make the slot dirty
+            previous = self.slots.get(slot_id)
+            if previous is None or _slot_content(previous) != _slot_content(row):
+                changed.add(slot_id)
+            self.slots[slot_id] = row
+            self.applied += 1
+        self._dirty |= changed
+        return changed
+
+    def _rows(self, slot_ids):
+        """DataFrame of the given slots' current rows (with `status`), indexed by slot id."""
+        rows = pd.DataFrame([self.slots[slot_id] for slot_id in slot_ids], columns=FEED_COLUMNS,
+                            index=pd.Index(slot_ids))
+        # Fixed dtypes, so the rows can be written into the frame whatever this batch holds
+        rows = rows.astype({'x': float, 'y': float, **{column: object for column in TEXT_COLUMNS}})
+        return add_derived_columns(rows)
+
+    @staticmethod
+    def _sort_slots(frame):
+        try:
+            return frame.sort_index()
+        except TypeError:
+            return frame.sort_index(key=lambda index: index.map(str))
+
+    def frame(self):
+        """Return the latest state as a read-only DataFrame (one row per slot, in slot order)."""
+        if self._frame is None:
+            if not self.slots:
+                return pd.DataFrame(columns=FEED_COLUMNS + ['status'])
+            frame = self._sort_slots(self._rows(list(self.slots)))
+        elif self._dirty:
+            frame = self._frame.copy()
+            known = [slot_id for slot_id in self._dirty if slot_id in frame.index]
+            if known:
+                rows = self._rows(known)
+                frame.loc[known, rows.columns] = rows
+            new_slots = [slot_id for slot_id in self._dirty if slot_id not in frame.index]
+            if new_slots:
+                frame = self._sort_slots(pd.concat([frame, self._rows(new_slots)]))
+        else:
+            return self._frame
+        self._frame = frame
+        self.version += 1
+        self._dirty.clear()
+        return self._frame
+
+class LiveFeed:
+    """A feed reader plus its LiveOccupancy state, safe to share between sessions."""
+
+    def __init__(self, source):
+        self.source = source
+        self.reader = open_feed(source)
+        self.state = LiveOccupancy()
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Poll the feed and apply new records; returns the number of records applied."""
+        with self._lock:
+            records = self.reader.poll()
+            if self.reader.reset:
+                self.state.clear()
+                self.reader.reset = False
+            self.state.apply(records)
+            return len(records)
+
+    @property
+    def connected(self):
+        """False while a socket feed's producer is gone (file feeds are always connected)."""
+        return getattr(self.reader, 'connected', True)
+
+    def snapshot(self):
+        """Return (latest_time, frame) for rendering.
+
+        The frame is shared, not copied: later refreshes replace it rather
+        than change it, so it stays valid while it is being rendered.
+        """
+        with self._lock:
+            return self.state.latest_time, self.state.frame()
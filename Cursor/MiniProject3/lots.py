@@ -0,0 +1,147 @@
+"""
+Registry of the pickup lots (terminals) the dashboard and visualizer can show.
+
+Each lot has its own map, slot geometry, capacity, vertical offset and data
+file, listed in assets/lots.json. Data is partitioned per lot: every lot
+reads its own workbook (and gets its own Parquet snapshot), so loading or
+rendering one lot never reads another lot's data. Without a registry file the
+original single pickup zone is used.
+
+A combined workbook with a `lot_id` column can be split into the per-lot
+files with:
+
+    python lots.py --partition combined.xlsx
+"""
+
+import argparse
+import json
+import os
+
+import pandas as pd
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+REGISTRY_PATH = 'assets/lots.json'
+
+# Environment variable that selects the lot for scripts (and their worker processes)
+LOT_ENV_VAR = 'RIDE_HAILING_LOT'
+
+# The original single pickup zone, used when there is no registry file
+DEFAULT_LOT_CONFIG = {
+    'lot_id': 'main',
+    'name': 'Ride-Hailing Pickup Zone',
+    'map': 'assets/map.png',
+    'data': 'assets/ride_hailing.xlsx',
+    'feed': 'assets/live_feed.jsonl',
+    'capacity': 24,
+    'vertical_offset': 30
+}
+
+# ============================================================================
+# LOTS
+# ============================================================================
+
+class Lot:
+    """One pickup lot: map, slot geometry, capacity, offset and data file."""
+
+    def __init__(self, lot_id, name, map, data, capacity=None, vertical_offset=0,
+                 slots=None, feed=None):
+        self.lot_id = lot_id
+        self.name = name
+        self.map_path = map
+        self.data_path = data
+        self.feed_path = feed or f'assets/live_feed_{lot_id}.jsonl'
+        self.vertical_offset = vertical_offset
+        # slot_id -> (x, y) in map pixels
+        self.slots = {_slot_key(k): tuple(v) for k, v in (slots or {}).items()}
+        self.capacity = capacity if capacity is not None else len(self.slots)
+
+    def __repr__(self):
+        return f"Lot({self.lot_id!r}, {self.name!r}, capacity={self.capacity})"
+
+    def output_name(self, filename, default_lot_id=None):
+        """Per-lot output file name; the default lot keeps the plain name."""
+        if self.lot_id == default_lot_id:
+            return filename
+        stem, ext = os.path.splitext(filename)
+        return f'{stem}_{self.lot_id}{ext}'
+
+def _slot_key(key):
+    try:
+        return int(key)
+    except (TypeError, ValueError):
+        return key
+
+class LotRegistry:
+    """Lots by id, in registry order, plus the default lot id."""
+
+    def __init__(self, lots, default=None):
+        self.lots = {lot.lot_id: lot for lot in lots}
+        self.default = default if default is not None else lots[0].lot_id
+
+    def __len__(self):
+        return len(self.lots)
+
+    def __iter__(self):
+        return iter(self.lots.values())
+
+    def ids(self):
+        return list(self.lots)
+
+    def get(self, lot_id=None):
+        """Return a lot by id (the default lot for None)."""
+        if lot_id is None:
+            lot_id = self.default
+        if lot_id not in self.lots:
+            raise KeyError(f"Unknown lot {lot_id!r} (known: {', '.join(self.lots)})")
+        return self.lots[lot_id]
+
+def load_registry(path=REGISTRY_PATH):
+    """Read the lot registry, falling back to the single default lot."""
+    if not os.path.exists(path):
+        return LotRegistry([Lot(**DEFAULT_LOT_CONFIG)])
+    with open(path) as f:
+        config = json.load(f)
+    return LotRegistry([Lot(**lot) for lot in config['lots']], config.get('default'))
+
+def selected_lot_id(registry, lot_id=None):
+    """Resolve a lot id: explicit value, else $RIDE_HAILING_LOT, else the registry default."""
+    return lot_id or os.environ.get(LOT_ENV_VAR) or registry.default
+
+# ============================================================================
+# PARTITIONING
+# ============================================================================
+
+def partition_by_lot(df, registry, lot_column='lot_id'):
+    """Split a combined data table into one workbook per registered lot.
+
+    Returns {lot_id: row count}. Rows of unknown lots are skipped.
+    """
+    counts = {}
+    for lot_id, rows in df.groupby(lot_column):
+        if lot_id not in registry.lots:
+            print(f"Warning: Skipping {len(rows)} rows of unregistered lot {lot_id!r}")
+            continue
+        lot = registry.get(lot_id)
+        os.makedirs(os.path.dirname(lot.data_path) or '.', exist_ok=True)
+        rows.drop(columns=lot_column).to_excel(lot.data_path, index=False)
+        counts[lot_id] = len(rows)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List the registered lots or partition combined data per lot.")
+    parser.add_argument('--partition', metavar='WORKBOOK',
+                        help="Split a workbook with a lot_id column into the per-lot data files")
+    args = parser.parse_args()
+
+    registry = load_registry()
+    if args.partition:
+        for lot_id, count in partition_by_lot(pd.read_excel(args.partition), registry).items():
+            print(f"  {lot_id}: {count} rows -> {registry.get(lot_id).data_path}")
+    else:
+        for lot in registry:
+            marker = ' (default)' if lot.lot_id == registry.default else ''
+            print(f"  {lot.lot_id}{marker}: {lot.name}, {lot.capacity} spots, "
+                  f"map {lot.map_path}, data {lot.data_path}")
@@ -0,0 +1,315 @@
+"""
+Optional Prometheus metrics for the dashboard.
+
+When RIDE_HAILING_METRICS_PORT is set, the dashboard process serves its
+metrics on http://127.0.0.1:<port>/metrics in the Prometheus text format;
+when RIDE_HAILING_METRICS_FILE is set, the same text is written to that
+file every RIDE_HAILING_METRICS_INTERVAL seconds (e.g. for node_exporter's
+textfile collector). Either or both can be enabled:
+
+    RIDE_HAILING_METRICS_PORT=9464 streamlit run dashboard.py
+    python metrics_exporter.py --scrape http://127.0.0.1:9464/metrics
+
+Published: reruns and rerun latency by kind (full, timeline, live),
+per-stage latency histograms, sprite cache hits/misses/hit rate, process
+RSS and active Streamlit sessions. With neither variable set nothing is
+started and the dashboard's spans skip the exporter entirely.
+"""
+
+import argparse
+import os
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sprites import sprite_cache
+from tracing import HISTOGRAM_EDGES_MS
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PORT_ENV_VAR = 'RIDE_HAILING_METRICS_PORT'
+FILE_ENV_VAR = 'RIDE_HAILING_METRICS_FILE'
+INTERVAL_ENV_VAR = 'RIDE_HAILING_METRICS_INTERVAL'
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_FILE_INTERVAL = 15.0
+
+METRIC_PREFIX = 'ride_hailing_dashboard'
+
+# Latency buckets in seconds (the tracing histogram edges)
+LATENCY_BUCKETS = [edge / 1000 for edge in HISTOGRAM_EDGES_MS[1:]]
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ============================================================================
+# PROCESS GAUGES
+# ============================================================================
+
+def process_rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+def active_session_count():
+    """Connected Streamlit sessions, or None outside a Streamlit server."""
+    try:
+        from streamlit import runtime
+        if not runtime.exists():
+            return None
+        return runtime.get_instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative-bucket latency histogram (seconds)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def lines(self, name, **labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(**labels, le=bound)} {cumulative}'
+        yield f'{name}_bucket{_labels(**labels, le="+Inf")} {self.count}'
+        yield f'{name}_sum{_labels(**labels)} {self.sum!r}'
+        yield f'{name}_count{_labels(**labels)} {self.count}'
+
+class DashboardMetrics:
+    """Process-wide rerun and stage metrics, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self.reruns = {}
+        self.rerun_latency = {}
+        self.stage_latency = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def observe_stage(self, stage, seconds):
+        with self._lock:
+            if stage not in self.stage_latency:
+                self.stage_latency[stage] = Histogram()
+            self.stage_latency[stage].observe(seconds)
+
+    def observe_rerun(self, kind, seconds):
+        with self._lock:
+            self.reruns[kind] = self.reruns.get(kind, 0) + 1
+            if kind not in self.rerun_latency:
+                self.rerun_latency[kind] = Histogram()
+            self.rerun_latency[kind].observe(seconds)
+
+    @contextmanager
+    def span(self, stage, recorder=None):
+        """Time a stage into the stage histogram (and a session SpanRecorder, if given)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe_stage(stage, seconds)
+            if recorder is not None:
+                recorder.add(stage, seconds * 1000)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        p = METRIC_PREFIX
+        out = []
+
+        def metric(name, kind, help_text):
+            out.append(f'# HELP {p}_{name} {help_text}')
+            out.append(f'# TYPE {p}_{name} {kind}')
+
+        with self._lock:
+            metric('reruns_total', 'counter', 'Dashboard reruns by kind (full, timeline, live).')
+            for kind, count in sorted(self.reruns.items()):
+                out.append(f'{p}_reruns_total{_labels(kind=kind)} {count}')
+
+            metric('rerun_seconds', 'histogram', 'Rerun latency by kind.')
+            for kind, histogram in sorted(self.rerun_latency.items()):
+                out.extend(histogram.lines(f'{p}_rerun_seconds', kind=kind))
+
+            metric('stage_seconds', 'histogram', 'Latency of each traced stage of a rerun.')
+            for stage, histogram in sorted(self.stage_latency.items()):
+                out.extend(histogram.lines(f'{p}_stage_seconds', stage=stage.replace(' ', '_')))
+
+        sprites = sprite_cache.stats()
+        metric('sprite_cache_hits_total', 'counter', 'Plate/logo sprite cache hits.')
+        out.append(f'{p}_sprite_cache_hits_total {sprites["hits"]}')
+        metric('sprite_cache_misses_total', 'counter', 'Plate/logo sprite cache misses.')
+        out.append(f'{p}_sprite_cache_misses_total {sprites["misses"]}')
+        metric('sprite_cache_hit_ratio', 'gauge', 'Sprite cache hits / lookups since start.')
+        out.append(f'{p}_sprite_cache_hit_ratio {_format_value(float(sprites["hit_rate"]))}')
+        metric('sprite_cache_entries', 'gauge', 'Sprites currently cached.')
+        out.append(f'{p}_sprite_cache_entries {sprites["size"]}')
+
+        rss = process_rss_bytes()
+        if rss is not None:
+            metric('process_resident_memory_bytes', 'gauge', 'Resident memory of the dashboard process.')
+            out.append(f'{p}_process_resident_memory_bytes {rss}')
+
+        sessions = active_session_count()
+        if sessions is not None:
+            metric('active_sessions', 'gauge', 'Connected Streamlit sessions.')
+            out.append(f'{p}_active_sessions {sessions}')
+
+        metric('uptime_seconds', 'gauge', 'Seconds since the exporter started.')
+        out.append(f'{p}_uptime_seconds {_format_value(time.time() - self.started)}')
+        return '\n'.join(out) + '\n'
+
+# ============================================================================
+# EXPORTERS
+# ============================================================================
+
+def serve_http(metrics, port, host=DEFAULT_HOST):
+    """Serve `metrics` on http://host:port/metrics from a daemon thread; returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+def write_metrics_file(metrics, path):
+    """Write the metrics text atomically (readers never see a partial file)."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(metrics.render())
+    os.replace(tmp_path, path)
+
+def write_periodically(metrics, path, interval=DEFAULT_FILE_INTERVAL):
+    """Rewrite the metrics file every `interval` seconds from a daemon thread."""
+
+    def loop():
+        while True:
+            try:
+                write_metrics_file(metrics, path)
+            except OSError as e:
+                print(f"Warning: Could not write metrics file {path}: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='metrics-file', daemon=True)
+    thread.start()
+    return thread
+
+# Process-wide exporter: None until configured, and when metrics are disabled
+exporter = None
+_configured = False
+_configure_lock = threading.Lock()
+
+def start_from_environment():
+    """Start the exporters named by the environment once per process; returns the metrics or None."""
+    global exporter, _configured
+    if _configured:
+        return exporter
+    with _configure_lock:
+        if _configured:
+            return exporter
+        port = os.environ.get(PORT_ENV_VAR)
+        path = os.environ.get(FILE_ENV_VAR)
+        if port or path:
+            metrics = DashboardMetrics()
+            try:
+                if port:
+                    serve_http(metrics, int(port))
+                    print(f"Metrics: http://{DEFAULT_HOST}:{port}/metrics")
+                if path:
+                    write_periodically(metrics, path, float(os.environ.get(INTERVAL_ENV_VAR, DEFAULT_FILE_INTERVAL)))
+                    print(f"Metrics: {path}")
+                exporter = metrics
+            except (OSError, ValueError) as e:
+                print(f"Warning: Could not start the metrics exporter: {e}")
+        _configured = True
+    return exporter
+
+# ============================================================================
+# SCRAPER
+# ============================================================================
+
+def parse_metrics(text):
+    """Parse Prometheus text into {'name{labels}': value}, skipping comments."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith('#'):
+            continue
+        key, value = line.rsplit(' ', 1)
+        samples[key] = float(value)
+    return samples
+
+def scrape(url, timeout=5.0):
+    """Fetch and parse a metrics endpoint the way a Prometheus scrape would."""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        content_type = response.headers.get('Content-Type', '')
+        if not content_type.startswith('text/plain'):
+            raise ValueError(f"Unexpected content type {content_type!r}")
+        return parse_metrics(response.read().decode('utf-8'))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape (or serve demo) dashboard metrics.")
+    parser.add_argument('--scrape', metavar='URL', help="Fetch and print a metrics endpoint")
+    parser.add_argument('--serve', metavar='PORT', type=int,
+                        help="Serve metrics with a few synthetic observations (exporter smoke test)")
+    args = parser.parse_args()
+
+    if args.serve:
+        metrics = DashboardMetrics()
+        for stage, seconds in [('data load', 0.001), ('sprites', 0.04), ('figure build', 0.09)]:
+            metrics.observe_stage(stage, seconds)
+        metrics.observe_rerun('full', 0.4)
+        serve_http(metrics, args.serve)
+        print(f"Serving http://{DEFAULT_HOST}:{args.serve}/metrics (Ctrl+C to stop)")
+        while True:
+            time.sleep(3600)
+    elif args.scrape:
+        for key, value in scrape(args.scrape).items():
+            print(f"{key} {value:g}")
+    else:
+        parser.print_help()
@@ -0,0 +1,251 @@
+"""
+Event-sourced occupancy model.
+
+ride_hailing.xlsx stores every slot at every timestamp, although a slot only
+changes when a vehicle arrives or leaves. snapshots_to_events() turns the
+snapshot rows into one arrival and one departure event per reservation, and
+OccupancyLog rebuilds the state at any time from the nearest periodic
+checkpoint plus the events after it. Storage and replay cost therefore grow
+with the number of arrivals and departures rather than slots x timestamps,
+and dwell questions ("how long has this car been here") are a subtraction.
+
+    python occupancy_events.py --output assets/ride_hailing_events.csv
+"""
+
+import argparse
+import bisect
+
+import numpy as np
+import pandas as pd
+
+from ride_data import DATA_PATH, load_ride_data
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Columns carried by an arrival (the occupant of the slot)
+OCCUPANT_COLUMNS = ['reservation_id', 'rider_id', 'driver_id', 'plate_number', 'service', 'x', 'y']
+
+EVENT_COLUMNS = ['time', 'slot_id', 'event'] + OCCUPANT_COLUMNS
+
+# Snapshot column order reproduced by OccupancyLog.frame()
+FRAME_COLUMNS = ['current_time', 'slot_id', 'x', 'y', 'reservation_id', 'rider_id',
+                 'driver_id', 'plate_number', 'service', 'status']
+
+# Timestamps between checkpoints
+CHECKPOINT_INTERVAL = 10
+
+# ============================================================================
+# CONVERTER
+# ============================================================================
+
+def snapshots_to_events(df, time_column='current_time'):
+    """Convert per-timestamp slot snapshots into arrival/departure events.
+
+    A slot gets an `arrival` event when its reservation_id changes to a new
+    reservation and a `departure` event when the previous reservation is no
+    longer there (at the first timestamp without it). A reservation replaced
+    directly by another produces a departure and an arrival at the same time,
+    in that order. Vehicles present at the first timestamp arrive then. If
+    the occupant's other columns change during a stay (e.g. the service of
+    a split "Other" entry), an `update` event carries the new values.
+
+    Returns (events, slots, timestamps): the event table sorted by time, a
+    per-slot table with the positions used for vacant rows, and the sorted
+    snapshot timestamps.
+    """
+    df = df.sort_values(['slot_id', time_column], kind='stable')
+    reservation = df['reservation_id'].where(df['reservation_id'].astype(str).str.strip() != '')
+    previous = reservation.groupby(df['slot_id']).shift()
+
+    # NaN-safe "reservation changed" flags
+    same = (reservation == previous) | (reservation.isna() & previous.isna())
+    arrivals = reservation.notna() & ~same
+    departures = previous.notna() & ~same
+
+    # Same reservation, different occupant columns (NaN-safe like `same`)
+    occupant = df[OCCUPANT_COLUMNS]
+    previous_occupant = occupant.groupby(df['slot_id']).shift()
+    occupant_changed = ((occupant != previous_occupant)
+                        & ~(occupant.isna() & previous_occupant.isna())).any(axis=1)
+    updates = reservation.notna() & same & occupant_changed
+
+    arrival_events = df.loc[arrivals, [time_column, 'slot_id'] + OCCUPANT_COLUMNS].assign(event='arrival')
+    update_events = df.loc[updates, [time_column, 'slot_id'] + OCCUPANT_COLUMNS].assign(event='update')
+    departure_events = df.loc[departures, [time_column, 'slot_id']].assign(event='departure')
+    departure_events['reservation_id'] = previous[departures]
+
+    events = pd.concat([departure_events, arrival_events, update_events], ignore_index=True)
+    events = events.rename(columns={time_column: 'time'})
+    # Departures sort before arrivals at the same time and slot
+    events['order'] = events['event'].map({'departure': 0, 'arrival': 1, 'update': 2})
+    events = events.sort_values(['time', 'slot_id', 'order'], kind='stable').drop(columns='order')
+    events = events.reset_index(drop=True)[EVENT_COLUMNS]
+
+    vacant = df[reservation.isna()]
+    slots = pd.DataFrame({'slot_id': np.sort(df['slot_id'].unique())}).set_index('slot_id')
+    slots['vacant_x'] = vacant.groupby('slot_id')['x'].first()
+    slots['vacant_y'] = vacant.groupby('slot_id')['y'].first()
+
+    timestamps = list(pd.DatetimeIndex(np.unique(df[time_column].to_numpy())))
+    return events, slots, timestamps
+
+# ============================================================================
+# OCCUPANCY LOG
+# ============================================================================
+
+class OccupancyLog:
+    """Rebuild slot occupancy at any time from checkpoints plus events.
+
+    The state maps each occupied slot to (arrival event index, latest event
+    index) - the latest event is the arrival or its most recent update. A
+    checkpoint of that state is stored every `checkpoint_interval`
+    timestamps. `state_at(t)` starts from the latest checkpoint at or
+    before `t` and replays only the events between the two, so
+    reconstructing any timestamp touches at most one checkpoint interval
+    of events.
+    """
+
+    def __init__(self, events, slots, timestamps, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.events = events
+        self.slots = slots
+        self.timestamps = timestamps
+        self._event_times = events['time'].to_numpy()
+        self._event_slots = events['slot_id'].to_numpy()
+        self._kinds = events['event'].to_numpy()
+
+        self.checkpoint_times = []
+        self.checkpoint_offsets = []
+        self.checkpoints = []
+        state = {}
+        offset = 0
+        for timestamp in timestamps[::max(1, checkpoint_interval)]:
+            offset = self._replay(state, offset, timestamp)
+            self.checkpoint_times.append(timestamp)
+            self.checkpoint_offsets.append(offset)
+            self.checkpoints.append(dict(state))
+
+    @classmethod
+    def from_snapshots(cls, df, checkpoint_interval=CHECKPOINT_INTERVAL):
+        return cls(*snapshots_to_events(df), checkpoint_interval=checkpoint_interval)
+
+    def __len__(self):
+        return len(self.events)
+
+    def _replay(self, state, offset, until):
+        """Apply events from `offset` up to and including time `until`; returns the new offset."""
+        end = int(np.searchsorted(self._event_times, np.datetime64(pd.Timestamp(until)), side='right'))
+        for i in range(offset, end):
+            slot = self._event_slots[i]
+            kind = self._kinds[i]
+            if kind == 'arrival':
+                state[slot] = (i, i)
+            elif kind == 'update' and slot in state:
+                state[slot] = (state[slot][0], i)
+            else:
+                state.pop(slot, None)
+        return end
+
+    def state_at(self, timestamp):
+        """Return {slot_id: (arrival index, latest event index)} for the slots occupied at `timestamp`."""
+        timestamp = pd.Timestamp(timestamp)
+        i = bisect.bisect_right(self.checkpoint_times, timestamp) - 1
+        if i < 0:
+            state, offset = {}, 0
+        else:
+            state, offset = dict(self.checkpoints[i]), self.checkpoint_offsets[i]
+        self._replay(state, offset, timestamp)
+        return state
+
+    def frame(self, timestamp):
+        """Rebuild the snapshot rows for `timestamp` (same columns as the workbook).
+
+        Vacant slots get the slot's first recorded vacant position; the
+        workbook leaves `y` empty for vacant rows, so they are not drawn.
+        """
+        state = self.state_at(timestamp)
+        rows = []
+        for slot_id, slot in self.slots.iterrows():
+            if slot_id in state:
+                occupant = self.events.iloc[state[slot_id][1]]
+                row = {column: occupant[column] for column in OCCUPANT_COLUMNS}
+                row['status'] = 'occupied'
+            else:
+                row = {column: np.nan for column in OCCUPANT_COLUMNS}
+                row.update(x=slot['vacant_x'], y=slot['vacant_y'], status='vacant')
+            row['current_time'] = pd.Timestamp(timestamp)
+            row['slot_id'] = slot_id
+            rows.append(row)
+        return pd.DataFrame(rows, columns=FRAME_COLUMNS)
+
+    def arrived_at(self, slot_id, timestamp):
+        """Return the arrival time of the vehicle in `slot_id` at `timestamp` (None if vacant)."""
+        indices = self.state_at(timestamp).get(slot_id)
+        return None if indices is None else self.events['time'].iloc[indices[0]]
+
+    def dwell_at(self, timestamp):
+        """Return a Series slot_id -> time the current vehicle has been in the slot."""
+        timestamp = pd.Timestamp(timestamp)
+        state = self.state_at(timestamp)
+        arrivals = self.events['time'].iloc[[arrival for arrival, _ in state.values()]]
+        return pd.Series(timestamp - pd.DatetimeIndex(arrivals), index=list(state.keys()), name='dwell')
+
+    def sessions(self):
+        """Return one row per stay with arrival, departure and dwell time.
+
+        Each arrival is paired with the next departure from the same slot,
+        so a reservation that leaves and comes back is two stays. Vehicles
+        still present at the last timestamp have no departure and `open` is
+        True; their dwell is measured up to the last timestamp. As in
+        dwell_analytics.detect_visits(), `censored` marks stays cut off by
+        the data window: present at the first timestamp, or still open.
+        """
+        arrivals = self.events[self.events['event'] == 'arrival']
+        departures = self.events[self.events['event'] == 'departure']
+        # A departure at the arrival time belongs to the slot's previous occupant
+        sessions = pd.merge_asof(
+            arrivals.drop(columns='event').rename(columns={'time': 'arrival'}),
+            departures[['slot_id', 'time']].rename(columns={'time': 'departure'}),
+            left_on='arrival', right_on='departure', by='slot_id',
+            direction='forward', allow_exact_matches=False
+        )
+        sessions['open'] = sessions['departure'].isna()
+        first = self.timestamps[0] if self.timestamps else None
+        sessions['censored'] = sessions['open'] | (sessions['arrival'] == first)
+        end = sessions['departure'].fillna(self.timestamps[-1]) if self.timestamps else sessions['departure']
+        sessions['dwell'] = end - sessions['arrival']
+        return sessions
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+def save_events(events, path):
+    """Write the event table to CSV or Parquet (by file extension)."""
+    if path.lower().endswith('.parquet'):
+        events.to_parquet(path, index=False)
+    else:
+        events.to_csv(path, index=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert slot snapshots to arrival/departure events.")
+    parser.add_argument('--data', default=DATA_PATH, help="Source workbook")
+    parser.add_argument('--output', default=None, help="Write the events to this .csv or .parquet file")
+    args = parser.parse_args()
+
+    df = load_ride_data(args.data)
+    log = OccupancyLog.from_snapshots(df)
+    print(f"{len(df)} snapshot rows -> {len(log)} events "
+          f"({(log.events['event'] == 'arrival').sum()} arrivals, "
+          f"{(log.events['event'] == 'departure').sum()} departures), "
+          f"{len(log.checkpoints)} checkpoints")
+
+    sessions = log.sessions()
+    completed = sessions[~sessions['censored']]
+    if len(completed) > 0:
+        print(f"Median dwell of stays inside the data window: {completed['dwell'].median()}")
+
+    if args.output:
+        save_events(log.events, args.output)
+        print(f"Events saved: {args.output}")
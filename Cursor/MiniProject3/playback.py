@@ -0,0 +1,197 @@
+"""
+Client-side playback for the dashboard map.
+
+Instead of re-running the Streamlit script on every animation tick, the
+whole timeline is sent to the browser once as a compact state array: each
+distinct plate/logo sprite is included a single time, and every timestamp is
+a short list of (x, y, sprite) entries plus its statistics. A small canvas
+player then animates the frames locally, so a playback session costs the
+server one render regardless of how many frames are played.
+"""
+
+import json
+
+import pandas as pd
+
+from sprites import logo_sprite, plate_sprite
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PLATE_SIZE = 80
+LOGO_SIZE = 24
+
+SERVICE_COLORS = {
+    'Uber': '#000000',
+    'Lyft': '#FF00BF',
+    'Waymo': '#00B4A2',
+    'Taxi': '#F5A623'
+}
+
+# ============================================================================
+# STATE ARRAY
+# ============================================================================
+
+def build_playback_state(frame_index, stats_cube, background, vertical_offset):
+    """Build the JSON-serializable playback state for every timestamp.
+
+    Returns a dict with the map size and background, a `sprites` table of
+    [data_uri, width, height] entries, and one entry per timestamp in
+    `frames` with its label, slot markers and statistics. A marker is
+    [x, y, plate_sprite, logo_sprite, service]; sprite indices are -1 when
+    the slot falls back to a colored dot (or has no logo).
+    """
+    sprites = []
+    sprite_ids = {}
+
+    def sprite_id(key, build):
+        if key not in sprite_ids:
+            sprite = build()
+            sprite_ids[key] = len(sprites) if sprite is not None else -1
+            if sprite is not None:
+                sprites.append(list(sprite))
+        return sprite_ids[key]
+
+    frames = []
+    for position, timestamp in enumerate(frame_index.timestamps):
+        df_frame = frame_index.frame_at(position)
+        occupied = df_frame[df_frame['status'] == 'occupied']
+
+        markers = []
+        for x, y, plate_number, service in zip(occupied['x'], occupied['y'],
+                                               occupied['plate_number'], occupied['service']):
+            service = service if pd.notna(service) else 'Taxi'
+            plate_id = -1
+            if pd.notna(plate_number):
+                plate_id = sprite_id(('plate', plate_number, service),
+                                     lambda: plate_sprite(plate_number, service, PLATE_SIZE))
+            logo_id = sprite_id(('logo', service), lambda: logo_sprite(service, LOGO_SIZE)) if plate_id >= 0 else -1
+            markers.append([round(float(x), 1), round(float(y - vertical_offset), 1), plate_id, logo_id, service])
+
+        stats = stats_cube.at(position)
+        frames.append({
+            'label': timestamp.strftime('%B %d, %Y at %I:%M %p'),
+            'markers': markers,
+            'stats': {
+                'occupancy_rate': round(float(stats['occupancy_rate']), 1),
+                'vacant_count': int(stats['vacant_count']),
+                'total_vehicles': int(stats['total_vehicles']),
+                'services': {service: int(stats[f'{service.lower()}_count']) for service in SERVICE_COLORS}
+            }
+        })
+
+    return {
+        'width': background['width'],
+        'height': background['height'],
+        'background': background['data_uri'],
+        'sprites': sprites,
+        'frames': frames
+    }
+
+# ============================================================================
+# PLAYER
+# ============================================================================
+
+PLAYER_TEMPLATE = """
+<div id="player" style="font-family: sans-serif; color: #e0e0e0;">
+  <canvas id="map" style="width: 100%; border-radius: 8px;"></canvas>
+  <div style="display: flex; align-items: center; gap: 12px; margin-top: 8px;">
+    <button id="play" style="width: 90px; padding: 6px; border-radius: 6px; border: 1px solid #555;
+            background: #2c3e50; color: white; font-weight: bold; cursor: pointer;">Pause</button>
+    <input id="scrub" type="range" min="0" value="0" style="flex: 1;">
+  </div>
+  <div id="label" style="text-align: center; margin-top: 6px; font-weight: bold; color: #b0b0b0;"></div>
+  <div id="stats" style="text-align: center; margin-top: 4px; font-size: 14px;"></div>
+</div>
+<script>
+const state = __STATE__;
+const frameMs = __FRAME_MS__;
+const colors = __COLORS__;
+
+const canvas = document.getElementById('map');
+const ctx = canvas.getContext('2d');
+canvas.width = state.width;
+canvas.height = state.height;
+
+const scrub = document.getElementById('scrub');
+scrub.max = state.frames.length - 1;
+
+function loadImage(src) {
+  const img = new Image();
+  img.onload = () => draw();
+  img.src = src;
+  return img;
+}
+const background = loadImage(state.background);
+const sprites = state.sprites.map(s => ({img: loadImage(s[0]), w: s[1], h: s[2]}));
+
+let position = 0;
+let playing = true;
+let timer = null;
+
+function draw() {
+  const frame = state.frames[position];
+  ctx.clearRect(0, 0, canvas.width, canvas.height);
+  ctx.globalAlpha = 0.85;
+  ctx.drawImage(background, 0, 0, canvas.width, canvas.height);
+  ctx.globalAlpha = 1.0;
+
+  for (const [x, y, plateId, logoId, service] of frame.markers) {
+    if (plateId >= 0) {
+      const plate = sprites[plateId];
+      ctx.drawImage(plate.img, x - plate.w / 2, y - plate.h / 2, plate.w, plate.h);
+      if (logoId >= 0) {
+        const logo = sprites[logoId];
+        ctx.drawImage(logo.img, x - logo.w / 2, y + plate.h / 2 + 5, logo.w, logo.h);
+      }
+    } else {
+      ctx.beginPath();
+      ctx.arc(x, y, 9, 0, 2 * Math.PI);
+      ctx.fillStyle = colors[service] || '#808080';
+      ctx.fill();
+      ctx.lineWidth = 2;
+      ctx.strokeStyle = 'white';
+      ctx.stroke();
+    }
+  }
+
+  const s = frame.stats;
+  document.getElementById('label').textContent = frame.label;
+  document.getElementById('stats').innerHTML =
+    `Occupancy <b>${s.occupancy_rate.toFixed(1)}%</b> &nbsp;|&nbsp; Available <b>${s.vacant_count}</b>` +
+    ` &nbsp;|&nbsp; Vehicles <b>${s.total_vehicles}</b> &nbsp;|&nbsp; ` +
+    Object.entries(s.services).map(([name, count]) =>
+      `<span style="color: ${colors[name]}; font-weight: bold;">${name} ${count}</span>`).join(' &nbsp; ');
+  scrub.value = position;
+}
+
+function tick() {
+  position = (position + 1) % state.frames.length;
+  draw();
+}
+
+function setPlaying(value) {
+  playing = value;
+  document.getElementById('play').textContent = playing ? 'Pause' : 'Play';
+  clearInterval(timer);
+  if (playing) timer = setInterval(tick, frameMs);
+}
+
+document.getElementById('play').onclick = () => setPlaying(!playing);
+scrub.oninput = () => { position = Number(scrub.value); draw(); };
+
+setPlaying(true);
+</script>
+"""
+
+def playback_html(state, frame_seconds=2.0):
+    """Return a self-contained HTML player for a playback state."""
+    def to_js(value):
+        # Keep "</script>" inside data URIs or labels from closing the script tag
+        return json.dumps(value, separators=(',', ':')).replace('</', '<\\/')
+
+    return (PLAYER_TEMPLATE
+            .replace('__STATE__', to_js(state))
+            .replace('__FRAME_MS__', str(int(frame_seconds * 1000)))
+            .replace('__COLORS__', to_js(SERVICE_COLORS)))
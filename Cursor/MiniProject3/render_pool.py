@@ -0,0 +1,127 @@
+"""
+Parallel frame rendering for the animation generators.
+
+Matplotlib renders one frame per core at best, so the visualizers can hand
+their create_frame() function to render_frames() and have the frames drawn
+by a process pool. Results are yielded in input order and only a bounded
+number of frames are in flight at once, so callers can stream them straight
+into a writer.
+
+canvas_frame() grabs a drawn figure's Agg buffer directly, so frames skip
+the PNG encode/decode round trip and always have the same shape.
+BlitFigure redraws a persistent figure over its cached static layer.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# tight_layout()'s default margin around the content, in multiples of the font size
+TIGHT_LAYOUT_PAD = 1.08
+
+# Frames queued per worker before the oldest result must be consumed
+FRAMES_IN_FLIGHT_PER_WORKER = 2
+
+def resolve_workers(workers):
+    """Turn a --workers value into a process count (0 or None = all cores)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+def init_matplotlib_worker():
+    """Per-worker setup: render off-screen with the Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg')
+
+def tight_frame_inset(fig, pad_inches=0.1):
+    """Pixels savefig(bbox_inches='tight', pad_inches=...) trims from each edge of a tight_layout() figure.
+
+    tight_layout() fits the content into the figure minus a margin of
+    TIGHT_LAYOUT_PAD x the font size, so the tight bounding box is the
+    figure inset by that margin whatever the frame shows.
+    """
+    import matplotlib
+    pad_points = TIGHT_LAYOUT_PAD * matplotlib.rcParams['font.size']
+    return max(0, int(round((pad_points / 72 - pad_inches) * fig.dpi)))
+
+def canvas_frame(fig, inset=0, draw=True):
+    """Draw `fig` and return its Agg RGBA buffer as an (H, W, 4) uint8 array, `inset` pixels trimmed per edge.
+
+    The array is a view of the canvas buffer (no copy), so the figure must
+    not be drawn again while the frame is in use; closing it is fine. With
+    `draw=False` the buffer is returned as it was last drawn.
+    """
+    if draw:
+        fig.canvas.draw()
+    frame = np.asarray(fig.canvas.buffer_rgba())
+    return frame[inset:frame.shape[0] - inset, inset:frame.shape[1] - inset]
+
+class BlitFigure:
+    """A figure whose static artists are rasterized once and reused for every frame.
+
+    capture_static() draws only `static_artists` (e.g. the map image) and
+    keeps the pixels. render() restores them and draws the axes' other
+    artists on top, in the same zorder order as a full draw, so frames are
+    identical to drawing the whole figure while the static artists are
+    never rasterized again.
+    """
+
+    def __init__(self, fig, ax, static_artists, inset=0):
+        self.fig = fig
+        self.ax = ax
+        self.static_artists = [a for a in static_artists if a is not None]
+        self.inset = inset
+        self._static = None
+
+    def capture_static(self):
+        dynamic = [a for a in self.ax.get_children()
+                   if a.get_visible() and a not in self.static_artists and a is not self.ax.patch]
+        for artist in dynamic:
+            artist.set_visible(False)
+        self.fig.canvas.draw()
+        self._static = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in dynamic:
+            artist.set_visible(True)
+
+    def render(self):
+        """Draw the current state and return a copy of the (inset-cropped) frame."""
+        if self._static is None:
+            self.capture_static()
+        canvas = self.fig.canvas
+        canvas.restore_region(self._static)
+        for artist in self.static_artists:
+            artist.set_visible(False)
+        try:
+            self.ax.draw(canvas.get_renderer())
+        finally:
+            for artist in self.static_artists:
+                artist.set_visible(True)
+        return canvas_frame(self.fig, self.inset, draw=False).copy()
+
+def render_frames(render, items, workers=1, initializer=None, initargs=()):
+    """Yield `render(item)` for every item, in order.
+
+    With `workers` > 1 the calls run in a process pool whose workers are
+    prepared by `initializer(*initargs)` (loading data, background and logos
+    once per worker). `render` must be a module-level function so it can be
+    sent to the workers.
+    """
+    items = list(items)
+    workers = min(resolve_workers(workers), max(len(items), 1))
+
+    if workers == 1:
+        for item in items:
+            yield render(item)
+        return
+
+    max_in_flight = workers * FRAMES_IN_FLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(render, item))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
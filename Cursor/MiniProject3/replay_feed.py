@@ -0,0 +1,98 @@
+"""
+Replay ride_hailing.xlsx into a live slot-update feed.
+
+Writes the workbook's rows to an append-only JSONL or CSV feed (or serves
+them on a local TCP socket), one timestamp at a time, so the dashboard's
+live mode can be tested offline:
+
+    python replay_feed.py --output assets/live_feed.jsonl --interval 2
+    streamlit run dashboard.py   # then tick "📡 Live feed"
+
+With --changes-only, only the first timestamp is written in full and later
+timestamps contain just the slots that changed (or a heartbeat record with
+only the time when nothing changed).
+"""
+
+import argparse
+import csv
+import json
+import os
+import socket
+import time
+
+from live_feed import DEFAULT_FEED_PATH, FEED_COLUMNS, row_to_record
+from ride_data import DATA_PATH, FrameIndex, load_ride_data
+
+def timestamp_batches(frame_index, changes_only=False):
+    """Yield the list of feed records for every timestamp, in time order."""
+    previous = {}
+    for position in range(len(frame_index)):
+        batch = []
+        for row in frame_index.frame_at(position).to_dict('records'):
+            record = row_to_record(row)
+            key = tuple(v for k, v in record.items() if k != 'current_time')
+            if not changes_only or previous.get(record['slot_id']) != key:
+                batch.append(record)
+            previous[record['slot_id']] = key
+        if not batch:
+            # Nothing changed: send a heartbeat so the live clock still advances
+            timestamp = frame_index.timestamps[position].isoformat()
+            batch.append({column: timestamp if column == 'current_time' else None for column in FEED_COLUMNS})
+        yield batch
+
+def write_batch(f, batch, as_csv):
+    if as_csv:
+        writer = csv.DictWriter(f, fieldnames=FEED_COLUMNS)
+        for record in batch:
+            writer.writerow({k: '' if v is None else v for k, v in record.items()})
+    else:
+        for record in batch:
+            f.write(json.dumps(record) + '\n')
+    f.flush()
+
+def replay_to_file(batches, path, interval, append=False):
+    as_csv = path.lower().endswith('.csv')
+    write_header = as_csv and not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+    with open(path, 'a' if append else 'w', newline='') as f:
+        if write_header:
+            csv.writer(f).writerow(FEED_COLUMNS)
+        for i, batch in enumerate(batches):
+            write_batch(f, batch, as_csv)
+            print(f"  Timestamp {i + 1}: {len(batch)} updates")
+            if interval > 0:
+                time.sleep(interval)
+
+def replay_to_socket(batches, port, interval):
+    with socket.create_server(('127.0.0.1', port)) as server:
+        print(f"Waiting for a client on tcp://127.0.0.1:{port} ...")
+        conn, _ = server.accept()
+        with conn:
+            for i, batch in enumerate(batches):
+                conn.sendall(''.join(json.dumps(record) + '\n' for record in batch).encode('utf-8'))
+                print(f"  Timestamp {i + 1}: {len(batch)} updates")
+                if interval > 0:
+                    time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay the ride-hailing workbook into a live feed.")
+    parser.add_argument('--data', default=DATA_PATH, help="Source workbook")
+    parser.add_argument('--output', default=DEFAULT_FEED_PATH,
+                        help="Feed file (.jsonl or .csv)")
+    parser.add_argument('--port', type=int, default=None,
+                        help="Serve the feed on tcp://127.0.0.1:PORT instead of writing a file")
+    parser.add_argument('--interval', type=float, default=2.0,
+                        help="Seconds between timestamps (0 = write everything at once)")
+    parser.add_argument('--changes-only', action='store_true',
+                        help="After the first timestamp, only emit slots that changed")
+    parser.add_argument('--append', action='store_true', help="Append to an existing feed file")
+    args = parser.parse_args()
+
+    frame_index = FrameIndex(load_ride_data(args.data))
+    batches = timestamp_batches(frame_index, args.changes_only)
+    print(f"Replaying {len(frame_index)} timestamps from {args.data}")
+
+    if args.port is not None:
+        replay_to_socket(batches, args.port, args.interval)
+    else:
+        replay_to_file(batches, args.output, args.interval, args.append)
+    print("Replay complete")
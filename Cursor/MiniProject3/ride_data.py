@@ -0,0 +1,398 @@
+"""
+Shared ride-hailing data loader for the dashboard and the visualizers.
+
+Parsing assets/ride_hailing.xlsx with openpyxl is the slowest part of a cold
+start. The first load therefore writes a columnar snapshot (Parquet) of the
+processed data next to the workbook, and later loads read that snapshot back
+with the derived `status` and parsed `current_time` columns already in place.
+The snapshot is invalidated when the workbook's mtime changes and its content
+hash no longer matches.
+
+FrameIndex sorts the rows by time once so that every per-timestamp frame is
+a contiguous row slice instead of a boolean scan over the whole table, and
+StatsCube precomputes the panel statistics for every timestamp in one pass.
+OccupancyMatrix stores the same timeline as small-int NumPy arrays.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (needed by pandas for Parquet I/O)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+DATA_PATH = 'assets/ride_hailing.xlsx'
+
+# Snapshots live in a hidden folder next to the source workbook
+CACHE_DIR_NAME = '.cache'
+
+# Bump whenever the processing below changes so stale snapshots are rebuilt
+SNAPSHOT_VERSION = 2
+
+# Services counted in the statistics panels
+SERVICES = ['Uber', 'Lyft', 'Waymo', 'Taxi']
+
+# ============================================================================
+# PROCESSING
+# ============================================================================
+
+def split_other_services(df):
+    """Split "Other" service entries: half to "Waymo", half to "Taxi".
+
+    Returns the number of rows that were reassigned.
+    """
+    other_indices = df.index[df['service'] == 'Other']
+    if len(other_indices) > 0:
+        half_point = len(other_indices) // 2
+        df.loc[other_indices[:half_point], 'service'] = 'Waymo'
+        df.loc[other_indices[half_point:], 'service'] = 'Taxi'
+    return len(other_indices)
+
+def add_derived_columns(df):
+    """Add the `status` column and parse `current_time` to datetime."""
+    reservation = df['reservation_id']
+    has_reservation = reservation.notna() & (reservation.astype(str).str.strip() != '')
+    df['status'] = has_reservation.map({True: 'occupied', False: 'vacant'})
+    df['current_time'] = pd.to_datetime(df['current_time'])
+    return df
+
+# ============================================================================
+# SNAPSHOT CACHE
+# ============================================================================
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def snapshot_paths(xlsx_path, cache_dir=None):
+    """Return (parquet_path, meta_path) for the snapshot of a workbook."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(xlsx_path) or '.', CACHE_DIR_NAME)
+    stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+    return (os.path.join(cache_dir, f'{stem}.parquet'),
+            os.path.join(cache_dir, f'{stem}.meta.json'))
+
+def _source_signature(xlsx_path, sha256=None):
+    stat = os.stat(xlsx_path)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': sha256 if sha256 is not None else file_sha256(xlsx_path),
+    }
+
+def _write_meta(meta_path, signature):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(signature, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+def _snapshot_is_fresh(xlsx_path, parquet_path, meta_path):
+    """Check a snapshot against its workbook; returns the snapshot's meta if fresh, else None.
+
+    The mtime/size comparison is the cheap fast path. If the workbook was
+    touched but its bytes are unchanged, the content hash still matches and
+    the stored mtime is refreshed so the next check is cheap again.
+    """
+    if not (os.path.exists(parquet_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != SNAPSHOT_VERSION:
+        return None
+
+    stat = os.stat(xlsx_path)
+    if meta.get('mtime_ns') == stat.st_mtime_ns and meta.get('size') == stat.st_size:
+        return meta
+
+    sha256 = file_sha256(xlsx_path)
+    if meta.get('sha256') != sha256:
+        return None
+    meta.update(_source_signature(xlsx_path, sha256))
+    _write_meta(meta_path, meta)
+    return meta
+
+def _write_snapshot(df, xlsx_path, parquet_path, meta_path, other_rows=0):
+    """Write the snapshot; `other_rows` records how many "Other" rows the source still has."""
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    tmp_path = parquet_path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, parquet_path)
+    _write_meta(meta_path, {**_source_signature(xlsx_path), 'other_rows': other_rows})
+
+# ============================================================================
+# PUBLIC LOADER
+# ============================================================================
+
+def read_source(path):
+    """Read a data file by extension: .csv, .parquet or a workbook."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return pd.read_csv(path)
+    if extension == '.parquet':
+        return pd.read_parquet(path)
+    return pd.read_excel(path)
+
+def write_source(df, path):
+    """Write data back in the format of `path` (see read_source)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        df.to_csv(path, index=False)
+    elif extension == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_excel(path, index=False)
+
+def load_ride_data(xlsx_path=DATA_PATH, cache_dir=None, persist_service_split=False,
+                   use_cache=True):
+    """Load the ride-hailing data, going through the Parquet snapshot when possible.
+
+    The source may also be a .csv or .parquet file (e.g. from
+    synthetic_data.py); Parquet sources are read directly, without a
+    snapshot. If `persist_service_split` is set and the source still
+    contains "Other" services, the reassigned services are written back to
+    it before the snapshot is taken. This also happens when a fresh
+    snapshot was taken without persisting (e.g. by the dashboard): the
+    snapshot records whether its source still had "Other" rows.
+    """
+    parquet_path, meta_path = snapshot_paths(xlsx_path, cache_dir)
+    use_cache = use_cache and PARQUET_AVAILABLE and not xlsx_path.lower().endswith('.parquet')
+
+    if use_cache:
+        try:
+            meta = _snapshot_is_fresh(xlsx_path, parquet_path, meta_path)
+            # A source that still has "Other" rows to persist takes the full load below
+            if meta is not None and not (persist_service_split and meta.get('other_rows')):
+                return pd.read_parquet(parquet_path, memory_map=True)
+        except Exception as e:
+            print(f"Warning: Could not read data snapshot {parquet_path}: {e}")
+
+    df = read_source(xlsx_path)
+
+    split_count = split_other_services(df)
+    other_rows = split_count
+    if split_count > 0 and persist_service_split:
+        write_source(df, xlsx_path)
+        other_rows = 0
+        half_point = split_count // 2
+        print(f"Updated {split_count} 'Other' entries: {half_point} to Waymo, {split_count - half_point} to Taxi")
+
+    add_derived_columns(df)
+
+    if use_cache:
+        try:
+            _write_snapshot(df, xlsx_path, parquet_path, meta_path, other_rows)
+        except Exception as e:
+            print(f"Warning: Could not write data snapshot {parquet_path}: {e}")
+
+    return df
+
+# ============================================================================
+# FRAME INDEX
+# ============================================================================
+
+class FrameIndex:
+    """Time-bucketed index mapping each timestamp to a contiguous row slice.
+
+    The rows are sorted by (current_time, slot_id) once. Looking up a frame is
+    then a dictionary lookup plus an `iloc` slice, so it costs O(slots)
+    instead of O(total rows) and does not copy the data. Frames are shared
+    with the index and must be treated as read-only.
+    """
+
+    def __init__(self, df, time_column='current_time'):
+        sort_columns = [time_column] + (['slot_id'] if 'slot_id' in df.columns else [])
+        self.df = df.sort_values(sort_columns, kind='stable').reset_index(drop=True)
+        self.time_column = time_column
+
+        times = self.df[time_column].to_numpy()
+        unique_times, starts = np.unique(times, return_index=True)
+        self.offsets = np.append(starts, len(times))
+        self.timestamps = list(pd.DatetimeIndex(unique_times))
+        self._positions = {ts: i for i, ts in enumerate(self.timestamps)}
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def position(self, timestamp):
+        """Return the position of a timestamp (pd.Timestamp or np.datetime64)."""
+        return self._positions[pd.Timestamp(timestamp)]
+
+    def frame_at(self, position):
+        """Return the rows for the timestamp at `position`."""
+        return self.df.iloc[self.offsets[position]:self.offsets[position + 1]]
+
+    def frame(self, timestamp):
+        """Return the rows for `timestamp`."""
+        return self.frame_at(self.position(timestamp))
+
+# ============================================================================
+# STATISTICS CUBE
+# ============================================================================
+
+class StatsCube:
+    """Timestamps x metrics table with the panel statistics for every frame.
+
+    All frames are counted in one vectorized pass over the time-sorted rows,
+    so reading the statistics for a frame is a list lookup. `table` holds the
+    same numbers as a DataFrame indexed by timestamp for full-timeline charts.
+    """
+
+    def __init__(self, frame_index, total_spots):
+        self.frame_index = frame_index
+        df = frame_index.df
+        frame_count = len(frame_index)
+        positions = np.repeat(np.arange(frame_count), np.diff(frame_index.offsets))
+
+        def count(mask):
+            return np.bincount(positions, weights=mask, minlength=frame_count).astype(np.int64)
+
+        occupied = (df['status'] == 'occupied').to_numpy()
+        occupied_count = count(occupied)
+        metrics = {
+            'total_spots': np.full(frame_count, total_spots, dtype=np.int64),
+            'occupied_count': occupied_count,
+            'vacant_count': count((df['status'] == 'vacant').to_numpy()),
+            'occupancy_rate': (occupied_count / total_spots) * 100 if total_spots > 0 else np.zeros(frame_count),
+            'total_vehicles': occupied_count,
+        }
+        for service in SERVICES:
+            metrics[f'{service.lower()}_count'] = count(occupied & (df['service'] == service).to_numpy())
+
+        self.table = pd.DataFrame(
+            metrics, index=pd.DatetimeIndex(frame_index.timestamps, name=frame_index.time_column)
+        )
+        self._records = self.table.to_dict('records')
+
+    def at(self, position):
+        """Return the statistics dict for the timestamp at `position`."""
+        return dict(self._records[position])
+
+    def stats(self, timestamp):
+        """Return the statistics dict for `timestamp`."""
+        return self.at(self.frame_index.position(timestamp))
+
+# ============================================================================
+# OCCUPANCY MATRIX
+# ============================================================================
+
+# Service code for a vacant slot
+VACANT_CODE = 0
+
+class OccupancyMatrix:
+    """Compact slots x timestamps occupancy arrays with lookup tables.
+
+    `service_codes` (int8) holds VACANT_CODE or 1 + an index into
+    `service_names`; `plate_ids` (int32) holds an index into `plate_names`
+    or -1. Slot positions are stored once per slot. At 5 bytes per slot and
+    timestamp, a month of per-minute snapshots for 24 slots is about 5 MB.
+
+    It offers the FrameIndex lookups (`frame`, `frame_at`, `position`,
+    `timestamps`) and the StatsCube ones (`stats`, `at`), so it can replace
+    both: `frame_at()` rebuilds the columns calculate_stats(),
+    create_map_plot() and create_frame() read, and the statistics are
+    counted straight from the service codes.
+    """
+
+    def __init__(self, frame_index, total_spots):
+        df = frame_index.df
+        self.total_spots = total_spots
+        self.time_column = frame_index.time_column
+        self.timestamps = frame_index.timestamps
+        self._positions = {ts: i for i, ts in enumerate(self.timestamps)}
+
+        self.slot_ids, slot_rows = np.unique(df['slot_id'].to_numpy(), return_inverse=True)
+        positions = np.repeat(np.arange(len(frame_index)), np.diff(frame_index.offsets))
+        shape = (len(self.slot_ids), len(self.timestamps))
+
+        occupied = (df['status'] == 'occupied').to_numpy()
+        service = df['service'].where(occupied)
+        extra_services = sorted(set(service.dropna()) - set(SERVICES))
+        self.service_names = SERVICES + extra_services
+        service_index = pd.Categorical(service, categories=self.service_names).codes
+        self.service_codes = np.full(shape, VACANT_CODE, dtype=np.int8)
+        # Occupied rows without a known service get code -1
+        self.service_codes[slot_rows, positions] = np.where(
+            occupied, np.where(service_index >= 0, service_index + 1, -1), VACANT_CODE
+        )
+
+        plate_codes, self.plate_names = pd.factorize(df['plate_number'].where(occupied))
+        self.plate_ids = np.full(shape, -1, dtype=np.int32)
+        self.plate_ids[slot_rows, positions] = plate_codes
+
+        # Occupied position of each slot (constant in the source data)
+        slot_positions = df[occupied].groupby('slot_id')[['x', 'y']].first().reindex(self.slot_ids)
+        self.slot_x = slot_positions['x'].to_numpy(dtype=np.float32)
+        self.slot_y = slot_positions['y'].to_numpy(dtype=np.float32)
+
+        # Code -1 / plate id -1 index the trailing NaN entries
+        self._service_lookup = np.array([np.nan] + self.service_names + [np.nan], dtype=object)
+        self._plate_lookup = np.append(np.asarray(self.plate_names, dtype=object), np.nan)
+
+    @classmethod
+    def from_dataframe(cls, df, total_spots, time_column='current_time'):
+        return cls(FrameIndex(df, time_column), total_spots)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    @property
+    def nbytes(self):
+        """Bytes used by the per-cell arrays."""
+        return self.service_codes.nbytes + self.plate_ids.nbytes
+
+    def position(self, timestamp):
+        return self._positions[pd.Timestamp(timestamp)]
+
+    def frame_at(self, position):
+        """Rebuild the rows for the timestamp at `position` as a DataFrame."""
+        codes = self.service_codes[:, position]
+        occupied = codes != VACANT_CODE
+        return pd.DataFrame({
+            self.time_column: self.timestamps[position],
+            'slot_id': self.slot_ids,
+            'x': self.slot_x.astype(float),
+            'y': np.where(occupied, self.slot_y, np.nan),
+            'plate_number': self._plate_lookup[self.plate_ids[:, position]],
+            'service': self._service_lookup[codes],
+            'status': np.where(occupied, 'occupied', 'vacant')
+        })
+
+    def frame(self, timestamp):
+        return self.frame_at(self.position(timestamp))
+
+    def at(self, position):
+        """Return the statistics dict for the timestamp at `position`."""
+        codes = self.service_codes[:, position]
+        counts = np.bincount(codes[codes > 0], minlength=len(self.service_names) + 1)
+        occupied_count = int(np.count_nonzero(codes != VACANT_CODE))
+        stats = {
+            'total_spots': self.total_spots,
+            'occupied_count': occupied_count,
+            'vacant_count': int(len(codes) - occupied_count),
+            'occupancy_rate': (occupied_count / self.total_spots) * 100 if self.total_spots > 0 else 0,
+            'total_vehicles': occupied_count,
+        }
+        for i, service in enumerate(SERVICES):
+            stats[f'{service.lower()}_count'] = int(counts[i + 1])
+        return stats
+
+    def stats(self, timestamp):
+        return self.at(self.position(timestamp))
@@ -0,0 +1,190 @@
+"""
+Process-wide sprite cache for the dashboard map.
+
+create_map_plot() places a bordered license plate image and a service logo
+badge for every occupied spot. Building one means opening the PNG, resizing
+it with LANCZOS, drawing the service-colored border and PNG/base64-encoding
+the result. The finished data-URI strings are kept in a bounded LRU cache
+shared by all Streamlit sessions, so plates that persist across timestamps
+(and repeat views of a timestamp) cost a dictionary lookup.
+
+encode_background() does the same once per process for the map background,
+optionally as a downsampled, palette-quantized variant for low-bandwidth
+kiosk clients.
+"""
+
+import base64
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PLATE_DIR = 'assets/plates'
+LOGO_DIR = 'assets/logos'
+MAP_PATH = 'assets/map.png'
+
+# Low-bandwidth map variant: maximum width in pixels and palette size
+LOW_BANDWIDTH_MAX_WIDTH = 800
+LOW_BANDWIDTH_COLORS = 64
+
+# Service colors for plate borders
+SERVICE_BORDER_COLORS = {
+    'Uber': '#000000',
+    'Lyft': '#FF00BF',
+    'Waymo': '#00B4A2',
+    'Taxi': '#F5A623'
+}
+
+# Upper bound on cached sprites (a few KB each)
+MAX_SPRITES = 512
+
+# ============================================================================
+# LRU CACHE
+# ============================================================================
+
+class SpriteCache:
+    """Bounded, thread-safe LRU cache with hit/miss counters."""
+
+    def __init__(self, max_entries=MAX_SPRITES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached value for `key`, calling `build()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        # Build outside the lock so a slow encode does not block other sessions
+        value = build()
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return a dict with the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': self.hits / lookups if lookups > 0 else 0.0
+            }
+
+sprite_cache = SpriteCache()
+
+# ============================================================================
+# SPRITE BUILDERS
+# ============================================================================
+
+def encode_png_data_uri(img):
+    """PNG-encode a PIL image and return it as a data URI."""
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return f"data:image/png;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
+def _build_plate_sprite(plate_path, border_color, size, border_width):
+    plate_img = Image.open(plate_path)
+    # Resize plate image
+    plate_img_resized = plate_img.resize((size, int(plate_img.height * size / plate_img.width)), Image.Resampling.LANCZOS)
+
+    # Create bordered plate image
+    border_size = border_width * 2
+    bordered_plate = Image.new('RGBA',
+                               (plate_img_resized.width + border_size,
+                                plate_img_resized.height + border_size),
+                               (0, 0, 0, 0))
+
+    # Draw colored border
+    draw = ImageDraw.Draw(bordered_plate)
+    border_rgb = tuple(int(border_color[i:i+2], 16) for i in (1, 3, 5))
+    draw.rectangle([(0, 0),
+                    (bordered_plate.width - 1, bordered_plate.height - 1)],
+                   outline=border_rgb, width=border_width)
+
+    # Paste plate image in center
+    bordered_plate.paste(plate_img_resized, (border_width, border_width),
+                         plate_img_resized if plate_img_resized.mode == 'RGBA' else None)
+
+    return encode_png_data_uri(bordered_plate), bordered_plate.width, bordered_plate.height
+
+def plate_sprite(plate_number, service, size=80, border_width=3):
+    """Return (data_uri, width, height) for a bordered plate, or None if there is no plate image."""
+    def build():
+        plate_path = os.path.join(PLATE_DIR, f'{plate_number}.png')
+        if not os.path.exists(plate_path):
+            return None
+        border_color = SERVICE_BORDER_COLORS.get(service, '#808080')
+        return _build_plate_sprite(plate_path, border_color, size, border_width)
+
+    return sprite_cache.get(('plate', plate_number, service, size), build)
+
+def logo_sprite(service, size=24):
+    """Return (data_uri, width, height) for a service logo badge, or None if there is no logo."""
+    def build():
+        logo_path = os.path.join(LOGO_DIR, f'{service.lower()}.png')
+        if not os.path.exists(logo_path):
+            return None
+        logo_resized = Image.open(logo_path)
+        logo_resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        return encode_png_data_uri(logo_resized), logo_resized.width, logo_resized.height
+
+    return sprite_cache.get(('logo', service, size), build)
+
+# ============================================================================
+# MAP BACKGROUND
+# ============================================================================
+
+def encode_background(path=MAP_PATH, max_width=None, colors=None):
+    """Decode, optionally downsample/quantize, and encode the map background.
+
+    Returns a dict with the original `width`/`height` (the coordinate space
+    used by the slot positions), the `data_uri`, and the encoded pixel size
+    and byte count. Plotly stretches the image to `width` x `height`, so a
+    downsampled variant lines up with the same coordinates.
+    """
+    map_img = Image.open(path)
+    width, height = map_img.size
+
+    if max_width is not None and width > max_width:
+        map_img = map_img.resize((max_width, round(height * max_width / width)), Image.Resampling.LANCZOS)
+    if colors is not None:
+        map_img = map_img.convert('RGBA').quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+
+    data_uri = encode_png_data_uri(map_img)
+    return {
+        'width': width,
+        'height': height,
+        'data_uri': data_uri,
+        'encoded_width': map_img.width,
+        'encoded_height': map_img.height,
+        'encoded_bytes': len(data_uri)
+    }
+
+def encode_low_bandwidth_background(path=MAP_PATH):
+    """Return the downsampled, quantized map variant for kiosk clients."""
+    return encode_background(path, max_width=LOW_BANDWIDTH_MAX_WIDTH, colors=LOW_BANDWIDTH_COLORS)
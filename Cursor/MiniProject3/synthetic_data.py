@@ -0,0 +1,304 @@
+"""
+Synthetic ride-hailing data for scale testing.
+
+Generates slot snapshots in the schema of ride_hailing.xlsx (current_time,
+slot_id, x, y, reservation_id, rider_id, driver_id, plate_number, service)
+for any number of slots and timestamps. Every slot alternates between
+vacant gaps and visits: gaps are geometric with a mean of 60 / arrival_rate
+minutes, visit lengths are geometric with a mean of `mean_dwell` minutes,
+and each visit's service is drawn from the service mix.
+
+Rows are produced in chunks of whole slots (slot-major, like the bundled
+workbook) and streamed to CSV or Parquet, so 10k slots x 100k timestamps
+(a billion rows) never has to fit in memory. Workbooks are limited to
+Excel's row count.
+
+    python synthetic_data.py --slots 500 --timestamps 1440 --output assets/synthetic.parquet
+    python synthetic_data.py --slots 500 --timestamps 1440 --output assets/synthetic.parquet --register synthetic
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from lots import REGISTRY_PATH, load_registry
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+COLUMNS = ['current_time', 'slot_id', 'x', 'y', 'reservation_id', 'rider_id',
+           'driver_id', 'plate_number', 'service']
+
+DEFAULT_START = '2025-09-17 18:00:00'
+DEFAULT_INTERVAL = '1min'
+
+# Arrivals per vacant slot per hour and mean visit length (minutes), close to the bundled data
+DEFAULT_ARRIVAL_RATE = 5.0
+DEFAULT_MEAN_DWELL = 3.5
+
+# Share of visits per service (the bundled data after the "Other" split)
+DEFAULT_SERVICE_MIX = {'Uber': 0.36, 'Lyft': 0.34, 'Waymo': 0.15, 'Taxi': 0.15}
+
+PLATES_DIR = 'assets/plates'
+
+# Rows generated per chunk (whole slots per chunk, at least one)
+CHUNK_ROWS = 1_000_000
+
+# Data rows in an Excel sheet (one row is the header)
+EXCEL_MAX_ROWS = 1_048_575
+
+# Grid spacing (map pixels) for lots without registered slot coordinates
+GRID_ORIGIN = (420.0, 820.0)
+GRID_SPACING = (180.0, -85.0)
+GRID_ROWS = 3
+
+# ============================================================================
+# SLOTS AND PLATES
+# ============================================================================
+
+def slot_positions(slot_count, lot=None):
+    """Return (x, y) arrays for `slot_count` slots.
+
+    The lot's registered slot coordinates are reused in turn, so every
+    synthetic slot sits on a real bay of the map (several synthetic slots
+    share a bay once there are more slots than bays).
+    """
+    if lot is not None and lot.slots:
+        bays = np.array([lot.slots[slot_id] for slot_id in sorted(lot.slots)], dtype=float)
+    else:
+        columns = np.arange(8)
+        rows = np.arange(GRID_ROWS)
+        bays = np.array([(GRID_ORIGIN[0] + c * GRID_SPACING[0], GRID_ORIGIN[1] + r * GRID_SPACING[1])
+                         for c in columns for r in rows])
+    positions = bays[np.arange(slot_count) % len(bays)]
+    return positions[:, 0], positions[:, 1]
+
+def plate_pool(plates_dir=PLATES_DIR, synthesize=0, rng=None):
+    """Plate numbers to draw from: the plate images in `plates_dir`, plus
+    `synthesize` made-up plates in the same style (6-7 letters and digits,
+    drawn with the fallback marker since they have no image)."""
+    plates = []
+    if os.path.isdir(plates_dir):
+        plates = sorted(os.path.splitext(name)[0] for name in os.listdir(plates_dir)
+                        if name.lower().endswith('.png'))
+    if synthesize > 0 or not plates:
+        rng = rng or np.random.default_rng()
+        count = max(synthesize, 1 if plates else 100)
+        alphabet = np.array(list('ABCDEFGHJKLMNPRSTUVWXYZ0123456789'))
+        lengths = rng.integers(6, 8, size=count)
+        letters = rng.choice(alphabet, size=(count, 7))
+        plates += [''.join(row[:length]) for row, length in zip(letters, lengths)]
+    return np.array(plates, dtype=object)
+
+# ============================================================================
+# GENERATOR
+# ============================================================================
+
+def _visits(slot_count, timestamp_count, gap_mean, dwell_mean, rng):
+    """Simulate alternating gaps and visits for a block of slots.
+
+    Returns (slot, start, end) arrays, one entry per visit, with start and
+    end (exclusive) as timestamp positions. Durations are drawn for all
+    slots at once, with more cycles than needed on average; the few slots
+    that run short get another batch.
+    """
+    cycle = gap_mean + dwell_mean
+    cycles = int(np.ceil(timestamp_count / cycle * 1.2)) + 4
+    slots, starts, ends = [], [], []
+    offset = np.zeros(slot_count, dtype=np.int64)
+    # The first gap may be zero so some slots start occupied, like the bundled data
+    offset -= rng.integers(0, int(np.ceil(cycle)) + 1, size=slot_count)
+    pending = np.arange(slot_count)
+    while len(pending) > 0:
+        gaps = rng.geometric(1 / max(gap_mean, 1.0), size=(len(pending), cycles))
+        dwells = rng.geometric(1 / max(dwell_mean, 1.0), size=(len(pending), cycles))
+        visit_starts = offset[pending, None] + np.cumsum(gaps + dwells, axis=1) - dwells
+        visit_ends = visit_starts + dwells
+
+        keep = (visit_ends > 0) & (visit_starts < timestamp_count)
+        rows, _ = np.nonzero(keep)
+        slots.append(pending[rows])
+        starts.append(np.clip(visit_starts[keep], 0, None))
+        ends.append(np.clip(visit_ends[keep], None, timestamp_count))
+
+        offset[pending] = visit_ends[:, -1]
+        pending = pending[offset[pending] < timestamp_count]
+
+    slots, starts, ends = np.concatenate(slots), np.concatenate(starts), np.concatenate(ends)
+    order = np.lexsort((starts, slots))
+    return slots[order], starts[order], ends[order]
+
+def generate_chunks(slots=24, timestamps=60, start=DEFAULT_START, interval=DEFAULT_INTERVAL,
+                    arrival_rate=DEFAULT_ARRIVAL_RATE, mean_dwell=DEFAULT_MEAN_DWELL,
+                    service_mix=None, plates=None, lot=None, seed=None, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of synthetic snapshots, a block of whole slots at a time.
+
+    `arrival_rate` is arrivals per vacant slot per hour and `mean_dwell`
+    the mean visit length in minutes. Rows come out slot-major (every
+    timestamp of a slot, then the next slot), with slot ids from 1.
+    """
+    rng = np.random.default_rng(seed)
+    service_mix = service_mix or DEFAULT_SERVICE_MIX
+    services = np.array(list(service_mix), dtype=object)
+    weights = np.array(list(service_mix.values()), dtype=float)
+    weights /= weights.sum()
+    plates = plate_pool(rng=rng) if plates is None else np.asarray(plates, dtype=object)
+
+    interval = pd.Timedelta(interval)
+    interval_minutes = interval.total_seconds() / 60
+    gap_mean = 60 / arrival_rate / interval_minutes
+    dwell_mean = mean_dwell / interval_minutes
+    times = pd.date_range(start, periods=timestamps, freq=interval).to_numpy()
+    slot_x, slot_y = slot_positions(slots, lot)
+
+    slots_per_chunk = max(1, chunk_rows // max(timestamps, 1))
+    visit_count = 0
+    for first in range(0, slots, slots_per_chunk):
+        block = min(slots_per_chunk, slots - first)
+        visit_slot, visit_start, visit_end = _visits(block, timestamps, gap_mean, dwell_mean, rng)
+        count = len(visit_slot)
+
+        # Per-visit values; rows pick them up by visit index (-1 = vacant)
+        numbers = np.arange(visit_count + 1, visit_count + count + 1)
+        visit_count += count
+        reservation = np.append(np.char.add('RSV-', np.char.zfill(numbers.astype(str), 6)).astype(object), np.nan)
+        rider = np.append(np.char.add('U-', (100 + numbers).astype(str)).astype(object), np.nan)
+        driver = np.append(np.char.add('D-', (200 + numbers).astype(str)).astype(object), np.nan)
+        plate = np.append(plates[rng.integers(0, len(plates), size=count)], np.nan)
+        service = np.append(services[rng.choice(len(services), size=count, p=weights)], np.nan)
+
+        # Visit covering each (slot, timestamp) cell: last visit starting at or before it
+        cell_slot = np.repeat(np.arange(block), timestamps)
+        cell_time = np.tile(np.arange(timestamps), block)
+        keys = visit_slot * timestamps + visit_start
+        index = np.searchsorted(keys, cell_slot * timestamps + cell_time, side='right') - 1
+        covered = (index >= 0) & (visit_slot[index.clip(0)] == cell_slot) & (cell_time < visit_end[index.clip(0)])
+        index = np.where(covered, index, -1)
+
+        x = slot_x[first + cell_slot]
+        yield pd.DataFrame({
+            'current_time': times[cell_time],
+            'slot_id': first + cell_slot + 1,
+            'x': x,
+            'y': np.where(covered, slot_y[first + cell_slot], np.nan),
+            'reservation_id': reservation[index],
+            'rider_id': rider[index],
+            'driver_id': driver[index],
+            'plate_number': plate[index],
+            'service': service[index]
+        }, columns=COLUMNS)
+
+def generate(**options):
+    """Generate a whole synthetic dataset as one DataFrame (for sizes that fit in memory)."""
+    return pd.concat(generate_chunks(**options), ignore_index=True)
+
+# ============================================================================
+# OUTPUT
+# ============================================================================
+
+def write_chunks(chunks, path):
+    """Stream chunks to .csv or .parquet, or collect them into a workbook; returns the row count."""
+    extension = os.path.splitext(path)[1].lower()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    rows = 0
+
+    if extension == '.csv':
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            rows += len(chunk)
+        return rows
+
+    if extension == '.parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                rows += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+
+    frames = []
+    for chunk in chunks:
+        rows += len(chunk)
+        if rows > EXCEL_MAX_ROWS:
+            raise ValueError(f"{rows}+ rows do not fit in a workbook ({EXCEL_MAX_ROWS} max); "
+                             f"write .csv or .parquet instead")
+        frames.append(chunk)
+    pd.concat(frames, ignore_index=True).to_excel(path, index=False)
+    return rows
+
+def register_lot(lot_id, data_path, slots, registry_path=REGISTRY_PATH, base_lot=None):
+    """Add (or replace) a lot in the registry that reads the synthetic data."""
+    if os.path.exists(registry_path):
+        with open(registry_path) as f:
+            config = json.load(f)
+    else:
+        config = {'lots': []}
+    base = base_lot or load_registry(registry_path).get()
+    entry = {
+        'lot_id': lot_id,
+        'name': f'Synthetic ({slots} slots)',
+        'map': base.map_path,
+        'data': data_path,
+        'capacity': slots,
+        'vertical_offset': base.vertical_offset
+    }
+    config['lots'] = [lot for lot in config['lots'] if lot['lot_id'] != lot_id] + [entry]
+    if 'default' not in config and len(config['lots']) > 1:
+        config['default'] = config['lots'][0]['lot_id']
+    with open(registry_path, 'w') as f:
+        json.dump(config, f, indent=2)
+
+def parse_service_mix(text):
+    """Parse 'Uber=0.4,Lyft=0.3,...' into a dict."""
+    mix = {}
+    for item in text.split(','):
+        service, share = item.split('=')
+        mix[service.strip()] = float(share)
+    return mix
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic ride-hailing snapshots for scale testing.")
+    parser.add_argument('--slots', type=int, default=24, help="Number of slots")
+    parser.add_argument('--timestamps', type=int, default=60, help="Number of timestamps")
+    parser.add_argument('--start', default=DEFAULT_START, help="First timestamp")
+    parser.add_argument('--interval', default=DEFAULT_INTERVAL, help="Time between snapshots (e.g. 1min, 30s)")
+    parser.add_argument('--arrival-rate', type=float, default=DEFAULT_ARRIVAL_RATE,
+                        help="Arrivals per vacant slot per hour")
+    parser.add_argument('--mean-dwell', type=float, default=DEFAULT_MEAN_DWELL, help="Mean visit length (minutes)")
+    parser.add_argument('--service-mix', type=parse_service_mix, default=None,
+                        help="Service shares, e.g. Uber=0.4,Lyft=0.3,Waymo=0.2,Taxi=0.1")
+    parser.add_argument('--synthesize-plates', type=int, default=0,
+                        help="Add this many made-up plates to the plates in assets/plates")
+    parser.add_argument('--seed', type=int, default=None, help="Random seed")
+    parser.add_argument('--output', required=True, help="Output file (.xlsx, .csv or .parquet)")
+    parser.add_argument('--register', metavar='LOT_ID', default=None,
+                        help="Add a lot reading this file to assets/lots.json")
+    args = parser.parse_args()
+    if args.output.lower().endswith(('.xlsx', '.xls')) and args.slots * args.timestamps > EXCEL_MAX_ROWS:
+        parser.error(f"{args.slots * args.timestamps} rows do not fit in a workbook; write .csv or .parquet instead")
+
+    registry = load_registry()
+    rng = np.random.default_rng(args.seed)
+    chunks = generate_chunks(slots=args.slots, timestamps=args.timestamps, start=args.start,
+                             interval=args.interval, arrival_rate=args.arrival_rate,
+                             mean_dwell=args.mean_dwell, service_mix=args.service_mix,
+                             plates=plate_pool(synthesize=args.synthesize_plates, rng=rng),
+                             lot=registry.get(), seed=args.seed)
+    rows = write_chunks(chunks, args.output)
+    print(f"Generated {rows} rows ({args.slots} slots x {args.timestamps} timestamps): {args.output}")
+
+    if args.register:
+        register_lot(args.register, args.output, args.slots)
+        print(f"Registered lot '{args.register}' in {REGISTRY_PATH}")
@@ -0,0 +1,143 @@
+"""
+Lightweight per-stage timing spans for the dashboard.
+
+A SpanRecorder times named stages (data load, frame filter, stats, sprites,
+figure build, chart serialization) with time.perf_counter(). Spans inside a
+rerun are summed per stage, and each rerun's totals go into a rolling
+window per stage, so percentiles and histograms describe the last N reruns
+rather than the whole session. The dashboard keeps one recorder per session
+and only while tracing is switched on; with tracing off a span is a shared
+no-op context manager.
+"""
+
+import json
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Reruns kept per stage
+ROLLING_WINDOW = 200
+
+# Histogram bucket edges in milliseconds (the last bucket is open-ended)
+HISTOGRAM_EDGES_MS = [0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# Reusable no-op span for when tracing is off
+NULL_SPAN = nullcontext()
+
+# ============================================================================
+# RECORDER
+# ============================================================================
+
+def bucket_labels(edges=HISTOGRAM_EDGES_MS):
+    labels = [f'{low}-{high} ms' for low, high in zip(edges[:-1], edges[1:])]
+    return labels + [f'{edges[-1]}+ ms']
+
+class SpanRecorder:
+    """Rolling per-stage timings, grouped by rerun.
+
+    Usage:
+        recorder = SpanRecorder()
+        with recorder.rerun('rerun.full'):
+            with recorder.span('data load'):
+                ...
+        recorder.summary()
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.last_rerun = {}
+        self.rerun_count = 0
+        self._current = None
+        self._depth = 0
+
+    @contextmanager
+    def span(self, stage):
+        """Time the enclosed block as `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, (time.perf_counter() - start) * 1000)
+
+    def add(self, stage, milliseconds):
+        """Add a timing; inside a rerun it is summed with the rerun's other spans of `stage`."""
+        if self._current is not None:
+            self._current[stage] = self._current.get(stage, 0.0) + milliseconds
+        else:
+            self._record({stage: milliseconds})
+
+    @contextmanager
+    def rerun(self, name='rerun'):
+        """Group the spans of one (full or fragment) rerun; the rerun's own time is recorded as `name`.
+
+        Nested reruns (a fragment running inside a full rerun) belong to the
+        outermost one.
+        """
+        outer = self._depth == 0
+        if outer:
+            self._current = {}
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if outer:
+                totals, self._current = self._current, None
+                totals[name] = (time.perf_counter() - start) * 1000
+                self._record(totals)
+
+    def _record(self, totals):
+        for stage, milliseconds in totals.items():
+            if stage not in self.samples:
+                self.samples[stage] = deque(maxlen=self.window)
+            self.samples[stage].append(milliseconds)
+        self.last_rerun = totals
+        self.rerun_count += 1
+
+    def clear(self):
+        self.samples.clear()
+        self.last_rerun = {}
+        self.rerun_count = 0
+
+    def summary(self):
+        """Per-stage count, last, mean, p50, p95 and max (milliseconds) over the window."""
+        rows = {}
+        for stage, values in self.samples.items():
+            values = np.fromiter(values, dtype=float)
+            rows[stage] = {
+                'count': len(values),
+                'last': float(values[-1]),
+                'mean': float(values.mean()),
+                'p50': float(np.percentile(values, 50)),
+                'p95': float(np.percentile(values, 95)),
+                'max': float(values.max())
+            }
+        return rows
+
+    def histogram(self, stage, edges=HISTOGRAM_EDGES_MS):
+        """Counts per bucket (see bucket_labels) for one stage over the window."""
+        values = np.fromiter(self.samples.get(stage, ()), dtype=float)
+        buckets = np.searchsorted(edges, values, side='right') - 1
+        return np.bincount(np.clip(buckets, 0, len(edges) - 1), minlength=len(edges)).tolist()
+
+    def to_dict(self):
+        return {
+            'window': self.window,
+            'reruns': self.rerun_count,
+            'last_rerun': self.last_rerun,
+            'summary': self.summary(),
+            'histogram_edges_ms': HISTOGRAM_EDGES_MS,
+            'histograms': {stage: self.histogram(stage) for stage in self.samples},
+            'samples_ms': {stage: list(values) for stage, values in self.samples.items()}
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
@@ -6,6 +6,16 @@ import imageio
 import os
 import numpy as np
 import io
+import argparse
+from contextlib import ExitStack
+
+from animation_writer import (FRAME_DURATION, WRITERS, available_formats, format_report, open_writer,
+                              output_path)
+from render_pool import BlitFigure, canvas_frame, init_matplotlib_worker, render_frames, resolve_workers, tight_frame_inset
+from ride_data import FrameIndex
+
+# Colors kept exact in a global GIF palette (slot markers and legend)
+PALETTE_COLORS = ['gray', 'darkgray', 'red', 'darkred', 'white', 'black']
 
 # Vertical offset constant to shift elements upward on the map
 # Since Y=0 is at top and increases downward, subtract to move UP
@@ -28,8 +38,9 @@ print(f"Total rows in dataset: {len(df)}")
 print(f"Date range: {df['current_time'].min()} to {df['current_time'].max()}")
 print(f"Status distribution:\n{df['status'].value_counts()}")
 
-# Get unique timestamps (minutes) for animation
-unique_timestamps = sorted(df['current_time'].unique())
+# Index rows by timestamp (minutes) so each animation frame is a contiguous slice
+frame_index = FrameIndex(df)
+unique_timestamps = frame_index.timestamps
 print(f"\nTotal unique timestamps (frames): {len(unique_timestamps)}")
 
 # Load background image
@@ -152,70 +163,59 @@ print("  4. Compare coordinates with visualize_ride_hailing.py output")
 print("  5. Verify map file dimensions match expected layout")
 print("=" * 60 + "\n")
 
-# Function to create a frame for a given timestamp
-def create_frame(timestamp):
-    """Create a single frame for the animation at the given timestamp."""
-    # Filter data for this timestamp
-    df_frame = df[df['current_time'] == timestamp].copy()
-    
-    # Create figure
-    fig, ax = plt.subplots(figsize=(16, 12))
-    
-    # Set background image if available
-    if background_img is not None:
-        # Use extent=[0, width, height, 0] to match image coordinate system (0,0 at top-left)
-        # origin='upper' ensures (0,0) is at top-left, matching standard image coordinates
-        ax.imshow(background_img, extent=[0, img_width, img_height, 0], 
-                  aspect='auto', alpha=0.8, zorder=0, origin='upper')
-    
-    # Plot vacant spots in gray
-    vacant_data = df_frame[df_frame['status'] == 'vacant']
-    if len(vacant_data) > 0:
-        ax.scatter(vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET, 
-                   c='gray', label='Vacant', alpha=0.8, s=100, zorder=2, 
-                   edgecolors='darkgray', linewidths=1)
-    
-    # Plot occupied spots with license plate images
-    occupied_data = df_frame[df_frame['status'] == 'occupied']
-    if len(occupied_data) > 0:
-        for idx, row in occupied_data.iterrows():
-            plate_number = row['plate_number']
-            if pd.notna(plate_number):
-                plate_path = f'demo/plates/{plate_number}.png'
-                if os.path.exists(plate_path):
-                    try:
-                        # Load license plate image
-                        plate_img = Image.open(plate_path)
-                        # Resize to appropriate size (adjust zoom factor as needed)
-                        zoom_factor = 0.15  # Adjust this to change plate size
-                        plate_img_resized = plate_img.resize(
-                            (int(plate_img.width * zoom_factor), 
-                             int(plate_img.height * zoom_factor)),
-                            Image.Resampling.LANCZOS
-                        )
-                        
-                        # Create OffsetImage for annotation
-                        imagebox = OffsetImage(plate_img_resized, zoom=1.0)
-                        
-                        # Create AnnotationBbox to place image at coordinates
-                        # Apply vertical offset to shift upward (subtract since Y increases downward)
-                        ab = AnnotationBbox(imagebox, (row['x'], row['y'] - VERTICAL_OFFSET), 
-                                          frameon=False, box_alignment=(0.5, 0.5))
-                        ax.add_artist(ab)
-                    except Exception as e:
-                        print(f"Warning: Could not load plate image {plate_path}: {e}")
-                        # Fallback to red dot if image fails
-                        ax.scatter(row['x'], row['y'] - VERTICAL_OFFSET, c='red', s=100, 
-                                 zorder=2, edgecolors='darkred', linewidths=1)
-                else:
-                    # Fallback to red dot if image file doesn't exist
-                    ax.scatter(row['x'], row['y'] - VERTICAL_OFFSET, c='red', s=100, 
-                             zorder=2, edgecolors='darkred', linewidths=1)
-            else:
-                # Fallback to red dot if no plate number
-                ax.scatter(row['x'], row['y'] - VERTICAL_OFFSET, c='red', s=100, 
-                         zorder=2, edgecolors='darkred', linewidths=1)
+FRAME_DPI = 100
+
+# 'canvas' takes frames straight from the Agg buffer; 'png' saves a
+# tight-cropped PNG and decodes it again (same pixels, slower)
+FRAME_CAPTURE = 'canvas'
+
+def draw_background(ax):
+    """Draw the parking map; returns the image artist (or None)."""
+    if background_img is None:
+        return None
+    # Use extent=[0, width, height, 0] to match image coordinate system (0,0 at top-left)
+    # origin='upper' ensures (0,0) is at top-left, matching standard image coordinates
+    return ax.imshow(background_img, extent=[0, img_width, img_height, 0], 
+                     aspect='auto', alpha=0.8, zorder=0, origin='upper')
+
+def draw_vacant_spots(ax, xs, ys):
+    """Plot vacant spots in gray; returns the scatter."""
+    return ax.scatter(xs, ys, 
+                      c='gray', label='Vacant', alpha=0.8, s=100, zorder=2, 
+                      edgecolors='darkgray', linewidths=1)
+
+def draw_occupied_spot(ax, x, y, plate_number):
+    """Draw the license plate image at (x, y), or a red dot without one; returns the artist."""
+    if pd.notna(plate_number):
+        plate_path = f'demo/plates/{plate_number}.png'
+        if os.path.exists(plate_path):
+            try:
+                # Load license plate image
+                plate_img = Image.open(plate_path)
+                # Resize to appropriate size (adjust zoom factor as needed)
+                zoom_factor = 0.15  # Adjust this to change plate size
+                plate_img_resized = plate_img.resize(
+                    (int(plate_img.width * zoom_factor), 
+                     int(plate_img.height * zoom_factor)),
+                    Image.Resampling.LANCZOS
+                )
+                
+                # Create OffsetImage for annotation
+                imagebox = OffsetImage(plate_img_resized, zoom=1.0)
+                
+                # Create AnnotationBbox to place image at coordinates
+                ab = AnnotationBbox(imagebox, (x, y), 
+                                  frameon=False, box_alignment=(0.5, 0.5))
+                return ax.add_artist(ab)
+            except Exception as e:
+                print(f"Warning: Could not load plate image {plate_path}: {e}")
     
+    # Fallback to red dot if there is no plate number, image file, or the image fails
+    return ax.scatter(x, y, c='red', s=100, 
+                      zorder=2, edgecolors='darkred', linewidths=1)
+
+def style_axes(fig, ax):
+    """Hide ticks and spines and fix the axes to the map's pixel coordinates."""
     # Remove white background and grid
     ax.set_facecolor('none')
     fig.patch.set_facecolor('white')
@@ -242,56 +242,196 @@ def create_frame(timestamp):
         y_min, y_max = df['y'].min(), df['y'].max()
         ax.set_xlim(x_min, x_max)
         ax.set_ylim(y_max, y_min)  # Invert Y for consistency
-    
-    # Add informative title with date and time
+
+def frame_title(timestamp):
     formatted_time = pd.to_datetime(timestamp).strftime('%B %d, %Y at %I:%M %p')
-    ax.set_title(f'Parking Status - {formatted_time}', 
-                 fontsize=18, fontweight='bold', pad=20)
-    
-    # Add legend
-    ax.legend(loc='upper right', fontsize=12, framealpha=0.9, 
-              facecolor='white', edgecolor='black', fancybox=True)
-    
-    plt.tight_layout()
-    
-    # Convert figure to numpy array for imageio with fixed dimensions
+    return f'Parking Status - {formatted_time}'
+
+def draw_legend(ax):
+    return ax.legend(loc='upper right', fontsize=12, framealpha=0.9, 
+                     facecolor='white', edgecolor='black', fancybox=True)
+
+def capture_frame(fig):
+    """Convert the drawn figure to a numpy array with fixed dimensions."""
+    if FRAME_CAPTURE == 'canvas':
+        return canvas_frame(fig, tight_frame_inset(fig))
     buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=100, bbox_inches='tight', 
+    fig.savefig(buf, format='png', dpi=FRAME_DPI, bbox_inches='tight', 
                 facecolor='white', pad_inches=0.1)
     buf.seek(0)
     frame = imageio.v2.imread(buf)
     buf.close()
+    return frame
+
+# Function to create a frame for a given timestamp
+def create_frame(timestamp):
+    """Create a single frame for the animation at the given timestamp."""
+    # Look up the rows for this timestamp
+    df_frame = frame_index.frame(timestamp)
     
+    # Create figure
+    fig, ax = plt.subplots(figsize=(16, 12), dpi=FRAME_DPI)
+    
+    # Set background image if available
+    draw_background(ax)
+    
+    # Plot vacant spots in gray
+    vacant_data = df_frame[df_frame['status'] == 'vacant']
+    if len(vacant_data) > 0:
+        draw_vacant_spots(ax, vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET)
+    
+    # Plot occupied spots with license plate images
+    # Apply vertical offset to shift upward (subtract since Y increases downward)
+    occupied_data = df_frame[df_frame['status'] == 'occupied']
+    for idx, row in occupied_data.iterrows():
+        draw_occupied_spot(ax, row['x'], row['y'] - VERTICAL_OFFSET, row['plate_number'])
+    
+    style_axes(fig, ax)
+    
+    # Add informative title with date and time
+    ax.set_title(frame_title(timestamp), fontsize=18, fontweight='bold', pad=20)
+    
+    # Add legend
+    draw_legend(ax)
+    
+    plt.tight_layout()
+    
+    frame = capture_frame(fig)
     plt.close(fig)
     return frame
 
-# Generate all frames
-print("\nGenerating animation frames...")
-frames = []
-for i, timestamp in enumerate(unique_timestamps):
-    if (i + 1) % 10 == 0 or i == 0:
-        print(f"Processing frame {i + 1}/{len(unique_timestamps)}: {timestamp}")
-    frame = create_frame(timestamp)
-    frames.append(frame)
-
-# Ensure all frames have the same dimensions
-print("\nStandardizing frame dimensions...")
-if len(frames) > 0:
-    # Get target dimensions from first frame
-    target_shape = frames[0].shape
-    standardized_frames = []
-    for i, frame in enumerate(frames):
-        if frame.shape != target_shape:
-            # Resize frame to match target dimensions
-            from PIL import Image as PILImage
-            pil_frame = PILImage.fromarray(frame)
-            pil_frame = pil_frame.resize((target_shape[1], target_shape[0]), PILImage.Resampling.LANCZOS)
-            frame = np.array(pil_frame)
-        standardized_frames.append(frame)
-    frames = standardized_frames
-
-# Create GIF with 2 seconds per frame
-print(f"\nCreating GIF with {len(frames)} frames (2 seconds per frame)...")
-# Duration is in seconds per frame
-imageio.v2.mimsave('parking_animation.gif', frames, duration=2.0, loop=0)
-print("Animation saved as 'parking_animation.gif'")
+class FrameSession:
+    """Render frames from one persistent figure, updating only what changed.
+    
+    The figure is built and the map rasterized once (see
+    render_pool.BlitFigure); each frame moves the vacant markers, replaces
+    the plates of the slots whose car changed and sets the title. Frames
+    are the same pixels as create_frame().
+    """
+    
+    def __init__(self):
+        self.fig, self.ax = plt.subplots(figsize=(16, 12), dpi=FRAME_DPI)
+        self.background = draw_background(self.ax)
+        self.vacant = draw_vacant_spots(self.ax, [], [])
+        style_axes(self.fig, self.ax)
+        self.title = self.ax.set_title(frame_title(unique_timestamps[0]), fontsize=18, fontweight='bold', pad=20)
+        self.has_vacant = None
+        # (x, y, plate_number) -> artist of each occupied slot on screen
+        self.slots = {}
+        self.slot_order = []
+        self.blit = None
+    
+    def update_slots(self, occupied_data):
+        """Keep the artists of unchanged slots and draw only the new ones."""
+        order = [(row['x'], row['y'] - VERTICAL_OFFSET, row['plate_number'])
+                 for idx, row in occupied_data.iterrows()]
+        if order == self.slot_order:
+            return
+        wanted = set(order)
+        for key in [key for key in self.slots if key not in wanted]:
+            self.slots.pop(key).remove()
+        for key in order:
+            if key not in self.slots:
+                self.slots[key] = draw_occupied_spot(self.ax, *key)
+        # Re-add in row order so overlapping plates stack as in create_frame()
+        for key in order:
+            self.slots[key].remove()
+            self.ax.add_artist(self.slots[key])
+        self.slot_order = order
+    
+    def render(self, timestamp):
+        df_frame = frame_index.frame(timestamp)
+        
+        vacant_data = df_frame[df_frame['status'] == 'vacant']
+        self.vacant.set_offsets(np.column_stack([vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET]))
+        has_vacant = len(vacant_data) > 0
+        self.vacant.set_visible(has_vacant)
+        
+        self.update_slots(df_frame[df_frame['status'] == 'occupied'])
+        self.title.set_text(frame_title(timestamp))
+        
+        # The legend lists the vacant markers only while there are any
+        if has_vacant != self.has_vacant:
+            self.vacant.set_label('Vacant' if has_vacant else '_nolegend_')
+            if self.ax.get_legend() is not None:
+                self.ax.get_legend().remove()
+            draw_legend(self.ax)
+            self.has_vacant = has_vacant
+        
+        if self.blit is None:
+            self.fig.tight_layout()
+            self.blit = BlitFigure(self.fig, self.ax, [self.background], tight_frame_inset(self.fig))
+        return self.blit.render()
+
+# One persistent figure per process (created lazily, so pool workers build their own)
+frame_session = None
+
+def create_session_frame(timestamp):
+    """Drop-in replacement for create_frame() that reuses one figure across frames."""
+    global frame_session
+    if frame_session is None:
+        frame_session = FrameSession()
+    return frame_session.render(timestamp)
+
+# Render engines selectable from the command line
+RENDER_ENGINES = {
+    'matplotlib': create_frame,
+    'session': create_session_frame
+}
+
+def init_render_worker(capture=None):
+    """Prepare a render process: data and background come from the module-level loading above."""
+    global FRAME_CAPTURE
+    init_matplotlib_worker()
+    if capture is not None:
+        FRAME_CAPTURE = capture
+    if background_img is not None:
+        background_img.load()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the parking status animation.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to render animation frames (0 = all cores)")
+    parser.add_argument('--engine', choices=sorted(RENDER_ENGINES), default='matplotlib',
+                        help="Redraw every frame from scratch, or update one persistent figure")
+    parser.add_argument('--capture', choices=['canvas', 'png'], default=FRAME_CAPTURE,
+                        help="Take frames from the Agg canvas buffer, or through a PNG round trip")
+    parser.add_argument('--format', nargs='+', choices=sorted(WRITERS), default=['gif'], dest='formats',
+                        help="Animation outputs (several formats print an encode time/size report)")
+    parser.add_argument('--quality', type=int, default=None, help="WebP/MP4 quality, 0-100 (default 80)")
+    parser.add_argument('--lossless', action='store_true', help="Lossless WebP")
+    parser.add_argument('--max-width', type=int, default=None, help="Scale animation frames down to this width")
+    parser.add_argument('--gif-palette', choices=['global', 'adaptive'], default='global',
+                        help="One palette for the whole GIF, or a palette per frame")
+    parser.add_argument('--dither', type=float, default=0.0,
+                        help="Ordered (Bayer) dither amplitude for the global GIF palette, 0-255 (0 = off)")
+    args = parser.parse_args()
+    unavailable = sorted(set(args.formats) - set(available_formats()))
+    if unavailable:
+        parser.error(f"not available here: {', '.join(unavailable)} (WebP needs Pillow 11+, MP4 needs ffmpeg or imageio-ffmpeg)")
+    workers = resolve_workers(args.workers)
+    FRAME_CAPTURE = args.capture
+
+    # Generate all frames (in order, optionally in parallel) and stream them into
+    # the animation outputs with 2 seconds per frame; each frame is resized to the
+    # first frame's dimensions on the way in, so memory stays flat
+    print(f"\nGenerating animation frames ({workers} worker{'s' if workers > 1 else ''})...")
+    rendered = render_frames(RENDER_ENGINES[args.engine], unique_timestamps, workers, initializer=init_render_worker,
+                             initargs=(FRAME_CAPTURE,))
+    with ExitStack() as stack:
+        writers = [stack.enter_context(open_writer(output_path('parking_animation.gif', format), format,
+                                                   duration=FRAME_DURATION, quality=args.quality,
+                                                   lossless=args.lossless, max_width=args.max_width,
+                                                   palette=args.gif_palette, palette_colors=PALETTE_COLORS,
+                                                   dither=args.dither))
+                   for format in args.formats]
+        for i, (timestamp, frame) in enumerate(zip(unique_timestamps, rendered)):
+            if (i + 1) % 10 == 0 or i == 0:
+                print(f"Processing frame {i + 1}/{len(unique_timestamps)}: {timestamp}")
+            for writer in writers:
+                writer.append(frame)
+    reports = [writer.report() for writer in writers]
+    for report in reports:
+        print(f"Animation saved as '{report['path']}' ({report['frames']} frames)")
+    if len(reports) > 1:
+        print("\n" + format_report(reports))
@@ -16,18 +16,43 @@ import matplotlib.pyplot as plt
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
 from matplotlib.patches import FancyBboxPatch
 from matplotlib.lines import Line2D
-from PIL import Image
+from matplotlib import font_manager
+from matplotlib.font_manager import FontProperties
+from PIL import Image, ImageColor, ImageDraw, ImageFont
 import imageio
 import os
 import numpy as np
 import io
+import argparse
+from contextlib import ExitStack
+from functools import partial
+
+from animation_writer import (FRAME_DURATION, WRITERS, available_formats, format_report, open_writer,
+                              output_path)
+from render_pool import BlitFigure, canvas_frame, init_matplotlib_worker, render_frames, resolve_workers, tight_frame_inset
+from lots import LOT_ENV_VAR, load_registry, selected_lot_id
+from ride_data import FrameIndex, OccupancyMatrix, StatsCube, load_ride_data
 
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
 
+def lot_from_command_line():
+    """Read --lot before any data is loaded (the full CLI is parsed under __main__)."""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--lot')
+    args, _ = parser.parse_known_args()
+    return args.lot
+
+# Pickup lot to render (map, slots, capacity and data file come from the lot registry)
+lot_registry = load_registry()
+LOT = lot_registry.get(selected_lot_id(lot_registry, lot_from_command_line() if __name__ == "__main__" else None))
+if __name__ == "__main__":
+    # Worker processes that re-import this module pick the same lot
+    os.environ[LOT_ENV_VAR] = LOT.lot_id
+
 # Vertical offset to align elements with parking map
-VERTICAL_OFFSET = 30
+VERTICAL_OFFSET = LOT.vertical_offset
 
 # Service brand colors
 SERVICE_COLORS = {
@@ -37,6 +62,9 @@ SERVICE_COLORS = {
     'Taxi': {'primary': '#F5A623', 'secondary': '#FFD700'}
 }
 
+# License plate images, one <plate_number>.png per plate
+PLATE_DIR = 'assets/plates'
+
 # Logo file paths
 LOGO_PATHS = {
     'Uber': 'assets/logos/uber.png',
@@ -48,39 +76,21 @@ LOGO_PATHS = {
 # Default color for vacant spots
 VACANT_COLOR = '#808080'
 
+# Number of parking spots in the pickup zone
+TOTAL_SPOTS = LOT.capacity
+
 # ============================================================================
 # DATA LOADING
 # ============================================================================
 
-# Load data from Excel file
-df = pd.read_excel('assets/ride_hailing.xlsx')
-
-# Split "Other" service entries: half to "Waymo", half to "Taxi"
-other_mask = df['service'] == 'Other'
-other_indices = df[other_mask].index.tolist()
-if len(other_indices) > 0:
-    half_point = len(other_indices) // 2
-    # Change first half to "Waymo"
-    for idx in other_indices[:half_point]:
-        df.at[idx, 'service'] = 'Waymo'
-    # Change second half to "Taxi"
-    for idx in other_indices[half_point:]:
-        df.at[idx, 'service'] = 'Taxi'
-    # Save updated data back to Excel
-    df.to_excel('assets/ride_hailing.xlsx', index=False)
-    print(f"Updated {len(other_indices)} 'Other' entries: {half_point} to Waymo, {len(other_indices) - half_point} to Taxi")
-
-# Create status column based on reservation_id
-df['status'] = df['reservation_id'].apply(
-    lambda x: 'occupied' if pd.notna(x) and str(x).strip() != '' else 'vacant'
-)
-
-# Convert current_time column to datetime
-df['current_time'] = pd.to_datetime(df['current_time'])
+# Load data from Excel file (cached as a Parquet snapshot after the first run).
+# "Other" service entries are split half to "Waymo", half to "Taxi" and the
+# result is saved back to the workbook.
+df = load_ride_data(LOT.data_path, persist_service_split=True)
 
 # Print data summary
 print(f"{'='*60}")
-print(f"SKY HARBOR RIDE-HAILING DASHBOARD - Data Summary")
+print(f"SKY HARBOR RIDE-HAILING DASHBOARD - Data Summary ({LOT.name})")
 print(f"{'='*60}")
 print(f"Total data points: {len(df)}")
 print(f"Date range: {df['current_time'].min()} to {df['current_time'].max()}")
@@ -90,13 +100,35 @@ for service, count in service_counts.items():
     print(f"  {service}: {count}")
 print(f"{'='*60}\n")
 
-# Get unique timestamps for animation frames
-unique_timestamps = sorted(df['current_time'].unique())
+# Index rows by timestamp so each animation frame is a contiguous slice
+frame_index = FrameIndex(df)
+unique_timestamps = frame_index.timestamps
+
+# Precompute the LIVE STATUS statistics for every frame in one pass
+stats_cube = StatsCube(frame_index, TOTAL_SPOTS)
 print(f"Total animation frames: {len(unique_timestamps)}")
 
+def use_dataset(data, total_spots=None):
+    """Render frames and statistics from another DataFrame (e.g. a benchmark dataset)."""
+    global df, frame_index, unique_timestamps, stats_cube
+    df = data
+    frame_index = FrameIndex(df)
+    unique_timestamps = frame_index.timestamps
+    stats_cube = StatsCube(frame_index, total_spots or TOTAL_SPOTS)
+    composite_renderers.clear()
+    reset_frame_session()
+    return frame_index
+
+def use_compact_data():
+    """Render frames and statistics from a compact OccupancyMatrix instead of the DataFrame."""
+    global frame_index, stats_cube
+    if not isinstance(frame_index, OccupancyMatrix):
+        frame_index = stats_cube = OccupancyMatrix(frame_index, TOTAL_SPOTS)
+    return frame_index
+
 # Load background image
 try:
-    background_img = Image.open('assets/map.png')
+    background_img = Image.open(LOT.map_path)
     img_width, img_height = background_img.size
     print(f"Background loaded: {img_width}x{img_height} pixels")
 except Exception as e:
@@ -123,8 +155,8 @@ for service, path in LOGO_PATHS.items():
 # ============================================================================
 
 def calculate_statistics(df_frame):
-    """Calculate real-time statistics for the dashboard panel."""
-    total_spots = 24
+    """Calculate real-time statistics for a single frame (see stats_cube for all frames)."""
+    total_spots = TOTAL_SPOTS
     
     occupied = df_frame[df_frame['status'] == 'occupied']
     vacant = df_frame[df_frame['status'] == 'vacant']
@@ -145,14 +177,38 @@ def calculate_statistics(df_frame):
 # STATISTICS PANEL WITH LOGOS
 # ============================================================================
 
-def draw_statistics_panel(ax, stats, img_width, img_height):
-    """Draw the real-time statistics panel with service logos."""
+# Panel position and size (x is measured from the right edge of the map)
+PANEL_RIGHT_OFFSET = 290
+PANEL_TOP = 120
+PANEL_WIDTH = 270
+PANEL_HEIGHT = 480
+
+# Service rows: first row offset, row spacing and progress bar length
+SERVICE_ROW_TOP = 270
+SERVICE_ROW_STEP = 48
+BAR_MAX_WIDTH = 130
+
+def occupancy_rate_color(rate):
+    """Green / orange / red depending on how full the zone is."""
+    return '#27ae60' if rate < 50 else '#f39c12' if rate < 80 else '#e74c3c'
+
+def panel_services(stats):
+    """Return (service, count, color) rows for the BY SERVICE section."""
+    return [
+        ('Uber', stats['uber_count'], SERVICE_COLORS['Uber']['primary']),
+        ('Lyft', stats['lyft_count'], SERVICE_COLORS['Lyft']['primary']),
+        ('Waymo', stats['waymo_count'], SERVICE_COLORS['Waymo']['primary']),
+        ('Taxi', stats['taxi_count'], SERVICE_COLORS['Taxi']['primary'])
+    ]
+
+def draw_panel_chrome(ax, img_width, img_height):
+    """Draw the parts of the statistics panel that are the same in every frame."""
     
     # Panel position and size
-    panel_x = img_width - 290
-    panel_y = 120
-    panel_width = 270
-    panel_height = 480
+    panel_x = img_width - PANEL_RIGHT_OFFSET
+    panel_y = PANEL_TOP
+    panel_width = PANEL_WIDTH
+    panel_height = PANEL_HEIGHT
     
     # Draw panel background with shadow effect
     shadow = FancyBboxPatch(
@@ -184,24 +240,11 @@ def draw_statistics_panel(ax, stats, img_width, img_height):
             fontsize=14, fontweight='bold', ha='center', va='center',
             color='white', zorder=12)
     
-    # Occupancy rate section
-    rate = stats['occupancy_rate']
-    rate_color = '#27ae60' if rate < 50 else '#f39c12' if rate < 80 else '#e74c3c'
-    
-    ax.text(panel_x + panel_width/2, panel_y + 85,
-            f"{rate:.0f}%", 
-            fontsize=32, fontweight='bold', ha='center', va='center',
-            color=rate_color, zorder=12)
+    # Section labels
     ax.text(panel_x + panel_width/2, panel_y + 115,
             'OCCUPANCY', 
             fontsize=9, ha='center', va='center',
             color='#7f8c8d', fontweight='bold', zorder=12)
-    
-    # Available spots
-    ax.text(panel_x + panel_width/2, panel_y + 160,
-            f"{stats['vacant_count']}", 
-            fontsize=40, fontweight='bold', ha='center', va='center',
-            color='#27ae60', zorder=12)
     ax.text(panel_x + panel_width/2, panel_y + 198,
             'SPOTS AVAILABLE', 
             fontsize=9, ha='center', va='center',
@@ -218,19 +261,11 @@ def draw_statistics_panel(ax, stats, img_width, img_height):
             fontsize=10, fontweight='bold', ha='center', va='center',
             color='#2c3e50', zorder=12)
     
-    # Service breakdown with logos
-    services = [
-        ('Uber', stats['uber_count'], SERVICE_COLORS['Uber']['primary']),
-        ('Lyft', stats['lyft_count'], SERVICE_COLORS['Lyft']['primary']),
-        ('Waymo', stats['waymo_count'], SERVICE_COLORS['Waymo']['primary']),
-        ('Taxi', stats['taxi_count'], SERVICE_COLORS['Taxi']['primary'])
-    ]
-    
-    y_offset = 270
-    bar_max_width = 130
-    max_count = max(s[1] for s in services) if max(s[1] for s in services) > 0 else 1
-    
-    for service_name, count, color in services:
+    # Service logos and progress bar backgrounds
+    y_offset = SERVICE_ROW_TOP
+    for service_name in ['Uber', 'Lyft', 'Waymo', 'Taxi']:
+        color = SERVICE_COLORS[service_name]['primary']
+        
         # Draw logo if available
         logo = service_logos.get(service_name)
         if logo is not None:
@@ -252,23 +287,60 @@ def draw_statistics_panel(ax, stats, img_width, img_height):
                        service_name[0], fontsize=12, fontweight='bold',
                        ha='center', va='center', color=color, zorder=13)
         
-        # Count on the right
-        ax.text(panel_x + panel_width - 25, panel_y + y_offset + 8,
-                str(count), 
-                fontsize=14, fontweight='bold', ha='right', va='center',
-                color=color, zorder=12)
-        
         # Progress bar background
         bar_x = panel_x + 60
         bar_bg = FancyBboxPatch(
-            (bar_x, panel_y + y_offset + 20), bar_max_width, 10,
+            (bar_x, panel_y + y_offset + 20), BAR_MAX_WIDTH, 10,
             boxstyle="round,pad=0.01,rounding_size=5",
             facecolor='#ecf0f1', edgecolor='none', zorder=11
         )
         ax.add_patch(bar_bg)
         
+        y_offset += SERVICE_ROW_STEP
+
+def panel_bar_widths(services):
+    """Progress bar fill lengths for panel_services() rows (0 = no fill)."""
+    max_count = max(s[1] for s in services) if max(s[1] for s in services) > 0 else 1
+    return [(count / max_count) * BAR_MAX_WIDTH if count > 0 else 0 for _, count, _ in services]
+
+def draw_panel_values(ax, stats, img_width, img_height):
+    """Draw the per-frame numbers and progress bars of the statistics panel.
+    
+    Returns the artists as {'rate', 'vacant', 'counts', 'bars'}; a bar is
+    None when its service has no cars.
+    """
+    panel_x = img_width - PANEL_RIGHT_OFFSET
+    panel_y = PANEL_TOP
+    panel_width = PANEL_WIDTH
+    
+    # Occupancy rate section
+    rate = stats['occupancy_rate']
+    rate_text = ax.text(panel_x + panel_width/2, panel_y + 85,
+            f"{rate:.0f}%", 
+            fontsize=32, fontweight='bold', ha='center', va='center',
+            color=occupancy_rate_color(rate), zorder=12)
+    
+    # Available spots
+    vacant_text = ax.text(panel_x + panel_width/2, panel_y + 160,
+            f"{stats['vacant_count']}", 
+            fontsize=40, fontweight='bold', ha='center', va='center',
+            color='#27ae60', zorder=12)
+    
+    # Service counts and progress bar fills
+    services = panel_services(stats)
+    count_texts, bar_fills = [], []
+    
+    y_offset = SERVICE_ROW_TOP
+    for (service_name, count, color), bar_width in zip(services, panel_bar_widths(services)):
+        # Count on the right
+        count_texts.append(ax.text(panel_x + panel_width - 25, panel_y + y_offset + 8,
+                str(count), 
+                fontsize=14, fontweight='bold', ha='right', va='center',
+                color=color, zorder=12))
+        
         # Progress bar fill
-        bar_width = (count / max_count) * bar_max_width if count > 0 else 0
+        bar_x = panel_x + 60
+        bar_fill = None
         if bar_width > 0:
             bar_fill = FancyBboxPatch(
                 (bar_x, panel_y + y_offset + 20), max(bar_width, 5), 10,
@@ -276,15 +348,38 @@ def draw_statistics_panel(ax, stats, img_width, img_height):
                 facecolor=color, edgecolor='none', alpha=0.85, zorder=12
             )
             ax.add_patch(bar_fill)
+        bar_fills.append(bar_fill)
         
-        y_offset += 48
+        y_offset += SERVICE_ROW_STEP
+    
+    return {'rate': rate_text, 'vacant': vacant_text, 'counts': count_texts, 'bars': bar_fills}
+
+def update_panel_values(artists, stats):
+    """Update draw_panel_values() artists in place for new stats (every bar must exist)."""
+    rate = stats['occupancy_rate']
+    artists['rate'].set_text(f"{rate:.0f}%")
+    artists['rate'].set_color(occupancy_rate_color(rate))
+    artists['vacant'].set_text(f"{stats['vacant_count']}")
+    
+    services = panel_services(stats)
+    for (service_name, count, color), bar_width, count_text, bar_fill in zip(
+            services, panel_bar_widths(services), artists['counts'], artists['bars']):
+        count_text.set_text(str(count))
+        bar_fill.set_visible(bar_width > 0)
+        if bar_width > 0:
+            bar_fill.set_width(max(bar_width, 5))
+
+def draw_statistics_panel(ax, stats, img_width, img_height):
+    """Draw the real-time statistics panel with service logos."""
+    draw_panel_chrome(ax, img_width, img_height)
+    draw_panel_values(ax, stats, img_width, img_height)
 
 # ============================================================================
 # SERVICE BADGE RENDERER
 # ============================================================================
 
 def draw_service_badge(ax, x, y, service):
-    """Draw a small service logo badge below the license plate."""
+    """Draw a small service logo badge below the license plate; returns the artist."""
     logo = service_logos.get(service)
     color_info = SERVICE_COLORS.get(service, SERVICE_COLORS['Taxi'])
     
@@ -298,42 +393,161 @@ def draw_service_badge(ax, x, y, service):
             ab = AnnotationBbox(imagebox, (x, y + 38),
                                frameon=False, box_alignment=(0.5, 0.5),
                                zorder=5)
-            ax.add_artist(ab)
+            return ax.add_artist(ab)
         except:
             # Fallback to colored dot
-            ax.scatter(x, y + 35, c=color_info['primary'], s=80, 
+            return ax.scatter(x, y + 35, c=color_info['primary'], s=80, 
                       zorder=5, edgecolors='white', linewidths=1.5)
     else:
-        ax.scatter(x, y + 35, c=color_info['primary'], s=80, 
+        return ax.scatter(x, y + 35, c=color_info['primary'], s=80, 
                   zorder=5, edgecolors='white', linewidths=1.5)
 
 # ============================================================================
 # MAIN FRAME CREATION
 # ============================================================================
 
-def create_frame(timestamp):
-    """Create a single frame for the animation at the given timestamp."""
+# Order of services in the legend and the statistics panel
+LEGEND_SERVICES = ['Uber', 'Lyft', 'Waymo', 'Taxi']
+
+def draw_background(ax):
+    """Draw the parking map; returns the image artist (or None)."""
+    if background_img is None:
+        return None
+    return ax.imshow(background_img, extent=[0, img_width, img_height, 0], 
+                     aspect='auto', alpha=0.85, zorder=0, origin='upper')
+
+def draw_plate(ax, x, y, plate_path, service):
+    """Draw a license plate with a service-colored frame centered on (x, y); returns the artist."""
+    color_info = SERVICE_COLORS.get(service, SERVICE_COLORS['Taxi'])
+    plate_img = Image.open(plate_path)
+    zoom_factor = 0.15
+    plate_img_resized = plate_img.resize(
+        (int(plate_img.width * zoom_factor), 
+         int(plate_img.height * zoom_factor)),
+        Image.Resampling.LANCZOS
+    )
     
-    # Filter data for this timestamp
-    df_frame = df[df['current_time'] == timestamp].copy()
+    imagebox = OffsetImage(plate_img_resized, zoom=1.0)
+    ab = AnnotationBbox(imagebox, (x, y), 
+                       frameon=True, 
+                       bboxprops=dict(
+                           facecolor='white',
+                           edgecolor=color_info['primary'],
+                           linewidth=3,
+                           boxstyle='round,pad=0.1'
+                       ),
+                       box_alignment=(0.5, 0.5))
+    return ax.add_artist(ab)
+
+def draw_fallback_dot(ax, x, y, service):
+    """Draw a service-colored dot for an occupied spot without a plate image."""
+    color_info = SERVICE_COLORS.get(service, SERVICE_COLORS['Taxi'])
+    return ax.scatter(x, y, c=color_info['primary'], s=200, 
+              zorder=3, edgecolors='white', linewidths=2)
+
+def draw_vacant_spots(ax, xs, ys):
+    """Draw gray markers for vacant spots; returns the scatter."""
+    return ax.scatter(xs, ys, c=VACANT_COLOR, s=120, zorder=2, 
+               edgecolors='#4a4a4a', linewidths=1.5, alpha=0.7)
+
+def style_frame(fig, ax):
+    """Hide ticks and spines and fix the axes to the map's pixel coordinates."""
+    ax.set_facecolor('none')
+    fig.patch.set_facecolor('#f5f6fa')
+    ax.set_xticks([])
+    ax.set_yticks([])
+    for spine in ax.spines.values():
+        spine.set_visible(False)
     
-    # Calculate statistics
-    stats = calculate_statistics(df_frame)
+    # Set axis limits
+    if background_img is not None:
+        ax.set_xlim(0, img_width)
+        ax.set_ylim(img_height, 0)
+
+TITLE_HEADLINE = f'SKY HARBOR AIRPORT  -  {LOT.name}'
+
+def format_frame_time(timestamp, until=None):
+    """Format the title time, as a range when `until` is a later timestamp."""
+    text = pd.to_datetime(timestamp).strftime('%B %d, %Y  |  %I:%M %p')
+    if until is not None and pd.Timestamp(until) != pd.Timestamp(timestamp):
+        text += pd.to_datetime(until).strftime(' - %I:%M %p')
+    return text
+
+def draw_title(ax, time_text):
+    """Draw the two-line title; returns the title Text artist."""
+    return ax.set_title(
+        f'{TITLE_HEADLINE}\n{time_text}', 
+        fontsize=16, fontweight='bold', pad=20, 
+        color='#2c3e50', loc='center'
+    )
+
+def draw_legend(ax, services_shown):
+    """Draw the service legend for the services present in the frame."""
+    legend_elements = []
+    
+    for service in LEGEND_SERVICES:
+        if service in services_shown:
+            legend_elements.append(
+                Line2D([0], [0], marker='o', color='w',
+                      markerfacecolor=SERVICE_COLORS[service]['primary'],
+                      markersize=10, label=service,
+                      markeredgecolor='white', markeredgewidth=1.5)
+            )
+    
+    return ax.legend(handles=legend_elements, loc='upper left', fontsize=10, 
+                     framealpha=0.95, facecolor='white', edgecolor='#2c3e50',
+                     title='Service Legend', title_fontsize=11)
+
+def plate_path_for(plate_number):
+    """Return the plate image path, or None if there is no image for it."""
+    if pd.notna(plate_number):
+        plate_path = os.path.join(PLATE_DIR, f'{plate_number}.png')
+        if os.path.exists(plate_path):
+            return plate_path
+    return None
+
+FRAME_DPI = 100
+
+# How create_frame() turns the figure into pixels: 'canvas' takes the Agg
+# buffer directly, 'png' saves a tight-cropped PNG and decodes it again.
+# Both give the same pixels for the tight_layout() figure.
+FRAME_CAPTURE = 'canvas'
+
+def capture_frame(fig):
+    """Return the drawn figure as an RGBA array, cropped like savefig(bbox_inches='tight')."""
+    if FRAME_CAPTURE == 'canvas':
+        return canvas_frame(fig, tight_frame_inset(fig))
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=FRAME_DPI, bbox_inches='tight', 
+                facecolor='#f5f6fa', pad_inches=0.1)
+    buf.seek(0)
+    frame = imageio.v2.imread(buf)
+    buf.close()
+    return frame
+
+def create_frame(timestamp, until=None):
+    """Create a single frame for the animation at the given timestamp.
+    
+    `until` shows a time range in the title for a frame that stands for
+    several unchanged timestamps.
+    """
+    
+    # Look up the rows for this timestamp
+    df_frame = frame_index.frame(timestamp)
+    
+    # Look up the precomputed statistics
+    stats = stats_cube.stats(timestamp)
     
     # Create figure
-    fig, ax = plt.subplots(figsize=(18, 12))
+    fig, ax = plt.subplots(figsize=(18, 12), dpi=FRAME_DPI)
     
     # Draw background image
-    if background_img is not None:
-        ax.imshow(background_img, extent=[0, img_width, img_height, 0], 
-                  aspect='auto', alpha=0.85, zorder=0, origin='upper')
+    draw_background(ax)
     
     # Process vacant spots
     vacant_data = df_frame[df_frame['status'] == 'vacant']
     if len(vacant_data) > 0:
-        ax.scatter(vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET, 
-                   c=VACANT_COLOR, s=120, zorder=2, 
-                   edgecolors='#4a4a4a', linewidths=1.5, alpha=0.7)
+        draw_vacant_spots(ax, vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET)
     
     # Process occupied spots
     occupied_data = df_frame[df_frame['status'] == 'occupied']
@@ -341,151 +555,731 @@ def create_frame(timestamp):
     
     for idx, row in occupied_data.iterrows():
         x, y = row['x'], row['y'] - VERTICAL_OFFSET
-        plate_number = row['plate_number']
         service = row['service'] if pd.notna(row['service']) else 'Taxi'
-        color_info = SERVICE_COLORS.get(service, SERVICE_COLORS['Taxi'])
         
         services_shown.add(service)
         
         # Try to load license plate image
         plate_loaded = False
-        if pd.notna(plate_number):
-            plate_path = f'assets/plates/{plate_number}.png'
-            if os.path.exists(plate_path):
-                try:
-                    plate_img = Image.open(plate_path)
-                    zoom_factor = 0.15
-                    plate_img_resized = plate_img.resize(
-                        (int(plate_img.width * zoom_factor), 
-                         int(plate_img.height * zoom_factor)),
-                        Image.Resampling.LANCZOS
-                    )
-                    
-                    imagebox = OffsetImage(plate_img_resized, zoom=1.0)
-                    ab = AnnotationBbox(imagebox, (x, y), 
-                                       frameon=True, 
-                                       bboxprops=dict(
-                                           facecolor='white',
-                                           edgecolor=color_info['primary'],
-                                           linewidth=3,
-                                           boxstyle='round,pad=0.1'
-                                       ),
-                                       box_alignment=(0.5, 0.5))
-                    ax.add_artist(ab)
-                    plate_loaded = True
-                    
-                    # Draw service logo badge
-                    draw_service_badge(ax, x, y, service)
-                    
-                except Exception as e:
-                    pass
+        plate_path = plate_path_for(row['plate_number'])
+        if plate_path is not None:
+            try:
+                draw_plate(ax, x, y, plate_path, service)
+                plate_loaded = True
+                
+                # Draw service logo badge
+                draw_service_badge(ax, x, y, service)
+                
+            except Exception as e:
+                pass
         
         # Fallback: colored dot
         if not plate_loaded:
-            ax.scatter(x, y, c=color_info['primary'], s=200, 
-                      zorder=3, edgecolors='white', linewidths=2)
+            draw_fallback_dot(ax, x, y, service)
     
     # Draw statistics panel
     draw_statistics_panel(ax, stats, img_width, img_height)
     
     # Configure axes
-    ax.set_facecolor('none')
-    fig.patch.set_facecolor('#f5f6fa')
-    ax.set_xticks([])
-    ax.set_yticks([])
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-    
-    # Set axis limits
-    if background_img is not None:
-        ax.set_xlim(0, img_width)
-        ax.set_ylim(img_height, 0)
+    style_frame(fig, ax)
     
     # Title
-    formatted_time = pd.to_datetime(timestamp).strftime('%B %d, %Y  |  %I:%M %p')
-    ax.set_title(
-        f'SKY HARBOR AIRPORT  -  Ride-Hailing Pickup Zone\n{formatted_time}', 
-        fontsize=16, fontweight='bold', pad=20, 
-        color='#2c3e50', loc='center'
-    )
+    draw_title(ax, format_frame_time(timestamp, until))
     
     # Create legend with logos
-    legend_elements = []
-    
-    for service in ['Uber', 'Lyft', 'Waymo', 'Taxi']:
-        if service in services_shown:
-            legend_elements.append(
-                Line2D([0], [0], marker='o', color='w',
-                      markerfacecolor=SERVICE_COLORS[service]['primary'],
-                      markersize=10, label=service,
-                      markeredgecolor='white', markeredgewidth=1.5)
-            )
-    
-    ax.legend(handles=legend_elements, loc='upper left', fontsize=10, 
-              framealpha=0.95, facecolor='white', edgecolor='#2c3e50',
-              title='Service Legend', title_fontsize=11)
+    draw_legend(ax, services_shown)
     
     plt.tight_layout()
     
     # Convert to image array
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', dpi=100, bbox_inches='tight', 
-                facecolor='#f5f6fa', pad_inches=0.1)
-    buf.seek(0)
-    frame = imageio.v2.imread(buf)
-    buf.close()
+    frame = capture_frame(fig)
     plt.close(fig)
     
     return frame
 
+# ============================================================================
+# PERSISTENT FIGURE SESSION
+# ============================================================================
+
+# Stats the session's panel is first drawn with, so that every progress bar exists
+SESSION_PANEL_STATS = {'occupancy_rate': 0, 'vacant_count': 0,
+                       'uber_count': 1, 'lyft_count': 1, 'waymo_count': 1, 'taxi_count': 1}
+
+class FrameSession:
+    """Render frames from one persistent figure, updating only what changed.
+    
+    The figure, map, panel chrome and title are built once, and the map is
+    rasterized once (see render_pool.BlitFigure). Each frame then moves the
+    vacant markers, swaps the plate/badge artists of the slots whose car
+    changed, and sets the panel numbers, progress bars and title text. The
+    legend is rebuilt only when the services shown change. Frames are the
+    same pixels as create_frame().
+    """
+    
+    def __init__(self):
+        self.fig, self.ax = plt.subplots(figsize=(18, 12), dpi=FRAME_DPI)
+        background = draw_background(self.ax)
+        self.vacant = draw_vacant_spots(self.ax, [], [])
+        draw_panel_chrome(self.ax, img_width, img_height)
+        self.panel = draw_panel_values(self.ax, SESSION_PANEL_STATS, img_width, img_height)
+        style_frame(self.fig, self.ax)
+        self.title = draw_title(self.ax, format_frame_time(unique_timestamps[0]))
+        self.legend_key = None
+        # (x, y, plate_path, service) -> artists of the occupied slots on screen
+        self.slots = {}
+        self.slot_order = []
+        self.blit = None
+        self._background = background
+    
+    def _draw_slot(self, key):
+        """Draw a slot like create_frame() does; returns its artists."""
+        x, y, plate_path, service = key
+        artists = []
+        plate_loaded = False
+        if plate_path is not None:
+            try:
+                artists.append(draw_plate(self.ax, x, y, plate_path, service))
+                plate_loaded = True
+                artists.append(draw_service_badge(self.ax, x, y, service))
+            except Exception as e:
+                pass
+        if not plate_loaded:
+            artists.append(draw_fallback_dot(self.ax, x, y, service))
+        return artists
+    
+    def update_slots(self, occupied_data):
+        """Keep the artists of unchanged slots and draw only the new ones; returns the services shown."""
+        order = []
+        for idx, row in occupied_data.iterrows():
+            service = row['service'] if pd.notna(row['service']) else 'Taxi'
+            order.append((row['x'], row['y'] - VERTICAL_OFFSET, plate_path_for(row['plate_number']), service))
+        if order == self.slot_order:
+            return {key[3] for key in order}
+        
+        wanted = set(order)
+        for key in [key for key in self.slots if key not in wanted]:
+            for artist in self.slots.pop(key):
+                artist.remove()
+        for key in order:
+            if key not in self.slots:
+                self.slots[key] = self._draw_slot(key)
+        
+        # Re-add in row order so overlapping plates stack as in create_frame()
+        for key in order:
+            for artist in self.slots[key]:
+                artist.remove()
+                self.ax.add_artist(artist)
+        self.slot_order = order
+        return {key[3] for key in order}
+    
+    def update_legend(self, services_shown):
+        key = tuple(s for s in LEGEND_SERVICES if s in services_shown)
+        if key != self.legend_key:
+            if self.ax.get_legend() is not None:
+                self.ax.get_legend().remove()
+            draw_legend(self.ax, services_shown)
+            self.legend_key = key
+    
+    def render(self, timestamp, until=None):
+        df_frame = frame_index.frame(timestamp)
+        
+        vacant_data = df_frame[df_frame['status'] == 'vacant']
+        self.vacant.set_offsets(np.column_stack([vacant_data['x'], vacant_data['y'] - VERTICAL_OFFSET]))
+        self.vacant.set_visible(len(vacant_data) > 0)
+        
+        services_shown = self.update_slots(df_frame[df_frame['status'] == 'occupied'])
+        update_panel_values(self.panel, stats_cube.stats(timestamp))
+        self.title.set_text(f'{TITLE_HEADLINE}\n{format_frame_time(timestamp, until)}')
+        self.update_legend(services_shown)
+        
+        if self.blit is None:
+            self.fig.tight_layout()
+            self.blit = BlitFigure(self.fig, self.ax, [self._background], tight_frame_inset(self.fig))
+        return self.blit.render()
+
+# ============================================================================
+# COMPOSITING RENDER ENGINE
+# ============================================================================
+
+# Square canvas (pixels) used to rasterize a single plate, badge or dot sprite
+SPRITE_CANVAS = 256
+
+# Supersampling factor for the antialiased progress bar sprites
+BAR_SUPERSAMPLE = 4
+
+BOLD_FONT_PATH = font_manager.findfont(FontProperties(weight='bold'))
+
+def points_to_pixels(points):
+    return points * FRAME_DPI / 72
+
+def figure_to_rgba(fig):
+    """Draw a figure and return its Agg canvas as an (H, W, 4) uint8 array."""
+    fig.canvas.draw()
+    return np.array(fig.canvas.buffer_rgba())
+
+def paste_sprite(canvas, sprite, left, top):
+    """Alpha-composite `sprite` onto `canvas` at (left, top), clipping at the edges."""
+    left, top = int(round(left)), int(round(top))
+    src_left, src_top = max(0, -left), max(0, -top)
+    right = min(canvas.width, left + sprite.width)
+    bottom = min(canvas.height, top + sprite.height)
+    if right <= left + src_left or bottom <= top + src_top:
+        return
+    if src_left or src_top or right - left < sprite.width or bottom - top < sprite.height:
+        sprite = sprite.crop((src_left, src_top, right - left, bottom - top))
+    canvas.alpha_composite(sprite, dest=(left + src_left, top + src_top))
+
+def boxes_overlap(a, b):
+    """True if two (left, top, right, bottom) pixel boxes intersect."""
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+class CompositeRenderer:
+    """Render frames by compositing dynamic sprites onto pre-rasterized static layers.
+    
+    The map background, the statistics panel chrome, the title headline and
+    the legend are drawn once with the same matplotlib code as create_frame()
+    and kept as two RGBA layers: the map below the plates and the chrome
+    above them. Each frame then only composites the plate sprites, badges,
+    panel numbers, progress bars and the title time with Pillow, which is a
+    fraction of the cost of a full figure redraw. Output has the same size
+    as create_frame().
+    """
+    
+    def __init__(self):
+        # Static layers per legend variant (the legend lists the services shown)
+        self._layers = {}
+        # (kind, ...) -> (sprite image, anchor_x, anchor_y) or None
+        self._sprites = {}
+        self._fonts = {}
+    
+    # ---- static layers --------------------------------------------------
+    
+    def _build_layers(self, legend_services):
+        fig, ax = plt.subplots(figsize=(18, 12))
+        background_artist = draw_background(ax)
+        draw_panel_chrome(ax, img_width, img_height)
+        style_frame(fig, ax)
+        title = draw_title(ax, format_frame_time(unique_timestamps[0]))
+        draw_legend(ax, legend_services)
+        plt.tight_layout()
+        fig.canvas.draw()
+        
+        renderer = fig.canvas.get_renderer()
+        canvas_height = fig.canvas.get_width_height()[1]
+        
+        # Same crop as savefig(bbox_inches='tight', pad_inches=0.1)
+        tight = fig.get_tightbbox(renderer).padded(0.1)
+        crop_left = int(round(tight.x0 * FRAME_DPI))
+        crop_right = int(round(tight.x1 * FRAME_DPI))
+        crop_top = canvas_height - int(round(tight.y1 * FRAME_DPI))
+        crop_bottom = canvas_height - int(round(tight.y0 * FRAME_DPI))
+        
+        # Bottom of the title block, where the time line's descenders end
+        title_box = title.get_window_extent(renderer)
+        title_anchor = ((title_box.x0 + title_box.x1) / 2 - crop_left,
+                        canvas_height - title_box.y0 - crop_top)
+        
+        data_to_display = ax.transData.frozen()
+        
+        # Map layer: background image on the figure color
+        chrome = [a for a in ax.get_children() if a.get_visible() and a is not background_artist]
+        for artist in chrome:
+            artist.set_visible(False)
+        map_layer = figure_to_rgba(fig)
+        
+        # Chrome layer: everything else on a transparent figure, title time blanked
+        for artist in chrome:
+            artist.set_visible(True)
+        if background_artist is not None:
+            background_artist.set_visible(False)
+        fig.patch.set_alpha(0)
+        title.set_text(f'{TITLE_HEADLINE}\n ')
+        chrome_layer = figure_to_rgba(fig)
+        plt.close(fig)
+        
+        crop = (slice(crop_top, crop_bottom), slice(crop_left, crop_right))
+        chrome_layer = chrome_layer[crop]
+        alpha_rows = np.nonzero(chrome_layer[..., 3].any(axis=1))[0]
+        alpha_cols = np.nonzero(chrome_layer[..., 3].any(axis=0))[0]
+        chrome_box = (alpha_cols[0], alpha_rows[0], alpha_cols[-1] + 1, alpha_rows[-1] + 1)
+        
+        return {
+            'map': Image.fromarray(map_layer[crop]),
+            'chrome': Image.fromarray(chrome_layer).crop(chrome_box),
+            'chrome_origin': chrome_box[:2],
+            'crop_origin': (crop_left, crop_top),
+            'canvas_height': canvas_height,
+            'data_to_display': data_to_display,
+            'title_anchor': title_anchor
+        }
+    
+    def layers(self, services_shown):
+        key = tuple(s for s in LEGEND_SERVICES if s in services_shown)
+        if key not in self._layers:
+            self._layers[key] = self._build_layers(key)
+        return self._layers[key]
+    
+    @staticmethod
+    def to_pixels(layers, x, y):
+        """Map data coordinates to pixel positions in the cropped frame."""
+        dx, dy = layers['data_to_display'].transform((x, y))
+        crop_left, crop_top = layers['crop_origin']
+        return dx - crop_left, layers['canvas_height'] - dy - crop_top
+    
+    # ---- sprites --------------------------------------------------------
+    
+    def _sprite(self, key, draw):
+        """Rasterize `draw(ax, cx, cy)` once and cache the trimmed RGBA sprite."""
+        if key in self._sprites:
+            return self._sprites[key]
+        
+        size_inches = SPRITE_CANVAS / FRAME_DPI
+        fig = plt.figure(figsize=(size_inches, size_inches), dpi=FRAME_DPI)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.set_xlim(0, SPRITE_CANVAS)
+        ax.set_ylim(SPRITE_CANVAS, 0)
+        ax.set_axis_off()
+        fig.patch.set_alpha(0)
+        center = SPRITE_CANVAS / 2
+        try:
+            draw(ax, center, center)
+            rgba = figure_to_rgba(fig)
+        except Exception:
+            self._sprites[key] = None
+            return None
+        finally:
+            plt.close(fig)
+        
+        rows = np.nonzero(rgba[..., 3].any(axis=1))[0]
+        cols = np.nonzero(rgba[..., 3].any(axis=0))[0]
+        if len(rows) == 0:
+            sprite = None
+        else:
+            image = Image.fromarray(rgba[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1])
+            sprite = (image, center - cols[0], center - rows[0])
+        self._sprites[key] = sprite
+        return sprite
+    
+    def plate_sprite(self, plate_path, service):
+        return self._sprite(('plate', plate_path, service),
+                            lambda ax, x, y: draw_plate(ax, x, y, plate_path, service))
+    
+    def badge_sprite(self, service):
+        # draw_service_badge places the badge 38 units below the plate center
+        return self._sprite(('badge', service),
+                            lambda ax, x, y: draw_service_badge(ax, x, y - 38, service))
+    
+    def dot_sprite(self, service):
+        return self._sprite(('dot', service),
+                            lambda ax, x, y: draw_fallback_dot(ax, x, y, service))
+    
+    def vacant_sprite(self):
+        return self._sprite(('vacant',),
+                            lambda ax, x, y: draw_vacant_spots(ax, [x], [y]))
+    
+    def bar_sprite(self, color, width, height):
+        """Antialiased rounded progress bar fill (alpha 0.85)."""
+        key = ('bar', color, width, height)
+        if key not in self._sprites:
+            scale = BAR_SUPERSAMPLE
+            big = Image.new('RGBA', (width * scale, height * scale), (0, 0, 0, 0))
+            fill = ImageColor.getrgb(color) + (round(255 * 0.85),)
+            ImageDraw.Draw(big).rounded_rectangle(
+                [(0, 0), (width * scale - 1, height * scale - 1)],
+                radius=min(height, width) * scale // 2, fill=fill)
+            self._sprites[key] = big.resize((width, height), Image.Resampling.LANCZOS)
+        return self._sprites[key]
+    
+    def font(self, points):
+        if points not in self._fonts:
+            self._fonts[points] = ImageFont.truetype(BOLD_FONT_PATH, points_to_pixels(points))
+        return self._fonts[points]
+    
+    def draw_text(self, draw, xy, text, points, color, align='center', vertical='center'):
+        """Draw bold text the way matplotlib aligns it (va='center' or the bottom of the text box)."""
+        font = self.font(points)
+        _, top, _, bottom = font.getbbox('lp', anchor='ls')
+        x, y = xy
+        baseline = y - (top + bottom) / 2 if vertical == 'center' else y - bottom
+        anchor = 'ms' if align == 'center' else 'rs'
+        draw.text((x, baseline), text, font=font, fill=color, anchor=anchor)
+    
+    # ---- frames ---------------------------------------------------------
+    
+    def slot_placements(self, layers, state):
+        """Return the [(z, sprite image, left, top), ...] drawn for one slot state."""
+        if state is None:
+            return []
+        x, y, status, plate_path, service = state
+        
+        placements = []
+        def place(z, sprite, px, py):
+            if sprite is not None:
+                image, anchor_x, anchor_y = sprite
+                placements.append((z, image, int(round(px - anchor_x)), int(round(py - anchor_y))))
+        
+        if status == 'vacant':
+            place(0, self.vacant_sprite(), *self.to_pixels(layers, x, y))
+            return placements
+        
+        sprite = self.plate_sprite(plate_path, service) if plate_path is not None else None
+        if sprite is not None:
+            place(1, sprite, *self.to_pixels(layers, x, y))
+            # Badges sit above every plate, as with matplotlib's zorder
+            place(2, self.badge_sprite(service), *self.to_pixels(layers, x, y + 38))
+        else:
+            place(1, self.dot_sprite(service), *self.to_pixels(layers, x, y))
+        return placements
+    
+    def panel_box(self, layers):
+        """Pixel box of the statistics panel (where the panel values are drawn)."""
+        panel_x = img_width - PANEL_RIGHT_OFFSET
+        left, top = self.to_pixels(layers, panel_x, PANEL_TOP)
+        right, bottom = self.to_pixels(layers, panel_x + PANEL_WIDTH, PANEL_TOP + PANEL_HEIGHT)
+        return (int(left) - 2, int(top) - 2, int(right) + 3, int(bottom) + 3)
+    
+    def title_box(self, layers):
+        """Pixel box of the title time line (full frame width)."""
+        _, anchor_y = layers['title_anchor']
+        line_height = points_to_pixels(16) * 1.5
+        return (0, int(anchor_y - line_height), layers['map'].width, int(anchor_y) + 2)
+    
+    def draw_panel_values(self, canvas, layers, stats, offset=(0, 0)):
+        """Pillow version of draw_panel_values()."""
+        draw = ImageDraw.Draw(canvas)
+        panel_x = img_width - PANEL_RIGHT_OFFSET
+        panel_y = PANEL_TOP
+        center_x = panel_x + PANEL_WIDTH / 2
+        
+        def to_canvas(x, y):
+            px, py = self.to_pixels(layers, x, y)
+            return px - offset[0], py - offset[1]
+        
+        rate = stats['occupancy_rate']
+        self.draw_text(draw, to_canvas(center_x, panel_y + 85),
+                       f"{rate:.0f}%", 32, occupancy_rate_color(rate))
+        self.draw_text(draw, to_canvas(center_x, panel_y + 160),
+                       f"{stats['vacant_count']}", 40, '#27ae60')
+        
+        services = panel_services(stats)
+        max_count = max(s[1] for s in services) if max(s[1] for s in services) > 0 else 1
+        
+        y_offset = SERVICE_ROW_TOP
+        for service_name, count, color in services:
+            self.draw_text(draw, to_canvas(panel_x + PANEL_WIDTH - 25, panel_y + y_offset + 8),
+                           str(count), 14, color, align='right')
+            
+            bar_x = panel_x + 60
+            bar_width = (count / max_count) * BAR_MAX_WIDTH if count > 0 else 0
+            if bar_width > 0:
+                left, top = self.to_pixels(layers, bar_x, panel_y + y_offset + 20)
+                right, bottom = self.to_pixels(layers, bar_x + max(bar_width, 5), panel_y + y_offset + 30)
+                width, height = max(1, int(round(right - left))), max(1, int(round(bottom - top)))
+                paste_sprite(canvas, self.bar_sprite(color, width, height),
+                             int(round(left)) - offset[0], int(round(top)) - offset[1])
+            
+            y_offset += SERVICE_ROW_STEP
+    
+    def compose(self, layers, placements, stats, time_text, box):
+        """Composite the frame region `box` (left, top, right, bottom) from scratch."""
+        left, top = box[0], box[1]
+        canvas = layers['map'].crop(box)
+        for _, image, sprite_left, sprite_top in placements:
+            paste_sprite(canvas, image, sprite_left - left, sprite_top - top)
+        chrome_left, chrome_top = layers['chrome_origin']
+        chrome = layers['chrome']
+        visible = (max(left, chrome_left), max(top, chrome_top),
+                   min(box[2], chrome_left + chrome.width), min(box[3], chrome_top + chrome.height))
+        if visible[2] > visible[0] and visible[3] > visible[1]:
+            canvas.alpha_composite(chrome, dest=(visible[0] - left, visible[1] - top),
+                                   source=(visible[0] - chrome_left, visible[1] - chrome_top,
+                                           visible[2] - chrome_left, visible[3] - chrome_top))
+        
+        if boxes_overlap(box, self.panel_box(layers)):
+            self.draw_panel_values(canvas, layers, stats, offset=(left, top))
+        if boxes_overlap(box, self.title_box(layers)):
+            anchor_x, anchor_y = layers['title_anchor']
+            self.draw_text(ImageDraw.Draw(canvas), (anchor_x - left, anchor_y - top), time_text, 16, '#2c3e50',
+                           vertical='bottom')
+        return canvas
+    
+    def frame_parts(self, timestamp, until=None):
+        """Collect everything drawn for a frame: layers, slot states and sprite placements."""
+        states = slot_states(frame_index.frame(timestamp))
+        layers = self.layers({s[4] for s in states.values() if s is not None and s[2] == 'occupied'})
+        slot_placements = {slot: self.slot_placements(layers, state) for slot, state in states.items()}
+        return {
+            'layers': layers,
+            'states': states,
+            'slot_placements': slot_placements,
+            # Stable sort keeps slot order within each z level
+            'placements': sorted((p for slot_list in slot_placements.values() for p in slot_list),
+                                 key=lambda p: p[0]),
+            'stats': stats_cube.stats(timestamp),
+            'time_text': format_frame_time(timestamp, until)
+        }
+    
+    def render(self, timestamp, until=None):
+        """Return the frame for `timestamp` as an (H, W, 4) uint8 array.
+        
+        `until` shows a time range in the title for a frame that stands for
+        several unchanged timestamps.
+        """
+        parts = self.frame_parts(timestamp, until)
+        layers = parts['layers']
+        canvas = self.compose(layers, parts['placements'], parts['stats'], parts['time_text'],
+                              (0, 0) + layers['map'].size)
+        return np.asarray(canvas)
+
+class IncrementalCompositeRenderer(CompositeRenderer):
+    """Composite renderer that only redraws what changed since the last frame.
+    
+    The slot states (plate, service, position) and panel statistics of the
+    previous frame are kept together with its canvas. For the next frame only
+    the boxes of slots whose state changed, the statistics panel (if the
+    numbers changed) and the title time line are re-composited from the
+    static layers; the rest of the canvas is reused as is. Output is pixel-
+    identical to CompositeRenderer.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._previous = None
+        self.dirty_boxes = 0
+    
+    def render(self, timestamp, until=None):
+        parts = self.frame_parts(timestamp, until)
+        layers, states = parts['layers'], parts['states']
+        placements, stats, time_text = parts['placements'], parts['stats'], parts['time_text']
+        
+        previous = self._previous
+        if previous is None or previous['layers'] is not layers:
+            # Static layers changed (or first frame): full composite
+            full_box = (0, 0) + layers['map'].size
+            canvas = self.compose(layers, placements, stats, time_text, full_box)
+        else:
+            canvas = previous['canvas']
+            boxes = []
+            for slot in states.keys() | previous['states'].keys():
+                if states.get(slot) != previous['states'].get(slot):
+                    changed = (parts['slot_placements'].get(slot, []) +
+                               previous['slot_placements'].get(slot, []))
+                    boxes.extend((left, top, left + image.width, top + image.height)
+                                 for _, image, left, top in changed)
+            if stats != previous['stats']:
+                boxes.append(self.panel_box(layers))
+            if time_text != previous['time_text']:
+                boxes.append(self.title_box(layers))
+            
+            for box in boxes:
+                box = (max(box[0], 0), max(box[1], 0),
+                       min(box[2], canvas.width), min(box[3], canvas.height))
+                if box[2] > box[0] and box[3] > box[1]:
+                    canvas.paste(self.compose(layers, placements, stats, time_text, box), box[:2])
+            self.dirty_boxes += len(boxes)
+        
+        self._previous = dict(parts, canvas=canvas)
+        return np.asarray(canvas)
+
+def slot_states(df_frame):
+    """Map slot_id -> drawing state (x, y, status, plate image path, service).
+    
+    Two frames draw a slot identically exactly when its state tuples are
+    equal. Slots without coordinates are not drawn and map to None.
+    """
+    states = {}
+    for slot_id, x, y, status, plate_number, service in zip(
+            df_frame['slot_id'], df_frame['x'], df_frame['y'], df_frame['status'],
+            df_frame['plate_number'], df_frame['service']):
+        if pd.isna(x) or pd.isna(y):
+            states[slot_id] = None
+        elif status == 'occupied':
+            service = service if pd.notna(service) else 'Taxi'
+            states[slot_id] = (float(x), float(y - VERTICAL_OFFSET), status, plate_path_for(plate_number), service)
+        else:
+            states[slot_id] = (float(x), float(y - VERTICAL_OFFSET), status, None, None)
+    return states
+
+def unchanged_runs(timestamps):
+    """Group consecutive timestamps whose slots and statistics do not change.
+    
+    Returns a list of (first, last) timestamp pairs; a run of one timestamp
+    has first == last.
+    """
+    runs = []
+    previous = None
+    for timestamp in timestamps:
+        key = (slot_states(frame_index.frame(timestamp)), stats_cube.stats(timestamp))
+        if runs and key == previous:
+            runs[-1] = (runs[-1][0], timestamp)
+        else:
+            runs.append((timestamp, timestamp))
+        previous = key
+    return runs
+
+# One renderer per process (created lazily, so pool workers build their own)
+composite_renderers = {}
+
+def create_composite_frame(timestamp, until=None, incremental=False):
+    """Drop-in replacement for create_frame() using the compositing engine."""
+    renderer_class = IncrementalCompositeRenderer if incremental else CompositeRenderer
+    if renderer_class not in composite_renderers:
+        composite_renderers[renderer_class] = renderer_class()
+    return composite_renderers[renderer_class].render(timestamp, until)
+
+def create_incremental_frame(timestamp, until=None):
+    return create_composite_frame(timestamp, until, incremental=True)
+
+# One persistent figure per process (created lazily, like the composite renderers)
+frame_session = None
+
+def create_session_frame(timestamp, until=None):
+    """Drop-in replacement for create_frame() that reuses one figure across frames."""
+    global frame_session
+    if frame_session is None:
+        frame_session = FrameSession()
+    return frame_session.render(timestamp, until)
+
+def reset_frame_session():
+    """Close the persistent figure; the next session frame builds a new one."""
+    global frame_session
+    if frame_session is not None:
+        plt.close(frame_session.fig)
+        frame_session = None
+
+# Render engines selectable from the command line
+RENDER_ENGINES = {
+    'matplotlib': create_frame,
+    'composite': create_composite_frame,
+    'incremental': create_incremental_frame,
+    'session': create_session_frame
+}
+
+def render_run(engine, run):
+    """Render one (first, last) timestamp run with a RENDER_ENGINES entry."""
+    first, last = run
+    return RENDER_ENGINES[engine](first, last)
+
 # ============================================================================
 # GENERATE OUTPUTS
 # ============================================================================
 
+# Output files (other lots than the default get a _<lot_id> suffix)
+PREVIEW_PATH = LOT.output_name('ride_hailing_preview.png', lot_registry.default)
+ANIMATION_PATH = LOT.output_name('ride_hailing_animation.gif', lot_registry.default)
+
+# Colors kept exact in a global GIF palette (brand colors, vacant dots, panel text and rate colors)
+PALETTE_COLORS = ([color for colors in SERVICE_COLORS.values() for color in colors.values()]
+                  + [VACANT_COLOR, '#2c3e50', '#27ae60', '#f39c12', '#e74c3c', '#f5f6fa', '#ffffff'])
+
 def generate_static_preview():
     """Generate a single static preview image."""
     print("\nGenerating static preview...")
     timestamp = unique_timestamps[0]
     frame = create_frame(timestamp)
-    imageio.v2.imwrite('ride_hailing_preview.png', frame)
-    print("Static preview saved: ride_hailing_preview.png")
+    imageio.v2.imwrite(PREVIEW_PATH, frame)
+    print(f"Static preview saved: {PREVIEW_PATH}")
     return frame
 
-def generate_animation():
-    """Generate the full animation GIF."""
-    print(f"\nGenerating animation ({len(unique_timestamps)} frames)...")
-    
-    frames = []
-    for i, timestamp in enumerate(unique_timestamps):
-        if (i + 1) % 10 == 0 or i == 0:
-            print(f"  Frame {i + 1}/{len(unique_timestamps)}")
-        frame = create_frame(timestamp)
-        frames.append(frame)
-    
-    # Standardize frame dimensions
-    if len(frames) > 0:
-        target_shape = frames[0].shape
-        standardized_frames = []
-        for frame in frames:
-            if frame.shape != target_shape:
-                pil_frame = Image.fromarray(frame)
-                pil_frame = pil_frame.resize(
-                    (target_shape[1], target_shape[0]), 
-                    Image.Resampling.LANCZOS
-                )
-                frame = np.array(pil_frame)
-            standardized_frames.append(frame)
-        frames = standardized_frames
-    
-    print(f"\nSaving animation...")
-    imageio.v2.mimsave('ride_hailing_animation.gif', frames, duration=2.0, loop=0)
-    print("Animation saved: ride_hailing_animation.gif")
+def init_render_worker(compact=False, capture=None):
+    """Prepare a render process for parallel animation rendering.
+    
+    The data, background and logos are loaded at module level, so a worker
+    gets them when it imports this module (from the Parquet snapshot) or
+    inherits them on fork. Decode the background and logos here so it
+    happens once (before forking, the file handles are shared with the
+    workers) rather than on the first frame of every chunk.
+    """
+    global FRAME_CAPTURE
+    init_matplotlib_worker()
+    if capture is not None:
+        FRAME_CAPTURE = capture
+    if compact:
+        use_compact_data()
+    if background_img is not None:
+        background_img.load()
+    for logo in service_logos.values():
+        if logo is not None:
+            logo.load()
+
+def generate_animation(workers=1, engine='matplotlib', merge_unchanged=False, formats=('gif',),
+                       gif_palette='global', **writer_options):
+    """Generate the full animation (a GIF by default).
+    
+    `workers` > 1 renders frames in a process pool (0 = all cores); frame
+    order is the same as the serial render. `engine` picks the frame
+    renderer from RENDER_ENGINES. With `merge_unchanged`, consecutive
+    timestamps with the same slots and statistics are rendered once, with a
+    time range in the title, and shown for their combined duration.
+    Every format in `formats` (see animation_writer.WRITERS) is written
+    from the same rendered frames; `writer_options` (quality, lossless,
+    max_width, dither) go to the writers. GIFs use one global palette
+    (from the first frame plus PALETTE_COLORS) unless `gif_palette` is
+    'adaptive'. Returns the writers' reports.
+    """
+    workers = resolve_workers(workers)
+    if merge_unchanged:
+        runs = unchanged_runs(unique_timestamps)
+    else:
+        runs = [(timestamp, timestamp) for timestamp in unique_timestamps]
+    print(f"\nGenerating animation ({len(runs)} frames for {len(unique_timestamps)} timestamps, "
+          f"{workers} worker{'s' if workers > 1 else ''}, {engine} engine)...")
+    
+    # Frames are streamed into the outputs as they are rendered, so memory stays flat
+    rendered = render_frames(partial(render_run, engine), runs, workers, initializer=init_render_worker,
+                             initargs=(isinstance(frame_index, OccupancyMatrix), FRAME_CAPTURE))
+    with ExitStack() as stack:
+        writers = [stack.enter_context(open_writer(output_path(ANIMATION_PATH, format), format,
+                                                   duration=FRAME_DURATION, palette=gif_palette,
+                                                   palette_colors=PALETTE_COLORS, **writer_options))
+                   for format in formats]
+        for i, ((first, last), frame) in enumerate(zip(runs, rendered)):
+            if (i + 1) % 10 == 0 or i == 0:
+                print(f"  Frame {i + 1}/{len(runs)}")
+            run_length = frame_index.position(last) - frame_index.position(first) + 1
+            for writer in writers:
+                writer.append(frame, duration=FRAME_DURATION * run_length)
+    reports = [writer.report() for writer in writers]
+    for report in reports:
+        print(f"Animation saved: {report['path']} ({report['frames']} {report['format'].upper()} frames)")
+    if len(reports) > 1:
+        print("\n" + format_report(reports))
+    return reports
 
 # ============================================================================
 # MAIN
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the ride-hailing preview and animation.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to render animation frames (0 = all cores)")
+    parser.add_argument('--engine', choices=sorted(RENDER_ENGINES), default='matplotlib',
+                        help="Frame renderer: full matplotlib redraw, static layers + sprite compositing, "
+                             "compositing that only redraws changed regions, or one persistent figure "
+                             "whose artists are updated per frame")
+    parser.add_argument('--lot', choices=lot_registry.ids(), default=LOT.lot_id,
+                        help="Pickup lot to render (default: $RIDE_HAILING_LOT or the registry default)")
+    parser.add_argument('--compact', action='store_true',
+                        help="Render from the compact slots x timestamps occupancy matrix")
+    parser.add_argument('--merge-unchanged', action='store_true',
+                        help="Render runs of unchanged timestamps as one longer frame with a time range")
+    parser.add_argument('--capture', choices=['canvas', 'png'], default=FRAME_CAPTURE,
+                        help="Take frames from the Agg canvas buffer, or through a PNG round trip")
+    parser.add_argument('--format', nargs='+', choices=sorted(WRITERS), default=['gif'], dest='formats',
+                        help="Animation outputs (several formats print an encode time/size report)")
+    parser.add_argument('--quality', type=int, default=None, help="WebP/MP4 quality, 0-100 (default 80)")
+    parser.add_argument('--lossless', action='store_true', help="Lossless WebP")
+    parser.add_argument('--max-width', type=int, default=None, help="Scale animation frames down to this width")
+    parser.add_argument('--gif-palette', choices=['global', 'adaptive'], default='global',
+                        help="One palette for the whole GIF, or a palette per frame")
+    parser.add_argument('--dither', type=float, default=0.0,
+                        help="Ordered (Bayer) dither amplitude for the global GIF palette, 0-255 (0 = off)")
+    args = parser.parse_args()
+    unavailable = sorted(set(args.formats) - set(available_formats()))
+    if unavailable:
+        parser.error(f"not available here: {', '.join(unavailable)} (WebP needs Pillow 11+, MP4 needs ffmpeg or imageio-ffmpeg)")
+    
     print("\n" + "="*60)
     print("SKY HARBOR RIDE-HAILING DASHBOARD")
     print("="*60)
@@ -494,13 +1288,22 @@ if __name__ == "__main__":
     print("  2. Real-Time Statistics Panel")
     print("="*60)
     
+    FRAME_CAPTURE = args.capture
+    if args.compact:
+        matrix = use_compact_data()
+        print(f"Using compact occupancy matrix ({matrix.nbytes} bytes for "
+              f"{len(matrix.slot_ids)} slots x {len(matrix)} timestamps)")
+    
     generate_static_preview()
-    generate_animation()
+    reports = generate_animation(workers=args.workers, engine=args.engine, merge_unchanged=args.merge_unchanged,
+                                 formats=args.formats, gif_palette=args.gif_palette, quality=args.quality,
+                                 lossless=args.lossless, max_width=args.max_width, dither=args.dither)
     
     print("\n" + "="*60)
     print("COMPLETE!")
     print("="*60)
     print("\nOutput files:")
-    print("  - ride_hailing_preview.png")
-    print("  - ride_hailing_animation.gif")
+    print(f"  - {PREVIEW_PATH}")
+    for report in reports:
+        print(f"  - {report['path']}")
     print("="*60 + "\n")